@@ -1,25 +1,173 @@
+import time
+# Початок перерахунку скрипта — для заміру часу сторінки (див. кінець файлу)
+_RUN_STARTED = time.perf_counter()
+
 import streamlit as st
 import pandas as pd
 import os
+import sys
+import threading
+
+# Єдиний корінь імпортів — src (як у модулях src/ між собою): інакше той самий модуль імпортувався б
+# двічі (src.x і x) з окремими кешами StoreCatalog і окремим instrument. PYTHONPATH задавати не потрібно.
+_SRC_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "src"))
+if _SRC_DIR not in sys.path:
+    sys.path.insert(0, _SRC_DIR)
 
-# Ми припускаємо, що у PYTHONPATH вже є папка src, або ж запускаємо цей скрипт із кореня проекту.
-from src.forecast_agent.forecast_agent import ForecastAgent
-from src.inventory_agent.inventory_agent import InventoryAgent
-from src.supplier_agent.supplier_agent import SupplierAgent
+# Ці модулі легкі: sklearn/joblib, DEAP і модель завантажуються лише під час першого прогнозу / запуску GA.
+from forecast_agent.forecast_cache import ForecastCache
+from forecast_agent.forecast_server import forecaster_from_env
+from forecast_agent.segmented_model import resolve_model_path
+from inventory_agent.inventory_agent import InventoryAgent, ENGINES
+from data_preparation.load_data import load_table, find_table
+from data_preparation.store_catalog import StoreCatalog
+from data_preparation.feature_store import FEATURE_STORE_FILE
+from simulation.results_sink import has_parts, read_results, run_dir, latest_run_dir
+from utils.background_jobs import JobManager
 
 # Налаштування шляхи
-MODEL_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), "models/forecast_model.pkl"))
+# forecast_model.pkl або каталог сегментованої моделі — за INTELL_FORECAST_MODEL (див. resolve_model_path)
+MODEL_PATH = resolve_model_path(os.path.abspath(os.path.join(os.path.dirname(__file__), "models")))
 STORE_CSV = os.path.abspath(os.path.join(os.path.dirname(__file__), "data/raw/store.csv"))
-INITIAL_STOCK_CSV = os.path.abspath(os.path.join(os.path.dirname(__file__), "data/processed/initial_stock.csv"))
-SIMULATION_RESULTS = os.path.abspath(os.path.join(os.path.dirname(__file__), "data/processed/simulation_results.csv"))
+# Таблиці без розширення: береться перший наявний формат (.parquet → .feather → .csv)
+INITIAL_STOCK_CSV = find_table(os.path.abspath(os.path.join(os.path.dirname(__file__), "data/processed/initial_stock")))
+FORECAST_CACHE = os.path.abspath(os.path.join(os.path.dirname(__file__), "models/forecast_cache.pkl"))
+PROCESSED_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "data/processed"))
+SIMULATION_RESULTS = os.path.join(PROCESSED_DIR, "simulation_results")
+FEATURE_STORE = os.path.abspath(os.path.join(os.path.dirname(__file__), "data/processed", FEATURE_STORE_FILE))
+
+# Інтервал опитування фонових завдань (с)
+POLL_INTERVAL_S = 0.5
+# Колонки тижневих результатів, які показує сторінка симуляції (решта не читається)
+RESULT_COLUMNS = ["week_start", "total_cost", "fill_rate"]
+
+
+# Спільні ресурси: створюються один раз на процес Streamlit, а не на кожен перерахунок скрипта
+@st.cache_resource
+def load_forecaster():
+    """
+    ForecastAgent за кешем прогнозів (кеш зберігається на диск між перезапусками).
+    Якщо задано INTELL_FORECAST_SERVER — замість власної копії моделі клієнт спільного сервера прогнозів.
+    Модель відкладена (lazy): сторінки без прогнозу її не завантажують.
+    """
+    agent = forecaster_from_env(MODEL_PATH,
+                                feature_store_path=FEATURE_STORE if os.path.exists(FEATURE_STORE) else None,
+                                lazy=True)
+    return ForecastCache(agent, cache_path=FORECAST_CACHE)
+
+
+@st.cache_resource
+def forecast_lock():
+    """
+    ForecastCache не потокобезпечний: сторінка і фонові завдання звертаються до нього по черзі.
+    """
+    return threading.Lock()
+
+
+@st.cache_resource
+def load_catalog():
+    """
+    Каталог статичних атрибутів магазинів (store.csv).
+    """
+    return StoreCatalog.for_path(STORE_CSV)
+
+
+@st.cache_resource
+def job_manager():
+    """
+    Пул фонових завдань, спільний для всіх сесій.
+    """
+    return JobManager(max_workers=2)
+
+
+@st.cache_data
+def load_stock(path: str, mtime: float) -> pd.DataFrame:
+    """
+    Початкові запаси; mtime входить у ключ кешу, тож зміна файлу перечитує таблицю.
+    """
+    return load_table(path, columns=["Store", "InitialStock"])
+
+
+def run_optimization(forecaster, lock, store_ids: list, stock: dict,
+                     week_start, alpha: float, beta: float, Q_max: int, engine: str, progress=None) -> dict:
+    """
+    Фонове завдання: один пакетний прогноз на всю мережу (stores, 7) → оптимізація замовлень.
+    Усі залежності передаються явно — функція виконується поза потоком сторінки.
+    """
+    progress(0, 2, "Прогноз попиту")
+    with lock:
+        preds = forecaster.predict_batch(store_ids=store_ids,
+                                         start_date=pd.Timestamp(week_start),
+                                         horizon_days=7,
+                                         store_csv=STORE_CSV)
+        forecaster.save()
+    demands = {sid: int(p) for sid, p in zip(store_ids, preds.sum(axis=1))}
+    progress(1, 2, "Оптимізація замовлень")
+    ia = InventoryAgent(alpha=alpha, beta=beta, Q_max=int(Q_max), initial_stock=stock)
+    orders = ia.optimize_orders(demands, engine=engine)
+    progress(2, 2, "Готово")
+    return {"orders": orders, "stats": ia.last_run_stats}
+
 
-# Завантажуємо список магазинів та початкові запаси
-df_stock = pd.read_csv(INITIAL_STOCK_CSV)
-list_of_store_ids = df_stock["Store"].tolist()
-current_stock_dict = dict(zip(df_stock["Store"], df_stock["InitialStock"]))
+def simulation_run_name(engine: str) -> str:
+    """
+    Каталог прогону симуляції зі сторінки (data/processed/runs/<назва>/) — окремий для кожного двигуна.
+    """
+    return f"app-{engine}"
 
-# Ініціалізуємо ForecastAgent на старті
-fa = ForecastAgent(model_path=MODEL_PATH)
+
+def run_simulation_job(forecaster, lock, engine: str, progress=None):
+    """
+    Фонове завдання: повна симуляція (simulation.main) з прогресом по тижнях.
+    Попит прогнозується спільним ForecastCache сторінки (модель уже завантажена, прогнози кешуються).
+    """
+    from simulation.simulation import main as run_simulation
+    return run_simulation(engine=engine, progress=progress, run_name=simulation_run_name(engine),
+                          forecaster=forecaster, forecaster_lock=lock)
+
+
+def show_results(df_res: pd.DataFrame) -> None:
+    """
+    Графіки тижневих витрат і fill rate.
+    """
+    df_res = df_res.copy()
+    df_res["week_start"] = pd.to_datetime(df_res["week_start"])
+    df_res = df_res.sort_values("week_start")
+    st.subheader("Сума витрат по тижнях")
+    st.line_chart(df_res.set_index("week_start")["total_cost"])
+    st.subheader("Fill Rate по тижнях")
+    st.line_chart(df_res.set_index("week_start")["fill_rate"])
+
+
+def show_job(job) -> bool:
+    """
+    Показує стан завдання. Поки воно виконується — прогрес-бар і повторний перерахунок сторінки
+    через POLL_INTERVAL_S (опитування). Повертає True, якщо результат готовий.
+    """
+    if job.status == "running":
+        st.progress(job.fraction, text=f"{job.message} ({job.elapsed_s:.1f} с)")
+        time.sleep(POLL_INTERVAL_S)
+        st.rerun()
+    if job.status == "error":
+        st.error(f"Помилка: {job.future.exception()}")
+        return False
+    return True
+
+
+def store_stock():
+    """
+    Список магазинів і початкові запаси (з кешу, поки файл не змінився) — лише для сторінок, яким вони потрібні.
+    Лише магазини, для яких є атрибути в store.csv (інакше прогноз неможливий).
+    """
+    df_stock = load_stock(INITIAL_STOCK_CSV, os.path.getmtime(INITIAL_STOCK_CSV))
+    df_stock = df_stock[df_stock["Store"].isin(load_catalog().store_ids)]
+    return df_stock["Store"].tolist(), dict(zip(df_stock["Store"], df_stock["InitialStock"]))
+
+
+fa = load_forecaster()
+jobs = job_manager()
+# Ключ результатів включає модель і файл запасів: інші дані → інший результат
+data_key = (fa.agent.model_fingerprint, INITIAL_STOCK_CSV, os.path.getmtime(INITIAL_STOCK_CSV))
 
 st.title("Інтелектуальне управління запасами для роздрібної мережі")
 
@@ -28,14 +176,18 @@ choice = st.sidebar.selectbox("Меню", menu)
 
 if choice == "Прогнозування":
     st.header("ForecastAgent: Прогноз продажів")
+    list_of_store_ids, _ = store_stock()
     store_id = st.selectbox("Виберіть магазин", list_of_store_ids)
     start_date = st.date_input("Дата початку прогнозу", value=pd.to_datetime("2025-01-01"))
     horizon = st.slider("Горизонт прогнозу (днів)", min_value=7, max_value=30, value=14)
     if st.button("Отримати прогноз"):
-        preds = fa.predict(store_id=store_id,
-                           start_date=pd.Timestamp(start_date),
-                           horizon_days=horizon,
-                           store_csv=STORE_CSV)
+        # Один магазин — швидкий пакетний виклик, тож виконуємо одразу
+        with forecast_lock():
+            preds = fa.predict(store_id=store_id,
+                               start_date=pd.Timestamp(start_date),
+                               horizon_days=horizon,
+                               store_csv=STORE_CSV)
+            fa.save()
         df_plot = pd.DataFrame({
             "day": pd.date_range(start_date, periods=horizon),
             "predicted_sales": preds
@@ -45,36 +197,57 @@ if choice == "Прогнозування":
 
 elif choice == "Оптимізація запасів":
     st.header("InventoryAgent: Оптимізація замовлення")
+    list_of_store_ids, current_stock_dict = store_stock()
     week_start = st.date_input("Дата початку тижня для оптимізації", value=pd.to_datetime("2025-01-01"))
     alpha = st.number_input("Вартість дефіциту (alpha)", value=5.0)
     beta = st.number_input("Вартість надлишку (beta)", value=1.0)
     Q_max = st.number_input("Максимальний обсяг постачання за тиждень (Q_max)", value=30000)
+    engine = st.selectbox("Метод оптимізації", ENGINES, index=ENGINES.index("greedy"))
+    params = (str(week_start), float(alpha), float(beta), int(Q_max), engine)
     if st.button("Оптимізувати"):
-        demands = {}
-        for sid in list_of_store_ids:
-            preds = fa.predict(store_id=sid,
-                               start_date=pd.Timestamp(week_start),
-                               horizon_days=7,
-                               store_csv=STORE_CSV)
-            demands[sid] = int(preds.sum())
-        ia = InventoryAgent(alpha=alpha, beta=beta, Q_max=int(Q_max), initial_stock=current_stock_dict)
-        orders = ia.optimize_orders(demands)
-        df_orders = pd.DataFrame.from_dict(orders, orient="index", columns=["qty_to_order"])
+        # Той самий набір параметрів → те саме (вже готове або запущене) завдання
+        jobs.submit(("optimize", data_key, params), run_optimization,
+                    fa, forecast_lock(), list_of_store_ids, current_stock_dict, *params)
+        st.session_state["optimize_key"] = ("optimize", data_key, params)
+
+    job = jobs.get(st.session_state.get("optimize_key"))
+    if job is not None and show_job(job):
+        result = job.result()
+        st.caption(f"cost = {result['stats']['cost']:.2f}, час = {result['stats']['wall_time_s']:.3f} с "
+                   f"(параметри: {', '.join(map(str, job.key[2]))})")
+        df_orders = pd.DataFrame.from_dict(result["orders"], orient="index", columns=["qty_to_order"])
         st.dataframe(df_orders)
 
 elif choice == "Симуляція":
     st.header("Повна симуляція (90 днів)")
+    sim_engine = st.selectbox("Метод оптимізації", ENGINES, index=ENGINES.index("greedy"))
     if st.button("Запустити симуляцію"):
-        # Викликаємо main() із simulation.py
-        from src.simulation.simulation import main as run_simulation
-        run_simulation()
-        st.success("Симуляція завершена! Результати збережено.")
-
-    # Якщо результати вже є, відобразимо їх
-    if os.path.exists(SIMULATION_RESULTS):
-        df_res = pd.read_csv(SIMULATION_RESULTS, parse_dates=["week_start"])
-        df_res = df_res.sort_values("week_start")
-        st.subheader("Сума витрат по тижнях")
-        st.line_chart(df_res.set_index("week_start")["total_cost"])
-        st.subheader("Fill Rate по тижнях")
-        st.line_chart(df_res.set_index("week_start")["fill_rate"])
+        # simulation.main() у фоновому потоці; сторінка опитує прогрес
+        jobs.submit(("simulation", data_key, sim_engine), run_simulation_job, fa, forecast_lock(), sim_engine)
+        st.session_state["simulation_key"] = ("simulation", data_key, sim_engine)
+
+    df_res = None
+    job = jobs.get(st.session_state.get("simulation_key"))
+    if job is not None and job.status == "running":
+        # Уже дописані тижні (частини в каталозі прогону) — ще до завершення симуляції
+        running_results = os.path.join(run_dir(PROCESSED_DIR, simulation_run_name(job.key[2])), "simulation_results")
+        if has_parts(running_results):
+            show_results(read_results(running_results, columns=RESULT_COLUMNS, parse_dates=["week_start"]))
+    if job is not None and show_job(job):
+        st.success(f"Симуляція завершена за {job.elapsed_s:.1f} с! Результати збережено.")
+        df_res = job.result()[RESULT_COLUMNS]
+
+    # Інакше — останні збережені результати: частини потокового запису (зокрема перерваної симуляції)
+    # або зведена таблиця; читаються лише потрібні колонки
+    latest_run = latest_run_dir(PROCESSED_DIR)
+    if df_res is None and latest_run is not None:
+        df_res = read_results(os.path.join(latest_run, "simulation_results"),
+                              columns=RESULT_COLUMNS, parse_dates=["week_start"])
+    results_path = find_table(SIMULATION_RESULTS)
+    if df_res is None and results_path is not None:
+        df_res = load_table(results_path, columns=RESULT_COLUMNS, parse_dates=["week_start"])
+    if df_res is not None and not df_res.empty:
+        show_results(df_res)
+
+# Час перерахунку сторінки (імпорти, кешовані ресурси, сама сторінка); перший прогноз включає завантаження моделі
+st.sidebar.caption(f"Сторінка: {(time.perf_counter() - _RUN_STARTED) * 1e3:.0f} мс")
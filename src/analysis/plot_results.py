@@ -1,15 +1,31 @@
 import os
 import pandas as pd
-import matplotlib.pyplot as plt
+
+from data_preparation.load_data import load_table, find_table
+from simulation.results_sink import read_results, latest_run_dir
 
 def plot_simulation_results():
     """
-    1) Зчитати data/processed/simulation_results.csv
+    1) Зчитати результати: частини потокового запису останнього прогону (data/processed/runs/<прогін>/
+       simulation_results.parts/, зокрема незавершеного) або зведену таблицю data/processed/simulation_results
+       (.parquet / .feather / .csv — що є); читаються лише потрібні колонки
     2) Побудувати два графіки: total_cost vs week_start, fill_rate vs week_start
     3) Зберегти зображення або просто відобразити через matplotlib
     """
-    results_path = os.path.abspath(os.path.join(os.path.dirname(__file__), "../../data/processed/simulation_results.csv"))
-    df = pd.read_csv(results_path, parse_dates=["week_start"])
+    # matplotlib — лише тут: імпорт модуля не тягне графічний бекенд
+    import matplotlib.pyplot as plt
+
+    processed_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), "../../data/processed"))
+    columns = ["week_start", "total_cost", "fill_rate"]
+    run_path = latest_run_dir(processed_dir)
+    if run_path is not None:
+        df = read_results(os.path.join(run_path, "simulation_results"), columns=columns, parse_dates=["week_start"])
+    else:
+        results_path = find_table(os.path.join(processed_dir, "simulation_results"))
+        if results_path is None:
+            raise FileNotFoundError("Результати симуляції не знайдено. Спершу запустіть simulation.py.")
+        df = load_table(results_path, columns=columns, parse_dates=["week_start"])
+    df["week_start"] = pd.to_datetime(df["week_start"])
     df = df.sort_values("week_start")
 
     # 1) Графік total_cost
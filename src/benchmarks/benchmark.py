@@ -0,0 +1,371 @@
+import os
+import sys
+import json
+import time
+import platform
+from datetime import date, datetime
+
+import numpy as np
+import pandas as pd
+
+# Етапи бенчмарку у порядку запуску
+STAGES = ("forecast_single", "forecast_batch", "optimize", "supply", "quarter", "startup")
+
+# Модулі, час імпорту яких міряє етап startup (кожен замір — у свіжому інтерпретаторі)
+STARTUP_IMPORTS = ("forecast_agent.forecast_agent", "inventory_agent.inventory_agent", "simulation.simulation")
+
+# Метрика, за якою порівнюємо з baseline (для кожного етапу — медіана латентності)
+COMPARE_METRIC = "p50_s"
+
+
+def make_fixtures(n_stores: int, out_dir: str, seed: int = 0, n_trees: int = 20, train_rows: int = 20_000) -> dict:
+    """
+    Синтетичні фікстури заданого масштабу у out_dir (перевикористовуються, якщо вже існують):
+      • store.csv — ті самі колонки, що й raw store.csv Rossmann;
+      • initial_stock.csv — Store, InitialStock;
+      • model.pkl — RandomForest на синтетичних рядках у форматі FEATURE_COLS.
+    Повертає шляхи {"store_csv", "initial_stock", "model"}.
+    """
+    import joblib
+    from sklearn.ensemble import RandomForestRegressor
+    from forecast_agent.forecast_agent import FEATURE_COLS
+    from data_preparation.store_catalog import STORE_TYPES, ASSORTMENTS
+
+    os.makedirs(out_dir, exist_ok=True)
+    paths = {
+        "store_csv": os.path.join(out_dir, "store.csv"),
+        "initial_stock": os.path.join(out_dir, "initial_stock.csv"),
+        "model": os.path.join(out_dir, "model.pkl"),
+    }
+    if all(os.path.exists(p) for p in paths.values()):
+        return paths
+
+    rng = np.random.default_rng(seed)
+    store_ids = np.arange(1, n_stores + 1)
+    df_store = pd.DataFrame({
+        "Store": store_ids,
+        "StoreType": rng.choice(["a"] + STORE_TYPES, size=n_stores),
+        "Assortment": rng.choice(["a"] + ASSORTMENTS, size=n_stores),
+        "CompetitionDistance": rng.integers(20, 30_000, size=n_stores),
+        "CompetitionOpenSinceMonth": rng.integers(1, 13, size=n_stores),
+        "CompetitionOpenSinceYear": rng.integers(2000, 2015, size=n_stores),
+        "Promo2": rng.integers(0, 2, size=n_stores),
+        "Promo2SinceWeek": np.nan,
+        "Promo2SinceYear": np.nan,
+        "PromoInterval": "",
+    })
+    df_store.to_csv(paths["store_csv"], index=False)
+
+    pd.DataFrame({"Store": store_ids,
+                  "InitialStock": rng.integers(2_000, 10_000, size=n_stores)}).to_csv(paths["initial_stock"], index=False)
+
+    # Синтетичні тренувальні рядки: продажі залежать від дня тижня, типу магазину та конкуренції
+    X = np.zeros((train_rows, len(FEATURE_COLS)))
+    X[:, 0] = rng.integers(1, n_stores + 1, size=train_rows)
+    X[:, 1] = rng.integers(2013, 2016, size=train_rows)
+    X[:, 2] = rng.integers(1, 13, size=train_rows)
+    X[:, 3] = rng.integers(1, 29, size=train_rows)
+    X[:, 8] = rng.integers(20, 30_000, size=train_rows)
+    X[:, 9] = rng.integers(1, 13, size=train_rows)
+    X[:, 10] = rng.integers(2000, 2015, size=train_rows)
+    X[:, 11:16] = rng.integers(0, 2, size=(train_rows, 5))
+    dow = rng.integers(0, 7, size=train_rows)
+    X[np.arange(train_rows)[dow > 0], 15 + dow[dow > 0]] = 1
+    y = 5_000 + 800 * dow + 1_500 * X[:, 12] - 0.05 * X[:, 8] + rng.normal(0, 500, size=train_rows)
+
+    model = RandomForestRegressor(n_estimators=n_trees, max_depth=12, n_jobs=-1, random_state=seed)
+    model.fit(X, np.maximum(y, 0))
+    joblib.dump(model, paths["model"])
+    return paths
+
+
+def summarize(latencies, items_per_call: int = 1) -> dict:
+    """
+    Латентності викликів (с) → кількість, середнє, перцентилі та пропускна здатність (одиниць/с).
+    """
+    lat = np.asarray(latencies, dtype=np.float64)
+    total = float(lat.sum())
+    return {
+        "calls": int(lat.shape[0]),
+        "items_per_call": int(items_per_call),
+        "total_s": total,
+        "mean_s": float(lat.mean()),
+        "p50_s": float(np.percentile(lat, 50)),
+        "p90_s": float(np.percentile(lat, 90)),
+        "p99_s": float(np.percentile(lat, 99)),
+        "min_s": float(lat.min()),
+        "max_s": float(lat.max()),
+        "throughput_per_s": lat.shape[0] * items_per_call / total if total > 0 else float("inf"),
+    }
+
+
+def timed(fn, repeats: int, warmup: int = 1) -> list:
+    """
+    warmup «холостих» викликів fn(), потім repeats замірів → список латентностей (с).
+    """
+    for _ in range(warmup):
+        fn()
+    latencies = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        fn()
+        latencies.append(time.perf_counter() - started)
+    return latencies
+
+
+def peak_rss_mb() -> float:
+    """
+    Пікова резидентна пам'ять поточного процесу (МБ); ru_maxrss у КБ на Linux і в байтах на macOS.
+    """
+    import resource
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024
+
+
+def fresh_python(code: str, repeats: int) -> list:
+    """
+    repeats запусків code у свіжому інтерпретаторі (порожні sys.modules, як у нового процесу app/simulation);
+    code друкує свій замір (с) останнім рядком. Повертає список замірів.
+    """
+    import subprocess
+    src_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [src_dir, os.environ.get("PYTHONPATH")])))
+    latencies = []
+    for _ in range(repeats):
+        out = subprocess.run([sys.executable, "-c", code], env=env, check=True, capture_output=True, text=True)
+        latencies.append(float(out.stdout.strip().splitlines()[-1]))
+    return latencies
+
+
+def run_stage(stage: str, paths: dict, repeats: int = 20, engines=("greedy", "lp")) -> dict:
+    """
+    Один етап на фікстурах paths:
+      • forecast_single — ForecastAgent.predict (1 магазин × 7 днів);
+      • forecast_batch — ForecastAgent.predict_batch (уся мережа × 7 днів);
+      • optimize — InventoryAgent.optimize_orders кожним із engines;
+      • supply — SupplierAgent.process_orders (один день, черга на всю мережу);
+      • quarter — повний квартал: матриця попиту + 13 тижнів VectorSimulation;
+      • startup — холодний старт у свіжому інтерпретаторі: імпорт STARTUP_IMPORTS,
+        ForecastAgent(lazy=True) і перший прогноз (із завантаженням моделі).
+    Повертає словник метрик етапу (+ peak_rss_mb процесу).
+    """
+    from forecast_agent.forecast_agent import ForecastAgent
+    from data_preparation.load_data import load_table
+
+    df_stock = load_table(paths["initial_stock"])
+    store_ids = df_stock["Store"].tolist()
+    n_stores = len(store_ids)
+    start = pd.Timestamp("2025-01-01")
+
+    if stage in ("forecast_single", "forecast_batch", "quarter"):
+        started = time.perf_counter()
+        fa = ForecastAgent(model_path=paths["model"])
+        load_s = time.perf_counter() - started
+
+    if stage == "forecast_single":
+        rng = np.random.default_rng(0)
+        lat = timed(lambda: fa.predict(store_id=int(rng.choice(store_ids)), start_date=start,
+                                       horizon_days=7, store_csv=paths["store_csv"]), repeats)
+        result = {"model_load_s": load_s, **summarize(lat, items_per_call=7)}
+
+    elif stage == "forecast_batch":
+        lat = timed(lambda: fa.predict_batch(store_ids=store_ids, start_date=start,
+                                             horizon_days=7, store_csv=paths["store_csv"]),
+                    max(repeats // 4, 3))
+        result = {"model_load_s": load_s, **summarize(lat, items_per_call=n_stores * 7)}
+
+    elif stage == "optimize":
+        from inventory_agent.inventory_agent import InventoryAgent
+        rng = np.random.default_rng(0)
+        stock = dict(zip(store_ids, df_stock["InitialStock"].tolist()))
+        demands = dict(zip(store_ids, rng.integers(20_000, 60_000, size=n_stores).tolist()))
+        ia = InventoryAgent(alpha=5, beta=1, Q_max=30_000 * max(n_stores // 1000, 1), initial_stock=stock)
+        result = {}
+        for engine in engines:
+            # GA дорогий на великих мережах — для нього менше повторів
+            n = max(repeats // 10, 1) if engine == "ga" else max(repeats // 4, 3)
+            lat = timed(lambda: ia.optimize_orders(demands, engine=engine), n, warmup=0 if engine == "ga" else 1)
+            result[engine] = {"cost": ia.last_run_stats["cost"], **summarize(lat, items_per_call=n_stores)}
+
+    elif stage == "supply":
+        from supplier_agent.supplier_agent import SupplierAgent
+
+        class _Stock:
+            def __init__(self):
+                self.stock = dict.fromkeys(store_ids, 0)
+
+        rng = np.random.default_rng(0)
+        qty = rng.integers(1, 200, size=n_stores).tolist()
+        order_day = date(2025, 1, 1)
+
+        def one_day():
+            # Черга на всю мережу, ліміт дня відвантажує приблизно половину
+            supplier = SupplierAgent(delivery_delay_days=0, daily_limit=sum(qty) // 2)
+            for sid, q in zip(store_ids, qty):
+                supplier.place_order(sid, q, order_day)
+            supplier.process_orders(order_day, _Stock())
+
+        lat = timed(one_day, repeats)
+        result = summarize(lat, items_per_call=n_stores)
+
+    elif stage == "quarter":
+        from simulation.vector_engine import VectorSimulation, build_demand_matrix
+        n_weeks = 13
+        started = time.perf_counter()
+        demand = build_demand_matrix(fa, store_ids, start.date(), n_weeks * 7, paths["store_csv"])
+        demand_s = time.perf_counter() - started
+        sim = VectorSimulation(store_ids=store_ids,
+                               initial_stock=df_stock["InitialStock"].values,
+                               demand=demand,
+                               start_date=start.date(),
+                               Q_max=30_000 * max(n_stores // 1000, 1),
+                               engine="greedy")
+        week_lat = []
+        for _ in range(n_weeks):
+            started = time.perf_counter()
+            sim.run_week()
+            week_lat.append(time.perf_counter() - started)
+        result = {"model_load_s": load_s, "demand_matrix_s": demand_s,
+                  "quarter_s": load_s + demand_s + sum(week_lat),
+                  **summarize(week_lat, items_per_call=n_stores * 7)}
+    elif stage == "startup":
+        n = max(repeats // 4, 3)
+        result = {}
+        for module in STARTUP_IMPORTS:
+            code = f"import time; t = time.perf_counter(); import {module}; print(time.perf_counter() - t)"
+            result[module] = summarize(fresh_python(code, n))
+        agent_code = ("import time; t = time.perf_counter(); "
+                      "from forecast_agent.forecast_agent import ForecastAgent; "
+                      f"fa = ForecastAgent(model_path={paths['model']!r}, lazy=True); ")
+        result["lazy_agent"] = summarize(fresh_python(agent_code + "print(time.perf_counter() - t)", n))
+        first_forecast = (f"fa.predict(store_id={int(store_ids[0])}, start_date='2025-01-01', horizon_days=7, "
+                          f"store_csv={paths['store_csv']!r}); print(time.perf_counter() - t)")
+        result["first_forecast"] = summarize(fresh_python(agent_code + first_forecast, n))
+    else:
+        raise ValueError(f"Невідомий етап {stage!r}; доступні: {STAGES}")
+
+    result["peak_rss_mb"] = peak_rss_mb()
+    return result
+
+
+def _run_isolated(stage: str, paths: dict, repeats: int, engines) -> dict:
+    """
+    Етап в окремому процесі (spawn): чисті кеші та власний peak RSS на кожен етап.
+    """
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor
+    # не Pool: його воркери — daemon-процеси, в яких sklearn не може розпаралелити predict
+    with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as executor:
+        return executor.submit(run_stage, stage, paths, repeats, engines).result()
+
+
+def run_benchmarks(scales=(100, 1000, 10_000),
+                   fixtures_dir: str = None,
+                   stages=STAGES,
+                   repeats: int = 20,
+                   engines=("greedy", "lp"),
+                   isolate: bool = True,
+                   seed: int = 0) -> dict:
+    """
+    Прогін усіх етапів для кожного масштабу (кількість магазинів).
+    Повертає {"meta": {...}, "results": {"<n_stores>": {stage: metrics}}}.
+    """
+    import sklearn
+
+    fixtures_dir = fixtures_dir or os.path.abspath(os.path.join(os.path.dirname(__file__),
+                                                                "../../data/benchmarks/fixtures"))
+    report = {
+        "meta": {
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "pandas": pd.__version__,
+            "sklearn": sklearn.__version__,
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "repeats": repeats,
+            "seed": seed,
+        },
+        "results": {},
+    }
+    for n_stores in scales:
+        paths = make_fixtures(n_stores, os.path.join(fixtures_dir, f"stores_{n_stores}"), seed=seed)
+        scale_results = {}
+        for stage in stages:
+            print(f"[benchmark] {n_stores} магазинів: {stage}...")
+            runner = _run_isolated if isolate else run_stage
+            scale_results[stage] = runner(stage, paths, repeats, tuple(engines))
+        report["results"][str(n_stores)] = scale_results
+    return report
+
+
+def _flatten(report: dict) -> dict:
+    """
+    {(масштаб, етап[, engine]): metrics} — плоский вигляд для порівняння.
+    """
+    flat = {}
+    for scale, stages in report["results"].items():
+        for stage, metrics in stages.items():
+            if COMPARE_METRIC in metrics:
+                flat[f"{scale}/{stage}"] = metrics
+            else:
+                for sub, sub_metrics in metrics.items():
+                    if isinstance(sub_metrics, dict) and COMPARE_METRIC in sub_metrics:
+                        flat[f"{scale}/{stage}/{sub}"] = sub_metrics
+    return flat
+
+
+def compare(report: dict, baseline: dict, threshold: float = 0.10) -> list:
+    """
+    Порівнює COMPARE_METRIC з baseline. Повертає список регресій
+    [{"key", "baseline", "current", "ratio"}] — тих, що повільніші більш ніж на threshold.
+    """
+    current, base = _flatten(report), _flatten(baseline)
+    regressions = []
+    for key in sorted(current.keys() & base.keys()):
+        old, new = base[key][COMPARE_METRIC], current[key][COMPARE_METRIC]
+        ratio = new / old if old > 0 else float("inf")
+        flag = "РЕГРЕСІЯ" if ratio > 1 + threshold else ("краще" if ratio < 1 - threshold else "")
+        print(f"[benchmark.compare] {key:40s} {old * 1e3:10.2f} ms → {new * 1e3:10.2f} ms  x{ratio:5.2f} {flag}")
+        if ratio > 1 + threshold:
+            regressions.append({"key": key, "baseline": old, "current": new, "ratio": ratio})
+    return regressions
+
+
+def save_report(report: dict, path: str) -> None:
+    """
+    Зберігає звіт у JSON.
+    """
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"[benchmark] Звіт збережено у {path}")
+
+
+if __name__ == "__main__":
+    # Параметри:
+    #   --stores 100,1000,10000   масштаби (кількість магазинів)
+    #   --stages forecast_batch,quarter   підмножина STAGES
+    #   --engines greedy,lp,ga   двигуни для етапу optimize
+    #   --repeats N   --no-isolate (усі етапи в одному процесі)
+    #   --out report.json   --baseline baseline.json [--threshold 0.1]   --save-baseline
+    def arg(name, default):
+        return sys.argv[sys.argv.index(name) + 1] if name in sys.argv else default
+
+    bench_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), "../../data/benchmarks"))
+    report = run_benchmarks(scales=[int(s) for s in arg("--stores", "100,1000,10000").split(",")],
+                            stages=arg("--stages", ",".join(STAGES)).split(","),
+                            repeats=int(arg("--repeats", 20)),
+                            engines=arg("--engines", "greedy,lp").split(","),
+                            isolate="--no-isolate" not in sys.argv)
+    save_report(report, arg("--out", os.path.join(bench_dir, "latest.json")))
+
+    baseline_path = arg("--baseline", os.path.join(bench_dir, "baseline.json"))
+    if "--save-baseline" in sys.argv:
+        save_report(report, baseline_path)
+    elif os.path.exists(baseline_path):
+        with open(baseline_path, encoding="utf-8") as f:
+            regressions = compare(report, json.load(f), threshold=float(arg("--threshold", 0.10)))
+        if regressions:
+            print(f"[benchmark] Регресій: {len(regressions)}")
+            sys.exit(1)
@@ -0,0 +1,219 @@
+import os
+import numpy as np
+import pandas as pd
+
+# Ознаки історії продажів у порядку колонок (додаються після FEATURE_COLS)
+#   Sales_lag7   — продажі того самого дня тижня в останньому відомому тижні
+#   Sales_mean7  — середні продажі за 7 днів до точки прогнозу (лише відкриті дні)
+#   Sales_mean28 — те саме за 28 днів
+LAG_FEATURES = ["Sales_lag7", "Sales_mean7", "Sales_mean28"]
+
+# Глибина історії, яку тримає кільцевий буфер (днів)
+WINDOW = 28
+SHORT_WINDOW = 7
+
+# Файл стану сховища на кінець даних у data/processed (пише preprocess --lags, читає ForecastAgent)
+FEATURE_STORE_FILE = "sales_feature_store.npz"
+
+# Порядковий номер дня: кількість днів від 1970-01-01 (як datetime64[D])
+_EPOCH = np.datetime64("1970-01-01", "D")
+
+
+def day_number(dates) -> np.ndarray:
+    """
+    Дати (Timestamp / datetime64 / date або їх масив) → int64 днів від 1970-01-01.
+    """
+    return (np.asarray(pd.to_datetime(dates), dtype="datetime64[D]") - _EPOCH).astype(np.int64)
+
+
+class SalesFeatureStore:
+    """
+    Інкрементальне сховище ознак історії продажів для всіх магазинів.
+    Стан — компактні масиви, індексовані Store ID (як у StoreCatalog):
+      • values (max_store_id + 1, WINDOW) float32 — кільцевий буфер щоденних продажів
+        (NaN — день без даних: магазин зачинений або рядка немає);
+      • sum7/cnt7, sum28/cnt28 — біжучі суми й кількості відомих днів у вікнах 7 і 28 днів.
+    append_day оновлює всі магазини за O(stores) (один стовпчик буфера + біжучі суми);
+    features — O(1) на магазин і день, без groupby/rolling по історії.
+    Ознаки рахуються «на момент» наступного після last_day дня (точки прогнозу).
+    """
+
+    def __init__(self, max_store_id: int = 0):
+        n = int(max_store_id) + 1
+        self.values = np.full((n, WINDOW), np.nan, dtype=np.float32)
+        self.sum7 = np.zeros(n)
+        self.cnt7 = np.zeros(n, dtype=np.int32)
+        self.sum28 = np.zeros(n)
+        self.cnt28 = np.zeros(n, dtype=np.int32)
+        self.head = 0          # стовпчик буфера, куди буде записано наступний день
+        self.last_day = None   # номер останнього доданого дня (day_number)
+
+    def _ensure_capacity(self, max_store_id: int) -> None:
+        """
+        Розширює масиви, якщо з'явився магазин із більшим ID.
+        """
+        n = int(max_store_id) + 1
+        extra = n - self.values.shape[0]
+        if extra <= 0:
+            return
+        self.values = np.vstack([self.values, np.full((extra, WINDOW), np.nan, dtype=np.float32)])
+        self.sum7 = np.concatenate([self.sum7, np.zeros(extra)])
+        self.cnt7 = np.concatenate([self.cnt7, np.zeros(extra, dtype=np.int32)])
+        self.sum28 = np.concatenate([self.sum28, np.zeros(extra)])
+        self.cnt28 = np.concatenate([self.cnt28, np.zeros(extra, dtype=np.int32)])
+
+    @staticmethod
+    def _drop(total: np.ndarray, count: np.ndarray, old: np.ndarray) -> None:
+        known = ~np.isnan(old)
+        total[known] -= old[known]
+        count[known] -= 1
+
+    def _push(self, new: np.ndarray) -> None:
+        """
+        Записує стовпчик нового дня (stores,) і зсуває обидва вікна.
+        """
+        col = self.head
+        # із 28-денного вікна виходить день, що перезаписується; із 7-денного — день 7 днів тому
+        self._drop(self.sum28, self.cnt28, self.values[:, col])
+        self._drop(self.sum7, self.cnt7, self.values[:, (col - SHORT_WINDOW) % WINDOW])
+        self.values[:, col] = new
+        known = ~np.isnan(new)
+        self.sum28[known] += new[known]
+        self.cnt28 += known
+        self.sum7[known] += new[known]
+        self.cnt7 += known
+        self.head = (col + 1) % WINDOW
+
+    def append_day(self, day: int, store_ids, sales) -> None:
+        """
+        Додає фактичні продажі одного дня (day — day_number) для store_ids; решта магазинів — без даних.
+        Дні мають іти за зростанням; пропущені дні заповнюються як «без даних».
+        """
+        store_ids = np.asarray(store_ids, dtype=np.int64).ravel()
+        if store_ids.size:
+            self._ensure_capacity(store_ids.max())
+        if self.last_day is not None:
+            if day <= self.last_day:
+                raise ValueError(f"День {day} не пізніший за останній доданий ({self.last_day}).")
+            gap = day - self.last_day - 1
+            if gap >= WINDOW:
+                self.reset_history()
+            else:
+                empty = np.full(self.values.shape[0], np.nan, dtype=np.float32)
+                for _ in range(gap):
+                    self._push(empty)
+        new = np.full(self.values.shape[0], np.nan, dtype=np.float32)
+        new[store_ids] = np.asarray(sales, dtype=np.float32).ravel()
+        self._push(new)
+        self.last_day = int(day)
+
+    def copy(self) -> "SalesFeatureStore":
+        """
+        Незалежна копія стану (напр. для рекурсивного прогнозу, що дописує прогнози як продажі).
+        """
+        store = SalesFeatureStore(0)
+        store.values = self.values.copy()
+        store.sum7, store.cnt7 = self.sum7.copy(), self.cnt7.copy()
+        store.sum28, store.cnt28 = self.sum28.copy(), self.cnt28.copy()
+        store.head = self.head
+        store.last_day = self.last_day
+        return store
+
+    def reset_history(self) -> None:
+        """
+        Забуває всю історію (розмір за магазинами зберігається).
+        """
+        self.values[:] = np.nan
+        self.sum7[:] = 0
+        self.cnt7[:] = 0
+        self.sum28[:] = 0
+        self.cnt28[:] = 0
+        self.head = 0
+
+    def features(self, store_ids, target_days) -> np.ndarray:
+        """
+        Ознаки LAG_FEATURES для магазинів × днів прогнозу: (len(store_ids), len(target_days), 3).
+        Середні — на момент точки прогнозу (last_day + 1); Sales_lag7 — той самий день тижня
+        в останньому відомому тижні. Пропуски: lag7 → mean7 → mean28 → 0.
+        """
+        store_ids = np.asarray(store_ids, dtype=np.int64).ravel()
+        target_days = np.asarray(target_days, dtype=np.int64).ravel()
+        out = np.zeros((store_ids.shape[0], target_days.shape[0], len(LAG_FEATURES)))
+        if self.last_day is None or store_ids.size == 0:
+            return out
+        # Магазини поза межами масивів (нові) — без історії
+        inside = store_ids < self.values.shape[0]
+        rows = np.where(inside, store_ids, 0)
+
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mean28 = np.where(inside & (self.cnt28[rows] > 0), self.sum28[rows] / self.cnt28[rows], 0.0)
+            mean7 = np.where(inside & (self.cnt7[rows] > 0), self.sum7[rows] / self.cnt7[rows], mean28)
+
+        # День останнього відомого тижня з тим самим днем тижня, що й target_day
+        origin = self.last_day + 1
+        back = SHORT_WINDOW - (target_days - origin) % SHORT_WINDOW    # 1..7 днів до origin
+        cols = (self.head - back) % WINDOW
+        lag7 = self.values[rows[:, None], cols[None, :]].astype(np.float64)
+        lag7 = np.where(np.isnan(lag7) | ~inside[:, None], mean7[:, None], lag7)
+
+        out[:, :, 0] = lag7
+        out[:, :, 1] = mean7[:, None]
+        out[:, :, 2] = mean28[:, None]
+        return out
+
+    def save(self, path: str) -> None:
+        """
+        Зберігає стан у .npz (атомарно: через тимчасовий файл).
+        """
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        tmp_path = path + ".tmp.npz"
+        np.savez(tmp_path, values=self.values, sum7=self.sum7, cnt7=self.cnt7,
+                 sum28=self.sum28, cnt28=self.cnt28,
+                 head=self.head, last_day=-1 if self.last_day is None else self.last_day)
+        os.replace(tmp_path, path)
+        print(f"[SalesFeatureStore.save] Стан ({self.values.shape[0] - 1} max Store ID) збережено у {path}")
+
+    @classmethod
+    def load(cls, path: str) -> "SalesFeatureStore":
+        """
+        Відновлює стан, збережений save().
+        """
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"Сховище ознак {path} не знайдено.")
+        data = np.load(path)
+        store = cls(0)
+        store.values = data["values"]
+        store.sum7, store.cnt7 = data["sum7"], data["cnt7"]
+        store.sum28, store.cnt28 = data["sum28"], data["cnt28"]
+        store.head = int(data["head"])
+        store.last_day = None if int(data["last_day"]) < 0 else int(data["last_day"])
+        return store
+
+
+def add_lag_features(df: pd.DataFrame, store: SalesFeatureStore = None):
+    """
+    Додає LAG_FEATURES до підготовленого датафрейму (колонки Store, Date, Sales) одним проходом
+    по днях за зростанням: ознаки рядків дня беруться до того, як день потрапляє у сховище
+    (без витоку цільової змінної). Загалом O(рядків + днів × stores).
+    Повертає (df з новими колонками, у початковому порядку рядків; сховище на кінець даних).
+    """
+    if store is None:
+        store = SalesFeatureStore(int(df["Store"].max()) if len(df) else 0)
+    days = day_number(df["Date"].values)
+    order = np.argsort(days, kind="stable")
+    days_sorted = days[order]
+    stores_sorted = df["Store"].to_numpy(dtype=np.int64)[order]
+    sales_sorted = df["Sales"].to_numpy(dtype=np.float64)[order]
+
+    feats = np.zeros((len(df), len(LAG_FEATURES)))
+    unique_days, starts = np.unique(days_sorted, return_index=True)
+    bounds = np.append(starts, len(df))
+    for day, start, stop in zip(unique_days, bounds[:-1], bounds[1:]):
+        store_ids = stores_sorted[start:stop]
+        feats[order[start:stop]] = store.features(store_ids, [day])[:, 0, :]
+        store.append_day(int(day), store_ids, sales_sorted[start:stop])
+
+    df = df.copy()
+    for i, col in enumerate(LAG_FEATURES):
+        df[col] = feats[:, i]
+    return df, store
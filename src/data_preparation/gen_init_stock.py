@@ -2,11 +2,13 @@ import pandas as pd
 import numpy as np
 import os
 
+from load_data import save_table
+
 def generate_initial_stock(raw_dir: str, output_path: str, low: int = 300, high: int = 500):
     """
     Згенерувати початкові запаси (300–500 одиниць) для кожного магазину,
     взявши список унікальних Store з train.csv або store.csv.
-    Зберегти у CSV: columns = ["Store", "InitialStock"]
+    Зберегти у CSV (або .parquet / .feather — за розширенням output_path): columns = ["Store", "InitialStock"]
     """
     # Читаємо унікальні ідентифікатори магазинів
     stores = pd.read_csv(os.path.join(raw_dir, "store.csv"))["Store"].unique()
@@ -15,7 +17,7 @@ def generate_initial_stock(raw_dir: str, output_path: str, low: int = 300, high:
     initial_stock = np.random.randint(low, high + 1, size=len(stores))
 
     df_stock = pd.DataFrame({"Store": stores, "InitialStock": initial_stock})
-    df_stock.to_csv(output_path, index=False)
+    save_table(df_stock, output_path)
     print(f"[generate_initial_stock] Початкові запаси збережено у {output_path}")
 
 
@@ -1,3 +1,4 @@
+import numpy as np
 import pandas as pd
 import os
 
@@ -24,3 +25,117 @@ def load_store(data_dir: str) -> pd.DataFrame:
     path = os.path.join(data_dir, "store.csv")
     df = pd.read_csv(path)
     return df
+
+def load_train_chunks(data_dir: str, chunksize: int = 100_000, usecols=None):
+    """
+    Ітератор по train.csv частинами по chunksize рядків (для потокової обробки).
+    StateHoliday читаємо як рядок, щоб тип не залежав від вмісту конкретного чанка.
+    """
+    path = os.path.join(data_dir, "train.csv")
+    parse_dates = ["Date"] if usecols is None or "Date" in usecols else None
+    return pd.read_csv(path, parse_dates=parse_dates, usecols=usecols,
+                       dtype={"StateHoliday": str}, chunksize=chunksize)
+
+# Підтримувані формати таблиць (за розширенням файлу); CSV лишається опцією експорту
+TABLE_FORMATS = {".csv": "csv", ".parquet": "parquet", ".feather": "feather"}
+
+
+def downcast_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Зменшує типи колонок: цілі → найменший знаковий int, дійсні → float32.
+    bool, дати та рядки не змінюються.
+    """
+    df = df.copy()
+    for col in df.columns:
+        if pd.api.types.is_bool_dtype(df[col]):
+            continue
+        if pd.api.types.is_integer_dtype(df[col]):
+            df[col] = pd.to_numeric(df[col], downcast="integer")
+        elif pd.api.types.is_float_dtype(df[col]):
+            df[col] = df[col].astype("float32")
+    return df
+
+
+def save_table(df: pd.DataFrame, path: str, downcast: bool = True) -> None:
+    """
+    Зберігає таблицю у форматі за розширенням path: .csv, .parquet або .feather.
+    Для колонкових форматів типи попередньо зменшуються (downcast_frame).
+    """
+    fmt = TABLE_FORMATS.get(os.path.splitext(path)[1].lower())
+    if fmt is None:
+        raise ValueError(f"Невідомий формат таблиці: {path} (підтримуються {list(TABLE_FORMATS)})")
+    if fmt == "csv":
+        df.to_csv(path, index=False)
+        return
+    if downcast:
+        df = downcast_frame(df)
+    df = df.reset_index(drop=True)
+    if fmt == "parquet":
+        df.to_parquet(path, index=False)
+    else:
+        df.to_feather(path)
+
+
+def load_table(path: str, columns=None, parse_dates=None) -> pd.DataFrame:
+    """
+    Завантажує таблицю у форматі за розширенням path (.csv, .parquet, .feather).
+    columns — лише потрібні колонки (для колонкових форматів решта навіть не читається);
+    parse_dates — лише для CSV (у колонкових форматах дати зберігаються типізовано).
+    """
+    fmt = TABLE_FORMATS.get(os.path.splitext(path)[1].lower())
+    if fmt is None:
+        raise ValueError(f"Невідомий формат таблиці: {path} (підтримуються {list(TABLE_FORMATS)})")
+    if fmt == "csv":
+        return pd.read_csv(path, usecols=columns, parse_dates=parse_dates)
+    if fmt == "parquet":
+        return pd.read_parquet(path, columns=columns)
+    return pd.read_feather(path, columns=columns)
+
+
+def find_table(base_path: str) -> str:
+    """
+    Для шляху без розширення (або з будь-яким із підтримуваних) повертає перший
+    наявний файл у порядку .parquet → .feather → .csv; None, якщо жодного немає.
+    """
+    root, ext = os.path.splitext(base_path)
+    if ext.lower() not in TABLE_FORMATS:
+        root = base_path
+    for candidate_ext in (".parquet", ".feather", ".csv"):
+        candidate = root + candidate_ext
+        if os.path.exists(candidate):
+            return candidate
+    return None
+
+
+def save_feature_matrix(df: pd.DataFrame, path_prefix: str, feature_cols: list, target: str = "Sales") -> None:
+    """
+    Зберігає матрицю ознак для memory-map завантаження:
+      <path_prefix>.X.npy    — float32 (rows, len(feature_cols))
+      <path_prefix>.y.npy    — float32 (rows,)
+      <path_prefix>.meta.json — порядок колонок і назва цільової
+    """
+    import json
+    np.save(path_prefix + ".X.npy", np.ascontiguousarray(df[feature_cols].to_numpy(dtype=np.float32)))
+    np.save(path_prefix + ".y.npy", df[target].to_numpy(dtype=np.float32))
+    with open(path_prefix + ".meta.json", "w") as f:
+        json.dump({"columns": list(feature_cols), "target": target, "rows": int(len(df))}, f, indent=2)
+
+
+def load_feature_matrix(path_prefix: str, mmap_mode: str = "r"):
+    """
+    Завантажує (X, y, columns), збережені save_feature_matrix.
+    За замовчуванням X та y відображаються в пам'ять (mmap) замість читання у RAM.
+    """
+    import json
+    with open(path_prefix + ".meta.json") as f:
+        meta = json.load(f)
+    X = np.load(path_prefix + ".X.npy", mmap_mode=mmap_mode)
+    y = np.load(path_prefix + ".y.npy", mmap_mode=mmap_mode)
+    return X, y, meta["columns"]
+
+
+def has_feature_matrix(path_prefix: str) -> bool:
+    """
+    Чи існує матриця ознак <path_prefix>.X.npy (разом із y та meta).
+    """
+    return all(os.path.exists(path_prefix + suffix) for suffix in (".X.npy", ".y.npy", ".meta.json"))
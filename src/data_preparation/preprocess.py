@@ -1,75 +1,169 @@
 import pandas as pd
 import numpy as np
 import os
+import sys
 
-from load_data import load_train, load_store
+from load_data import load_train, load_train_chunks, save_table, save_feature_matrix
+from store_catalog import StoreCatalog, STATIC_FEATURES
+from feature_store import LAG_FEATURES, FEATURE_STORE_FILE, add_lag_features
 
-def preprocess_and_save(raw_dir: str, processed_dir: str):
-    """
-    1) Завантажує train.csv та store.csv
-    2) Об’єднує їх
-    3) Створює додаткові фічі (year, month, day, day_of_week, is_holiday тощо)
-    4) Закодовує категоріальні змінні (StoreType, Assortment) через one-hot
-    5) Видаляє дні, коли магазин був зачинений (Open == 0)
-    6) Розбиває на train/validation за датою (останні 6 тижнів як валідація)
-    7) Зберігає готові CSV у data/processed
-    """
-    # Створюємо папку processed, якщо нема
-    if not os.path.exists(processed_dir):
-        os.makedirs(processed_dir)
+# Фіксована схема ознак: однакові колонки для будь-якого чанка даних
+BASE_FEATURES = [
+    "Store",
+    "Year", "Month", "Day",
+    "Customers", "Promo", "SchoolHoliday", "IsHoliday",
+]
+DAY_OF_WEEK_COLUMNS = [f"DayOfWeek_{d}" for d in range(2, 8)]  # базова – DayOfWeek_1
+FEATURES = BASE_FEATURES + STATIC_FEATURES + DAY_OF_WEEK_COLUMNS
+
+# Останні 6 тижнів (42 дні) — validation
+VALIDATION_DAYS = 42
 
-    # 1. Завантаження
-    df_train = load_train(raw_dir)
-    df_store = load_store(raw_dir)
 
+def _derive_features(df: pd.DataFrame, df_store: pd.DataFrame) -> pd.DataFrame:
+    """
+    Кроки 2–5 для довільного шматка train.csv:
+    merge зі статичними фічами магазинів, фічі з дати, фільтр Open == 1,
+    дами для DayOfWeek за фіксованою схемою, видалення пропусків.
+    Повертає датафрейм із колонками FEATURES + ["Sales", "Date"].
+    """
     # 2. Об’єднати за "Store"
-    df = pd.merge(df_train, df_store, on="Store", how="left")
+    df = pd.merge(df, df_store, on="Store", how="left")
 
     # 3. Фічі з дати
     df["Year"] = df["Date"].dt.year
     df["Month"] = df["Date"].dt.month
     df["Day"] = df["Date"].dt.day
-    df["DayOfWeek"] = df["DayOfWeek"].astype(str)  # зробимо string, щоб one-hot пішов
-    df["IsHoliday"] = np.where(df["StateHoliday"] != "0", 1, 0)
+    # StateHoliday у сирих даних буває і "0", і 0 — порівнюємо як рядок
+    df["IsHoliday"] = np.where(df["StateHoliday"].astype(str) != "0", 1, 0)
 
     # 4. Видалити дні, коли Open == 0
     df = df[df["Open"] == 1].copy()
 
-    # 5. One-hot для StoreType та Assortment
-    df["StoreType"] = df["StoreType"].astype(str)
-    df["Assortment"] = df["Assortment"].astype(str)
-    df = pd.get_dummies(df, columns=["StoreType", "Assortment", "DayOfWeek"], drop_first=True)
+    # 5. One-hot для DayOfWeek (StoreType_* та Assortment_* прийшли з каталогу);
+    # колонки задані заздалегідь, тож чанк без якогось дня тижня має ту саму схему
+    for col in DAY_OF_WEEK_COLUMNS:
+        df[col] = df["DayOfWeek"].astype(int) == int(col.rsplit("_", 1)[1])
+
+    # 6. В результаті нам потрібен датафрейм з цими фічами та цільовою змінною Sales;
+    # видаляємо рядки з пропусками (якщо є)
+    return df[FEATURES + ["Sales", "Date"]].dropna().reset_index(drop=True)
 
-    # 6. Вибрані фічі
-    features = [
-        "Store",
-        "Year", "Month", "Day",
-        "Customers", "Promo", "SchoolHoliday", "IsHoliday",
-        "CompetitionDistance", "CompetitionOpenSinceMonth", "CompetitionOpenSinceYear",
-    ]
-    # Додаємо всі нові даммі: StoreType_*, Assortment_*, DayOfWeek_*
-    dummy_cols = [col for col in df.columns if col.startswith("StoreType_") or col.startswith("Assortment_") or col.startswith("DayOfWeek_")]
-    features += dummy_cols
 
-    # В результаті нам потрібен датафрейм з цими фічами та цільовою змінною Sales
-    df_final = df[features + ["Sales", "Date"]].copy()
+# Формати збереження підготовлених даних: розширення файлу або "npy" (матриця ознак для mmap)
+OUTPUT_FORMATS = ("csv", "parquet", "feather", "npy")
 
-    # Видаляємо рядки з пропусками (якщо є)
-    df_final = df_final.dropna().reset_index(drop=True)
+
+def _save_split(df: pd.DataFrame, processed_dir: str, name: str, fmt: str, features=FEATURES) -> str:
+    """
+    Зберігає train/validation у заданому форматі; повертає шлях (для npy — префікс файлів).
+    """
+    if fmt == "npy":
+        path = os.path.join(processed_dir, name)
+        save_feature_matrix(df, path, features, target="Sales")
+    else:
+        path = os.path.join(processed_dir, f"{name}.{fmt}")
+        save_table(df, path)
+    return path
+
+
+def preprocess_and_save(raw_dir: str, processed_dir: str, fmt: str = "csv", lags: bool = False):
+    """
+    1) Завантажує train.csv та статичні фічі магазинів (StoreCatalog зі store.csv)
+    2) Об’єднує їх
+    3) Створює додаткові фічі (year, month, day, day_of_week, is_holiday тощо)
+    4) Закодовує категоріальні змінні (StoreType, Assortment — вже в каталозі; DayOfWeek) через one-hot
+    5) Видаляє дні, коли магазин був зачинений (Open == 0)
+    6) Розбиває на train/validation за датою (останні 6 тижнів як валідація)
+    7) Зберігає готові дані у data/processed у форматі fmt:
+       "csv" (за замовчуванням), "parquet"/"feather" зі зменшеними типами,
+       або "npy" — матриця ознак float32 для memory-map (<name>.X.npy, .y.npy, .meta.json)
+    lags=True — додатково ознаки історії продажів LAG_FEATURES (feature_store.add_lag_features,
+    один прохід по днях), а стан сховища на останній день зберігається у FEATURE_STORE_FILE,
+    звідки його бере ForecastAgent для прогнозу.
+    """
+    if fmt not in OUTPUT_FORMATS:
+        raise ValueError(f"Невідомий формат {fmt!r}; доступні: {OUTPUT_FORMATS}")
+
+    # Створюємо папку processed, якщо нема
+    if not os.path.exists(processed_dir):
+        os.makedirs(processed_dir)
+
+    # 1. Завантаження
+    df_train = load_train(raw_dir)
+    # Той самий каталог, що й у ForecastAgent: CompetitionOpenSince* заповнені 0,
+    # StoreType/Assortment уже закодовані в дами
+    catalog = StoreCatalog.for_path(os.path.join(raw_dir, "store.csv"))
+
+    # 2–6. Фічі
+    df_final = _derive_features(df_train, catalog.to_frame())
+    features = FEATURES
+    if lags:
+        df_final, feature_store = add_lag_features(df_final)
+        feature_store.save(os.path.join(processed_dir, FEATURE_STORE_FILE))
+        features = FEATURES + LAG_FEATURES
 
     # 7. Розбиваємо на train / validation
-    # Візьмемо останні 6 тижнів (42 дні) як validation
-    cutoff_date = df_final["Date"].max() - pd.Timedelta(days=42)
+    cutoff_date = df_final["Date"].max() - pd.Timedelta(days=VALIDATION_DAYS)
     df_train_prepared = df_final[df_final["Date"] <= cutoff_date].copy()
     df_val_prepared = df_final[df_final["Date"] > cutoff_date].copy()
 
     # Зберігаємо
+    train_path = _save_split(df_train_prepared, processed_dir, "train_prepared", fmt, features)
+    val_path = _save_split(df_val_prepared, processed_dir, "validation", fmt, features)
+
+    print(f"[preprocess] Підготовлені дані збережено у:\n  {train_path}\n  {val_path}")
+
+
+def preprocess_and_save_streaming(raw_dir: str, processed_dir: str,
+                                  chunksize: int = 100_000, cutoff_date=None):
+    """
+    Потоковий варіант preprocess_and_save з пам'яттю, обмеженою розміром чанка:
+    1) (якщо cutoff_date не задано) перший легкий прохід лише по колонках Date/Open,
+       щоб знайти останню дату й межу validation (останні 42 дні)
+    2) train.csv читається частинами по chunksize рядків
+    3) кожен чанк проходить ті самі кроки, що й у preprocess_and_save (фіксована схема дамі)
+    4) рядки розводяться у train/validation за датою і дописуються у CSV інкрементально
+    (колонкові формати потребують усієї таблиці — їх можна отримати з CSV через save_table;
+    LAG_FEATURES тут не рахуються: для них потрібен прохід по днях за зростанням, див. preprocess_and_save)
+    """
+    if not os.path.exists(processed_dir):
+        os.makedirs(processed_dir)
+
+    # 1. Межа train/validation
+    if cutoff_date is None:
+        max_date = None
+        for chunk in load_train_chunks(raw_dir, chunksize=chunksize, usecols=["Date", "Open"]):
+            chunk_max = chunk.loc[chunk["Open"] == 1, "Date"].max()
+            if pd.notna(chunk_max) and (max_date is None or chunk_max > max_date):
+                max_date = chunk_max
+        if max_date is None:
+            raise ValueError(f"У {raw_dir}/train.csv немає жодного дня з Open == 1.")
+        cutoff_date = max_date - pd.Timedelta(days=VALIDATION_DAYS)
+    cutoff_date = pd.Timestamp(cutoff_date)
+
+    catalog = StoreCatalog.for_path(os.path.join(raw_dir, "store.csv"))
+    df_store = catalog.to_frame()
+
     train_path = os.path.join(processed_dir, "train_prepared.csv")
     val_path = os.path.join(processed_dir, "validation.csv")
-    df_train_prepared.to_csv(train_path, index=False)
-    df_val_prepared.to_csv(val_path, index=False)
+    for path in (train_path, val_path):
+        if os.path.exists(path):
+            os.remove(path)
 
-    print(f"[preprocess] Підготовлені дані збережено у:\n  {train_path}\n  {val_path}")
+    # 2–4. Чанки → фічі → дописування у відповідний файл
+    rows = {train_path: 0, val_path: 0}
+    for chunk in load_train_chunks(raw_dir, chunksize=chunksize):
+        df_chunk = _derive_features(chunk, df_store)
+        is_val = df_chunk["Date"] > cutoff_date
+        for path, part in ((train_path, df_chunk[~is_val]), (val_path, df_chunk[is_val])):
+            if part.empty:
+                continue
+            part.to_csv(path, mode="a", header=rows[path] == 0, index=False)
+            rows[path] += len(part)
+
+    print(f"[preprocess] Потокова підготовка (cutoff {cutoff_date.date()}): "
+          f"{rows[train_path]} train / {rows[val_path]} validation рядків збережено у:\n  {train_path}\n  {val_path}")
 
 
 if __name__ == "__main__":
@@ -79,4 +173,9 @@ if __name__ == "__main__":
     raw_directory = os.path.abspath(raw_directory)
     processed_directory = os.path.abspath(processed_directory)
 
-    preprocess_and_save(raw_directory, processed_directory)
+    if "--stream" in sys.argv:
+        preprocess_and_save_streaming(raw_directory, processed_directory)
+    else:
+        # --format parquet|feather|npy (за замовчуванням csv); --lags — ознаки історії продажів
+        output_format = sys.argv[sys.argv.index("--format") + 1] if "--format" in sys.argv else "csv"
+        preprocess_and_save(raw_directory, processed_directory, fmt=output_format, lags="--lags" in sys.argv)
@@ -0,0 +1,112 @@
+import os
+import numpy as np
+import pandas as pd
+
+# Статичні фічі магазину у тому ж порядку, що й у тренувальному датасеті
+STATIC_FEATURES = [
+    "CompetitionDistance", "CompetitionOpenSinceMonth", "CompetitionOpenSinceYear",
+    "StoreType_b", "StoreType_c", "StoreType_d",
+    "Assortment_b", "Assortment_c",
+]
+
+# Фіксовані рівні категорій (базові «a» відкидаються, як drop_first у get_dummies)
+STORE_TYPES = ["b", "c", "d"]
+ASSORTMENTS = ["b", "c"]
+
+
+class StoreCatalog:
+    """
+    Кеш статичних атрибутів магазинів зі store.csv.
+    Файл читається один раз; фічі зберігаються у компактному масиві float32
+    форми (max_store_id + 1, 8), де номер рядка = Store ID.
+    Перечитується лише тоді, коли змінюється mtime файлу.
+    """
+
+    _instances = {}
+
+    def __init__(self, store_csv: str):
+        self.store_csv = os.path.abspath(store_csv)
+        self.mtime = None
+        self.features = None   # np.ndarray (max_store_id + 1, len(STATIC_FEATURES))
+        self.known = None      # np.ndarray[bool]: чи є магазин із таким ID
+        self.reload()
+
+    @classmethod
+    def for_path(cls, store_csv: str) -> "StoreCatalog":
+        """
+        Повертає спільний екземпляр каталогу для store_csv
+        (перевіряючи, чи файл не змінився з моменту останнього читання).
+        """
+        key = os.path.abspath(store_csv)
+        catalog = cls._instances.get(key)
+        if catalog is None:
+            catalog = cls(key)
+            cls._instances[key] = catalog
+        else:
+            catalog.refresh()
+        return catalog
+
+    def refresh(self) -> bool:
+        """
+        Перечитує файл, якщо змінився його mtime. Повертає True, якщо було перечитано.
+        """
+        if os.path.getmtime(self.store_csv) != self.mtime:
+            self.reload()
+            return True
+        return False
+
+    def reload(self) -> None:
+        """
+        Зчитує store.csv і кодує статичні фічі в масив, індексований Store ID.
+        """
+        if not os.path.exists(self.store_csv):
+            raise FileNotFoundError(f"Файл магазинів {self.store_csv} не знайдено.")
+        mtime = os.path.getmtime(self.store_csv)
+        df = pd.read_csv(self.store_csv)
+
+        store_ids = df["Store"].values.astype(np.int64)
+        features = np.full((store_ids.max() + 1, len(STATIC_FEATURES)), np.nan, dtype=np.float32)
+        features[store_ids] = np.column_stack([
+            df["CompetitionDistance"].values,
+            df["CompetitionOpenSinceMonth"].fillna(0).values,
+            df["CompetitionOpenSinceYear"].fillna(0).values,
+            *[(df["StoreType"].astype(str).values == st) for st in STORE_TYPES],
+            *[(df["Assortment"].astype(str).values == a) for a in ASSORTMENTS],
+        ]).astype(np.float32)
+        known = np.zeros(store_ids.max() + 1, dtype=bool)
+        known[store_ids] = True
+
+        self.features = features
+        self.known = known
+        self.mtime = mtime
+
+    @property
+    def store_ids(self) -> np.ndarray:
+        """
+        Відсортований масив усіх Store ID із каталогу.
+        """
+        return np.flatnonzero(self.known)
+
+    def lookup(self, store_ids) -> np.ndarray:
+        """
+        Повертає статичні фічі (len(store_ids), 8) у порядку store_ids.
+        """
+        store_ids = np.asarray(store_ids, dtype=np.int64).ravel()
+        in_range = (store_ids >= 0) & (store_ids < self.known.shape[0])
+        valid = np.zeros(store_ids.shape[0], dtype=bool)
+        valid[in_range] = self.known[store_ids[in_range]]
+        if not valid.all():
+            raise KeyError(f"Магазин(и) з ID={store_ids[~valid].tolist()} не знайдено в {self.store_csv}")
+        return self.features[store_ids]
+
+    def to_frame(self) -> pd.DataFrame:
+        """
+        Статичні фічі у вигляді DataFrame (Store + STATIC_FEATURES) для merge у preprocess.
+        """
+        store_ids = self.store_ids
+        df = pd.DataFrame(self.features[store_ids], columns=STATIC_FEATURES)
+        # дами зберігаємо як bool — так само, як їх повертає pd.get_dummies
+        dummy_cols = STATIC_FEATURES[3:]
+        df[dummy_cols] = df[dummy_cols].astype(bool)
+        df.insert(0, "Store", store_ids)
+        return df
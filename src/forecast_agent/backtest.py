@@ -0,0 +1,270 @@
+import os
+import sys
+import json
+import time
+import pickle
+import hashlib
+import itertools
+from datetime import date
+from multiprocessing import Pool
+
+import numpy as np
+import pandas as pd
+
+from forecast_agent.forecast_agent import FEATURE_COLS, LAG_FEATURES, ForecastAgent
+from data_preparation.load_data import load_table, save_table, save_feature_matrix, has_feature_matrix, find_table
+
+# Сітка за замовчуванням (параметри RandomForestRegressor)
+DEFAULT_GRID = {
+    "n_estimators": [30, 60, 100],
+    "max_depth": [14, 20, None],
+    "max_features": [1.0, 0.5],
+    "max_samples": [None, 0.5],
+}
+
+# Спільний для процесу-воркера стан (заповнюється один раз в ініціалізаторі пулу)
+_worker = {}
+
+
+def config_id(params: dict) -> str:
+    """
+    Стабільний ідентифікатор конфігурації: хеш відсортованих параметрів.
+    """
+    payload = json.dumps(params, sort_keys=True, default=str)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()[:12]
+
+
+def expand_grid(grid: dict) -> list:
+    """
+    Декартовий добуток сітки гіперпараметрів → список словників параметрів.
+    """
+    keys = list(grid)
+    return [dict(zip(keys, values)) for values in itertools.product(*(grid[k] for k in keys))]
+
+
+def prepare_dataset(dataset_path: str, cache_dir: str) -> str:
+    """
+    Готує матрицю ознак для спільного mmap у воркерах і повертає її префікс.
+    - Префікс .npy використовується як є.
+    - Таблиця (.csv/.parquet/.feather) один раз конвертується у <cache_dir>/dataset.*.npy,
+      відсортована за датою, щоб вибірки фолдів були неперервними зрізами (без копій).
+    Поруч зберігається <prefix>.days.npy — порядковий номер дня кожного рядка.
+    """
+    if has_feature_matrix(dataset_path):
+        prefix = dataset_path
+    else:
+        prefix = os.path.join(cache_dir, "dataset")
+        source_mtime = os.path.getmtime(dataset_path)
+        if not (has_feature_matrix(prefix) and os.path.getmtime(prefix + ".X.npy") >= source_mtime):
+            os.makedirs(cache_dir, exist_ok=True)
+            df = load_table(dataset_path)
+            cols = FEATURE_COLS + LAG_FEATURES if set(LAG_FEATURES).issubset(df.columns) else FEATURE_COLS
+            df = df.sort_values(["Year", "Month", "Day"], kind="stable")
+            save_feature_matrix(df, prefix, cols)
+            print(f"[backtest] Матрицю ознак збережено у {prefix}.X.npy ({len(df)} рядків)")
+
+    days_path = prefix + ".days.npy"
+    if not os.path.exists(days_path) or os.path.getmtime(days_path) < os.path.getmtime(prefix + ".X.npy"):
+        X, _ = ForecastAgent.load_xy(prefix)
+        ymd = np.asarray(X[:, 1:4], dtype=np.int64)
+        days = pd.to_datetime(pd.DataFrame({"year": ymd[:, 0], "month": ymd[:, 1], "day": ymd[:, 2]}))
+        np.save(days_path, (days.values.astype("datetime64[D]").astype(np.int64)))
+    return prefix
+
+
+def rolling_origin_folds(days: np.ndarray, n_folds: int = 4, horizon_days: int = 42, step_days: int = None) -> list:
+    """
+    Rolling origin (розширюване вікно): для k-го фолду валідація — horizon_days днів від cutoff_k,
+    тренування — усе до cutoff_k. Останній фолд закінчується на останньому дні даних
+    (як фіксований holdout VALIDATION_DAYS=42 у preprocess), попередні зсунуті на step_days назад.
+    Повертає [(cutoff_day, horizon_days), ...] від найранішого.
+    """
+    step_days = step_days or horizon_days
+    last_day = int(days.max())
+    first_day = int(days.min())
+    folds = []
+    for k in range(n_folds):
+        cutoff = last_day + 1 - horizon_days - k * step_days
+        if cutoff <= first_day:
+            break
+        folds.append((cutoff, horizon_days))
+    return folds[::-1]
+
+
+def _init_worker(prefix: str) -> None:
+    """
+    Ініціалізатор воркера: X, y та дні відкриваються лише на читання через mmap
+    (спільна сторінкова пам'ять, без копії на кожен процес).
+    """
+    X, y = ForecastAgent.load_xy(prefix)
+    days = np.load(prefix + ".days.npy", mmap_mode="r")
+    _worker["X"], _worker["y"], _worker["days"] = X, y, days
+    _worker["sorted"] = bool(np.all(days[1:] >= days[:-1]))
+
+
+def _rows(start_day: int, stop_day: int):
+    """
+    Рядки з днем у [start_day, stop_day): зріз (для відсортованих даних) або масив індексів.
+    """
+    days = _worker["days"]
+    if _worker["sorted"]:
+        return slice(int(np.searchsorted(days, start_day)), int(np.searchsorted(days, stop_day)))
+    return np.flatnonzero((days >= start_day) & (days < stop_day))
+
+
+def _run_fold(task) -> dict:
+    """
+    Навчає одну конфігурацію на одному фолді, зберігає результат (атомарно) у кеш і повертає його.
+    """
+    from sklearn.ensemble import RandomForestRegressor
+    from sklearn.metrics import mean_absolute_error, mean_squared_error
+
+    cid, params, cutoff, horizon, result_path = task
+    X, y = _worker["X"], _worker["y"]
+    train_rows = _rows(np.iinfo(np.int64).min, cutoff)
+    val_rows = _rows(cutoff, cutoff + horizon)
+
+    # Паралелізм — на рівні пулу процесів, тож кожен ліс навчається в одному потоці
+    rf = RandomForestRegressor(random_state=42, n_jobs=1, **params)
+    started = time.perf_counter()
+    rf.fit(X[train_rows], y[train_rows])
+    fit_time = time.perf_counter() - started
+
+    started = time.perf_counter()
+    preds = rf.predict(X[val_rows])
+    predict_time = time.perf_counter() - started
+    y_val = np.asarray(y[val_rows])
+
+    result = {
+        "config_id": cid,
+        **{f"param_{k}": v for k, v in params.items()},
+        "cutoff": date.fromordinal(int(cutoff) + date(1970, 1, 1).toordinal()).isoformat(),
+        "horizon_days": int(horizon),
+        "train_rows": int(len(range(*train_rows.indices(len(y)))) if isinstance(train_rows, slice) else len(train_rows)),
+        "val_rows": int(y_val.shape[0]),
+        "MAE": float(mean_absolute_error(y_val, preds)),
+        "RMSE": float(mean_squared_error(y_val, preds) ** 0.5),
+        "fit_time_s": fit_time,
+        "predict_time_s": predict_time,
+        "size_mb": len(pickle.dumps(rf, protocol=pickle.HIGHEST_PROTOCOL)) / 2 ** 20,
+        "n_nodes": int(sum(tree.tree_.node_count for tree in rf.estimators_)),
+    }
+    tmp_path = result_path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(result, f, indent=2)
+    os.replace(tmp_path, result_path)
+    return result
+
+
+def leaderboard(results: pd.DataFrame) -> pd.DataFrame:
+    """
+    Агрегує результати фолдів по конфігураціях: середні MAE/RMSE (+ std MAE),
+    середній час навчання, розмір моделі. Відсортовано за MAE.
+    """
+    param_cols = [c for c in results.columns if c.startswith("param_")]
+    board = (results.groupby("config_id")
+             .agg(**{c: (c, "first") for c in param_cols},
+                  folds=("MAE", "size"),
+                  MAE=("MAE", "mean"),
+                  MAE_std=("MAE", "std"),
+                  RMSE=("RMSE", "mean"),
+                  fit_time_s=("fit_time_s", "mean"),
+                  predict_time_s=("predict_time_s", "mean"),
+                  size_mb=("size_mb", "mean"))
+             .sort_values("MAE")
+             .reset_index())
+    board.insert(0, "rank", np.arange(1, len(board) + 1))
+    return board
+
+
+def run_backtest(dataset_path: str,
+                 results_dir: str,
+                 grid: dict = None,
+                 n_folds: int = 4,
+                 horizon_days: int = 42,
+                 step_days: int = None,
+                 processes: int = None,
+                 fmt: str = "csv") -> pd.DataFrame:
+    """
+    Паралельний backtest ForecastAgent: rolling-origin фолди × сітка гіперпараметрів у пулі процесів.
+    - Матриця ознак готується один раз (prepare_dataset) і відкривається воркерами через mmap.
+    - Результат кожної пари (конфігурація, фолд) пишеться в <results_dir>/folds/<dataset>/<config>_<cutoff>_<horizon>.json
+      одразу після завершення; при повторному запуску (напр., з розширеною сіткою) готові пари пропускаються.
+    - Наприкінці — таблиця фолдів <results_dir>/backtest_folds.<fmt> і лідерборд <results_dir>/leaderboard.<fmt>.
+    Повертає лідерборд.
+    """
+    grid = grid or DEFAULT_GRID
+    prefix = prepare_dataset(dataset_path, os.path.join(results_dir, "cache"))
+    days = np.load(prefix + ".days.npy", mmap_mode="r")
+    folds = rolling_origin_folds(days, n_folds=n_folds, horizon_days=horizon_days, step_days=step_days)
+    if not folds:
+        raise ValueError(f"Даних замало для фолдів по {horizon_days} днів.")
+
+    # Кеш прив'язаний до конкретної матриці ознак (шлях + розмір + mtime)
+    dataset_key = hashlib.sha1(ForecastAgent._file_fingerprint(prefix + ".X.npy").encode("utf-8")).hexdigest()[:12]
+    folds_dir = os.path.join(results_dir, "folds", dataset_key)
+    os.makedirs(folds_dir, exist_ok=True)
+
+    tasks, result_paths = [], []
+    for params in expand_grid(grid):
+        cid = config_id(params)
+        for cutoff, horizon in folds:
+            result_path = os.path.join(folds_dir, f"{cid}_{cutoff}_{horizon}.json")
+            result_paths.append(result_path)
+            if not os.path.exists(result_path):
+                tasks.append((cid, params, cutoff, horizon, result_path))
+    print(f"[backtest] Конфігурацій: {len(result_paths) // len(folds)}, фолдів: {len(folds)}, "
+          f"до виконання: {len(tasks)} (решта — з кешу {folds_dir})")
+
+    if tasks:
+        processes = min(len(tasks), processes or os.cpu_count() or 1)
+        # Спершу найдорожчі (більше дерев) — менше простоїв наприкінці
+        tasks.sort(key=lambda t: -(t[1].get("n_estimators") or 100))
+        if processes > 1:
+            with Pool(processes, initializer=_init_worker, initargs=(prefix,)) as pool:
+                for done, r in enumerate(pool.imap_unordered(_run_fold, tasks), 1):
+                    print(f"[backtest] {done}/{len(tasks)} {r['config_id']} @ {r['cutoff']}: "
+                          f"MAE={r['MAE']:.2f}, fit={r['fit_time_s']:.1f}s")
+        else:
+            _init_worker(prefix)
+            for done, task in enumerate(tasks, 1):
+                r = _run_fold(task)
+                print(f"[backtest] {done}/{len(tasks)} {r['config_id']} @ {r['cutoff']}: "
+                      f"MAE={r['MAE']:.2f}, fit={r['fit_time_s']:.1f}s")
+            _worker.clear()
+
+    records = []
+    for path in result_paths:
+        with open(path) as f:
+            records.append(json.load(f))
+    df_folds = pd.DataFrame(records)
+    board = leaderboard(df_folds)
+
+    save_table(df_folds, os.path.join(results_dir, f"backtest_folds.{fmt}"), downcast=False)
+    board_path = os.path.join(results_dir, f"leaderboard.{fmt}")
+    save_table(board, board_path, downcast=False)
+    print(board.head(10).to_string(index=False))
+    print(f"[backtest] Лідерборд збережено у {board_path}")
+    return board
+
+
+if __name__ == "__main__":
+    # Запуск: PYTHONPATH=src python -m forecast_agent.backtest (шлях до файлу затінює пакет forecast_agent)
+    # Параметри: --folds N  --horizon DAYS  --processes N  --quick (маленька сітка для перевірки)
+    def arg(name, default):
+        return sys.argv[sys.argv.index(name) + 1] if name in sys.argv else default
+
+    base = os.path.abspath(os.path.join(os.path.dirname(__file__), "../.."))
+    train_prefix = os.path.join(base, "data/processed/train_prepared")
+    dataset = train_prefix if has_feature_matrix(train_prefix) else find_table(train_prefix)
+    if dataset is None:
+        raise FileNotFoundError(f"Датасет {train_prefix} (.npy/.parquet/.feather/.csv) не знайдено.")
+
+    grid = {"n_estimators": [30], "max_depth": [14, 20], "max_features": [0.5], "max_samples": [0.5]} \
+        if "--quick" in sys.argv else DEFAULT_GRID
+    run_backtest(dataset,
+                 results_dir=os.path.join(base, "models/backtest"),
+                 grid=grid,
+                 n_folds=int(arg("--folds", 4)),
+                 horizon_days=int(arg("--horizon", 42)),
+                 processes=int(arg("--processes", 0)) or None)
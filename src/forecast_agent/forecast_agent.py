@@ -1,54 +1,149 @@
 import pandas as pd
 import numpy as np
-import joblib
 import os
+import time
 
-from sklearn.ensemble import RandomForestRegressor
+# joblib і sklearn імпортуються в методах: імпорт модуля (app, simulation) їх не тягне
+from data_preparation.store_catalog import StoreCatalog
+from data_preparation.feature_store import LAG_FEATURES, SalesFeatureStore, day_number
+from data_preparation.load_data import load_table, load_feature_matrix, has_feature_matrix
+from utils.instrumentation import instrument
+
+# Фіксований порядок ознак точно так само, як під час тренування (22 колонки)
+FEATURE_COLS = [
+    # 1) ‣ Базові числові:
+    "Store",
+    "Year", "Month", "Day",
+    "Customers", "Promo", "SchoolHoliday", "IsHoliday",
+    "CompetitionDistance", "CompetitionOpenSinceMonth", "CompetitionOpenSinceYear",
+    # 2) ‣ Dummy-сті для StoreType:
+    "StoreType_b", "StoreType_c", "StoreType_d",
+    # 3) ‣ Dummy-сті для Assortment:
+    "Assortment_b", "Assortment_c",
+    # 4) ‣ Dummy-сті для DayOfWeek:
+    "DayOfWeek_2", "DayOfWeek_3", "DayOfWeek_4",
+    "DayOfWeek_5", "DayOfWeek_6", "DayOfWeek_7"
+]
+# Моделі, навчені на даних preprocess --lags, мають ще LAG_FEATURES (історія продажів) у кінці
+FEATURE_COLS_WITH_LAGS = FEATURE_COLS + LAG_FEATURES
+
+# Пресети RandomForest: компроміс точність ↔ розмір артефакту / час завантаження
+MODEL_PRESETS = {
+    "full": {"n_estimators": 100},                                           # як раніше: необрізані дерева
+    "compact": {"n_estimators": 60, "max_depth": 20, "min_samples_leaf": 5},
+    "tiny": {"n_estimators": 30, "max_depth": 14, "min_samples_leaf": 20},
+}
+
+def forest_spread(model, X):
+    """
+    (mean, std) прогнозу між деревами лісу для рядків X; суми та суми квадратів
+    накопичуються по деревах, не зберігаючи (trees × rows).
+    """
+    X = np.asarray(X, dtype=np.float32)
+    total = np.zeros(X.shape[0])
+    total_sq = np.zeros(X.shape[0])
+    for tree in model.estimators_:
+        pred = tree.predict(X)
+        total += pred
+        total_sq += pred ** 2
+    n_trees = len(model.estimators_)
+    mean = total / n_trees
+    std = np.sqrt(np.maximum(total_sq / n_trees - mean ** 2, 0))
+    return mean, std
 
 class ForecastAgent:
     """
     Проста модель прогнозування продажів на основі RandomForestRegressor.
     Зчитує попередньо підготовлені CSV (train_prepared.csv, validation.csv) з data/processed,
     навчає модель, зберігає її у models/forecast_model.pkl; прогноз формує через model.predict(X).
+    Сегментований режим (train_segments): окремі моделі StoreType/Assortment-сегментів у models/forecast_segments.
     """
 
-    def __init__(self, model_path: str = None):
+    def __init__(self, model_path: str = None, feature_store_path: str = None, lazy: bool = False):
         """
         Якщо передано model_path, завантажує модель із цього шляху; 
         інакше встановлює self.model = None.
+        feature_store_path — стан SalesFeatureStore (preprocess --lags) для моделей з LAG_FEATURES.
+        lazy=True — модель читається з диска лише при першому зверненні до self.model (першому прогнозі).
         """
-        self.model = None
+        self._model = None
+        self._pending_model = None  # (model_path, mmap) відкладеного завантаження
+        self.model_fingerprint = None  # ідентифікує саме цю версію моделі (для кешу прогнозів)
+        self.feature_store = SalesFeatureStore.load(feature_store_path) if feature_store_path else None
         if model_path:
-            self.load_model(model_path)
+            self.load_model(model_path, lazy=lazy)
+
+    @property
+    def model(self):
+        """
+        Модель RandomForest; при відкладеному завантаженні читається тут, під час першого звернення.
+        """
+        if self._model is None and self._pending_model is not None:
+            model_path, mmap = self._pending_model
+            self._pending_model = None
+            self._load(model_path, mmap)
+        return self._model
+
+    @model.setter
+    def model(self, value) -> None:
+        self._model = value
+        self._pending_model = None
+
+    @property
+    def has_model(self) -> bool:
+        """
+        Чи є модель (завантажена або відкладена) — без примусового завантаження.
+        """
+        return self._model is not None or self._pending_model is not None
+
+    @property
+    def uses_lag_features(self) -> bool:
+        """
+        Чи навчена модель на FEATURE_COLS + LAG_FEATURES (визначається за кількістю ознак моделі).
+        """
+        return getattr(self.model, "n_features_in_", len(FEATURE_COLS)) == len(FEATURE_COLS_WITH_LAGS)
+
+    def append_actuals(self, day, store_ids, sales) -> None:
+        """
+        Додає фактичні продажі дня у сховище ознак історії (O(stores)); наступні прогнози
+        рахують лаги та ковзні середні вже з урахуванням цього дня.
+        """
+        if self.feature_store is None:
+            self.feature_store = SalesFeatureStore(int(np.max(store_ids)) if len(store_ids) else 0)
+        self.feature_store.append_day(int(day_number(pd.Timestamp(day))), store_ids, sales)
 
     def train(self,
               train_csv: str,
               val_csv: str,
               model_out_path: str,
-              metrics_out_path: str) -> None:
+              metrics_out_path: str,
+              preset: str = "full",
+              compress: int = 0) -> None:
         """
-        1) Зчитує train_prepared.csv і validation.csv
+        1) Зчитує train_prepared і validation: CSV/Parquet/Feather (за розширенням)
+           або префікс матриці ознак .npy (відображається в пам'ять, без парсингу тексту)
         2) Відокремлює X_train, y_train, X_val, y_val
-        3) Навчає RandomForestRegressor
-        4) Обчислює MAE, RMSE на валідації
-        5) Зберігає модель у model_out_path (joblib), а метрики у metrics_out_path (JSON)
+        3) Навчає RandomForestRegressor з параметрами пресету MODEL_PRESETS[preset]
+        4) Обчислює MAE, RMSE на валідації (для моделей з LAG_FEATURES — на один день уперед: ознаки
+           кожного дня рахуються з фактичної історії до попереднього дня; так само прогнозує predict_batch,
+           рекурсивно дописуючи власні прогнози в історію)
+        5) Зберігає модель у model_out_path (joblib, compress 0–9; 0 дозволяє mmap при завантаженні),
+           а метрики (разом із розміром артефакту й часом завантаження) у metrics_out_path (JSON)
         """
         import json
+        import joblib
+        from sklearn.ensemble import RandomForestRegressor
         from sklearn.metrics import mean_absolute_error, mean_squared_error
 
         # Зчитуємо підготовлені дані
-        df_train = pd.read_csv(train_csv)
-        df_val   = pd.read_csv(val_csv)
-
-        # Цільова: "Sales"
-        y_train = df_train["Sales"].values
-        X_train = df_train.drop(columns=["Sales", "Date"]).values
+        X_train, y_train = self.load_xy(train_csv)
+        X_val, y_val = self.load_xy(val_csv)
 
-        y_val = df_val["Sales"].values
-        X_val = df_val.drop(columns=["Sales", "Date"]).values
+        if preset not in MODEL_PRESETS:
+            raise ValueError(f"Невідомий preset={preset!r}; доступні: {list(MODEL_PRESETS)}")
 
         # Навчання RandomForest
-        rf = RandomForestRegressor(n_estimators=100, random_state=42, n_jobs=-1)
+        rf = RandomForestRegressor(random_state=42, n_jobs=-1, **MODEL_PRESETS[preset])
         rf.fit(X_train, y_train)
 
         # Прогноз на валідації
@@ -59,10 +154,12 @@ class ForecastAgent:
 
         # Збереження моделі
         os.makedirs(os.path.dirname(model_out_path), exist_ok=True)
-        joblib.dump(rf, model_out_path)
+        joblib.dump(rf, model_out_path, compress=compress)
+        self.model_fingerprint = self._file_fingerprint(model_out_path)
 
         # Збереження метрик
-        metrics = {"MAE": float(mae), "RMSE": float(rmse)}
+        metrics = {"MAE": float(mae), "RMSE": float(rmse), "preset": preset}
+        metrics.update(self._artifact_stats(model_out_path, compress))
         with open(metrics_out_path, "w") as f:
             json.dump(metrics, f, indent=2)
 
@@ -73,15 +170,182 @@ class ForecastAgent:
         # Заносимо модель у self.model
         self.model = rf
 
-    def load_model(self, model_path: str) -> None:
+    def train_segments(self,
+                       train_csv: str,
+                       val_csv: str,
+                       model_dir: str,
+                       metrics_out_path: str,
+                       by: str = "StoreType",
+                       segments=None,
+                       preset: str = "compact",
+                       compress: int = 0,
+                       processes: int = None) -> dict:
         """
-        Завантажує модель із диску (joblib .pkl або .joblib).
+        Сегментований режим: замість одного лісу на всю мережу — окремий менший ліс на кожен
+        сегмент by ("StoreType" або "Assortment", за дамі-колонками FEATURE_COLS), навчання
+        паралельне в пулі процесів, артефакти — окремі файли в model_dir
+        (див. segmented_model.train_segments). segments — перетренувати лише вказані
+        (напр. ["StoreType=c"]), не чіпаючи інших.
+        Після тренування self.model — SegmentedModel (сегменти завантажуються за потреби).
+        """
+        import json
+        from forecast_agent.segmented_model import SegmentedModel, train_segments, manifest_path
+
+        manifest = train_segments(train_csv, val_csv, model_dir, by=by, segments=segments,
+                                  preset=preset, compress=compress, processes=processes)
+        metrics = {"segmented": True, "by": manifest["by"], "MAE": manifest.get("MAE"),
+                   "RMSE": manifest.get("RMSE"), "model_dir": model_dir,
+                   "segments": {name: {k: s[k] for k in ("train_rows", "val_rows", "MAE", "RMSE", "size_mb")}
+                                for name, s in manifest["segments"].items()}}
+        with open(metrics_out_path, "w") as f:
+            json.dump(metrics, f, indent=2)
+        if manifest.get("MAE") is not None:
+            print(f"[ForecastAgent.train_segments] Метрики валідації: MAE = {manifest['MAE']:.2f}, "
+                  f"RMSE = {manifest['RMSE']:.2f}")
+        print(f"[ForecastAgent.train_segments] Метрики збережено у {metrics_out_path}")
+
+        self.model = SegmentedModel(model_dir)
+        self.model_fingerprint = self._file_fingerprint(manifest_path(model_dir))
+        return manifest
+
+    def export_model(self,
+                     model_out_path: str,
+                     val_csv: str,
+                     metrics_out_path: str,
+                     n_trees: int = None,
+                     compress: int = 3) -> dict:
+        """
+        Експорт поточної моделі в легшому вигляді:
+          • n_trees — залишити лише перші n_trees дерев (дерева RF незалежні, тож це валідний менший ліс);
+          • compress — рівень стиснення joblib (0 = без стиснення, артефакт можна відкрити через mmap).
+        Вимірює розмір файлу, час завантаження та зміну MAE/RMSE відносно поточної моделі
+        і дописує це в metrics_out_path під ключем "artifacts" → <ім'я файлу>.
+        """
+        import copy
+        import json
+        import joblib
+        from sklearn.metrics import mean_absolute_error, mean_squared_error
+
+        if self.model is None:
+            raise RuntimeError("Модель не завантажена. Викличте load_model() або train().")
+        if not hasattr(self.model, "estimators_"):
+            raise RuntimeError("export_model працює з одним лісом; розмір сегментів задається preset у train_segments().")
+
+        lean = self.model
+        if n_trees is not None and n_trees < len(self.model.estimators_):
+            lean = copy.copy(self.model)
+            lean.estimators_ = self.model.estimators_[:n_trees]
+            lean.n_estimators = n_trees
+
+        os.makedirs(os.path.dirname(os.path.abspath(model_out_path)), exist_ok=True)
+        joblib.dump(lean, model_out_path, compress=compress)
+
+        # Точність: експортована vs поточна модель на валідації
+        X_val, y_val = self.load_xy(val_csv)
+        ref_preds = self.model.predict(X_val)
+        lean_preds = lean.predict(X_val)
+        ref_mae = mean_absolute_error(y_val, ref_preds)
+        ref_rmse = mean_squared_error(y_val, ref_preds) ** 0.5
+        mae = mean_absolute_error(y_val, lean_preds)
+        rmse = mean_squared_error(y_val, lean_preds) ** 0.5
+
+        report = {
+            "n_trees": len(lean.estimators_),
+            "MAE": float(mae),
+            "RMSE": float(rmse),
+            "MAE_delta": float(mae - ref_mae),
+            "RMSE_delta": float(rmse - ref_rmse),
+        }
+        report.update(self._artifact_stats(model_out_path, compress))
+
+        metrics = {}
+        if os.path.exists(metrics_out_path):
+            with open(metrics_out_path) as f:
+                metrics = json.load(f)
+        metrics.setdefault("artifacts", {})[os.path.basename(model_out_path)] = report
+        with open(metrics_out_path, "w") as f:
+            json.dump(metrics, f, indent=2)
+
+        print(f"[ForecastAgent.export_model] {model_out_path}: {report['size_mb']:.1f} MB, "
+              f"завантаження {report['load_time_s']:.2f} с, ΔMAE = {report['MAE_delta']:+.2f}, "
+              f"ΔRMSE = {report['RMSE_delta']:+.2f}")
+        return report
+
+    @staticmethod
+    def _artifact_stats(model_path: str, compress: int) -> dict:
+        """
+        Розмір артефакту та час його завантаження (для нестиснутого — через mmap).
+        """
+        import joblib
+
+        started = time.perf_counter()
+        joblib.load(model_path, mmap_mode="r" if not compress else None)
+        load_time = time.perf_counter() - started
+        return {
+            "size_mb": os.path.getsize(model_path) / 2 ** 20,
+            "load_time_s": load_time,
+            "compress": compress,
+        }
+
+    @staticmethod
+    def load_xy(path: str):
+        """
+        Повертає (X, y) з підготовленого датасету.
+        path — таблиця (.csv/.parquet/.feather) з колонками FEATURE_COLS [+ LAG_FEATURES] + Sales + Date
+        або префікс матриці ознак (<path>.X.npy / .y.npy / .meta.json), яка відкривається через mmap.
+        """
+        if has_feature_matrix(path):
+            X, y, columns = load_feature_matrix(path, mmap_mode="r")
+            if list(columns) not in (FEATURE_COLS, FEATURE_COLS_WITH_LAGS):
+                raise KeyError(f"Колонки матриці {path} не збігаються з FEATURE_COLS: {columns}")
+            return X, y
+        df = load_table(path)
+        # Цільова: "Sales"
+        cols = FEATURE_COLS_WITH_LAGS if set(LAG_FEATURES).issubset(df.columns) else FEATURE_COLS
+        return df[cols].values, df["Sales"].values
+
+    def load_model(self, model_path: str, mmap: bool = True, lazy: bool = False) -> None:
+        """
+        Завантажує модель із диску (joblib .pkl або .joblib) або каталог сегментованої моделі
+        (train_segments): тоді self.model — SegmentedModel, яка читає модель сегмента лише при першому
+        прогнозі для його магазинів.
+        Нестиснуті артефакти (compress=0) відкриваються через mmap: масиви дерев не читаються
+        в пам'ять одразу і спільні між процесами. Для стиснутих mmap ігнорується.
+        lazy=True — лише перевіряє файл і запам'ятовує шлях; відбиток моделі доступний одразу.
         """
         if not os.path.exists(model_path):
             raise FileNotFoundError(f"Модель за шляхом {model_path} не знайдена.")
-        self.model = joblib.load(model_path)
+        if os.path.isdir(model_path):
+            from forecast_agent.segmented_model import manifest_path
+            # Відбиток каталогу — за manifest: він переписується при кожному (пере)тренуванні сегмента
+            self.model_fingerprint = self._file_fingerprint(manifest_path(model_path))
+        else:
+            self.model_fingerprint = self._file_fingerprint(model_path)
+        if lazy:
+            self._model = None
+            self._pending_model = (model_path, mmap)
+            return
+        self._load(model_path, mmap)
+
+    def _load(self, model_path: str, mmap: bool) -> None:
+        import joblib
+
+        with instrument.timer("forecast.load_model"):
+            if os.path.isdir(model_path):
+                from forecast_agent.segmented_model import SegmentedModel
+                self._model = SegmentedModel(model_path, mmap=mmap)
+            else:
+                self._model = joblib.load(model_path, mmap_mode="r" if mmap else None)
         print(f"[ForecastAgent.load_model] Модель завантажена з {model_path}")
 
+    @staticmethod
+    def _file_fingerprint(model_path: str) -> str:
+        """
+        Дешевий відбиток артефакту моделі: шлях + розмір + mtime (без хешування сотень МБ).
+        """
+        st = os.stat(model_path)
+        return f"{os.path.abspath(model_path)}:{st.st_size}:{st.st_mtime_ns}"
+
     def predict(self,
                 store_id: int,
                 start_date: pd.Timestamp,
@@ -98,90 +362,162 @@ class ForecastAgent:
           • DayOfWeek_2, …, DayOfWeek_7              (базова – DayOfWeek_1)
         
         У підсумку: 11 базових числових + 3 StoreType‐дами + 2 Assortment‐дами + 6 DayOfWeek‐дам = 22 колонки.
+        Це окремий випадок predict_batch для одного магазину.
+        """
+        return self.predict_batch(store_ids=[store_id],
+                                  start_date=start_date,
+                                  horizon_days=horizon_days,
+                                  store_csv=store_csv)[0]
+
+    def predict_batch(self,
+                      store_ids,
+                      start_date: pd.Timestamp,
+                      horizon_days: int,
+                      store_csv: str = None) -> np.ndarray:
+        """
+        Прогноз для багатьох магазинів одразу.
+        Будує повну матрицю фічей (stores × days × 22) векторизовано через NumPy,
+        робить ОДИН виклик model.predict і повертає масив форми (len(store_ids), horizon_days).
+        Порядок рядків збігається з порядком store_ids.
+        Модель з LAG_FEATURES прогнозує рекурсивно — по виклику на день (див. _predict_recursive).
         """
-        import datetime
+        if self.model is None:
+            raise RuntimeError("Модель не завантажена. Викличте load_model() або train().")
+        if self.predicts_recursively(start_date, horizon_days):
+            return self._predict_recursive(store_ids, start_date, horizon_days, store_csv)[1]
+
+        with instrument.timer("forecast.features"):
+            X = self.build_features(store_ids, start_date, horizon_days, store_csv)
+        if X.shape[0] == 0:
+            return np.zeros((len(np.atleast_1d(store_ids)), max(horizon_days, 0)))
+        with instrument.timer("forecast.inference"):
+            preds = self.model.predict(X.reshape(-1, X.shape[-1]))
+        instrument.count("forecast.rows", X.shape[0] * X.shape[1])
+        return preds.reshape(X.shape[0], X.shape[1])
 
+    def predict_batch_spread(self,
+                             store_ids,
+                             start_date: pd.Timestamp,
+                             horizon_days: int,
+                             store_csv: str = None):
+        """
+        Те саме, що predict_batch, але додатково повертає розкид прогнозу між деревами лісу:
+        (mean, std), обидва форми (len(store_ids), horizon_days). mean збігається з predict_batch.
+        """
         if self.model is None:
             raise RuntimeError("Модель не завантажена. Викличте load_model() або train().")
 
+        if self.predicts_recursively(start_date, horizon_days):
+            X = self._predict_recursive(store_ids, start_date, horizon_days, store_csv)[0]
+        else:
+            X = self.build_features(store_ids, start_date, horizon_days, store_csv)
+        shape = (X.shape[0], X.shape[1])
+        X = X.reshape(-1, X.shape[-1])
+        # Сегментована модель рахує розкид у лісі сегмента кожного рядка
+        spread = getattr(self.model, "predict_spread", None)
+        mean, std = spread(X) if spread is not None else forest_spread(self.model, X)
+        return mean.reshape(shape), std.reshape(shape)
+
+    def predicts_recursively(self, start_date, horizon_days: int) -> bool:
+        """
+        Чи прогнозувати рекурсивно: модель з LAG_FEATURES, горизонт > 1 дня і старт не раніше
+        за день після останнього відомого в self.feature_store (інакше історія вже містить горизонт).
+        """
+        if horizon_days <= 1 or not self.uses_lag_features or self.feature_store is None:
+            return False
+        last_day = self.feature_store.last_day
+        return last_day is None or int(day_number(pd.Timestamp(start_date))) > last_day
+
+    def _predict_recursive(self, store_ids, start_date, horizon_days: int, store_csv: str = None,
+                           stats: dict = None):
+        """
+        Прогноз моделі з LAG_FEATURES так само, як її навчали (ознаки дня — з історії до попереднього дня):
+        день за днем, прогноз кожного дня дописується в копію сховища ознак як продажі для наступних днів
+        (self.feature_store не змінюється). Якщо між останнім відомим днем і start_date є розрив,
+        історія зсувається на ціле число тижнів (дні тижня Sales_lag7 зберігаються), а решта розриву
+        (< 7 днів) прогнозується так само рекурсивно.
+        Ознаки кожного магазину залежать лише від його власної історії, тож прогноз магазину
+        не залежить від того, які ще магазини є в store_ids.
+        stats — якщо задано, до stats["rows"] і stats["predict_time_s"] додаються кількість рядків
+        і час викликів model.predict.
+        Повертає (X (stores, horizon_days, 25), прогноз (stores, horizon_days)).
+        """
+        store = self.feature_store.copy()
+        start_date = pd.Timestamp(start_date)
+        start = int(day_number(start_date))
+        first = start
+        if store.last_day is not None:
+            store.last_day += (start - store.last_day - 1) // 7 * 7
+            first = store.last_day + 1
+        store_ids = np.asarray(store_ids, dtype=np.int64).ravel()
+        X = np.zeros((store_ids.shape[0], horizon_days, len(FEATURE_COLS_WITH_LAGS)))
+        preds = np.zeros((store_ids.shape[0], horizon_days))
+        for day in range(first, start + horizon_days):
+            with instrument.timer("forecast.features"):
+                X_day = self.build_features(store_ids, start_date + pd.Timedelta(days=day - start), 1,
+                                            store_csv, feature_store=store)
+            if X_day.shape[0] == 0:
+                return X[:0], preds
+            with instrument.timer("forecast.inference"):
+                t0 = time.perf_counter()
+                p = self.model.predict(X_day[:, 0, :])
+            instrument.count("forecast.rows", X_day.shape[0])
+            if stats is not None:
+                stats["rows"] = stats.get("rows", 0) + X_day.shape[0]
+                stats["predict_time_s"] = stats.get("predict_time_s", 0.0) + time.perf_counter() - t0
+            store.append_day(day, store_ids, p)
+            if day >= start:
+                X[:, day - start, :] = X_day[:, 0, :]
+                preds[:, day - start] = p
+        return X, preds
+
+    def build_features(self,
+                       store_ids,
+                       start_date: pd.Timestamp,
+                       horizon_days: int,
+                       store_csv: str = None,
+                       feature_store: SalesFeatureStore = None) -> np.ndarray:
+        """
+        Матриця фічей (stores, days, 22) у порядку FEATURE_COLS;
+        для моделей з історією продажів — (stores, days, 25) у порядку FEATURE_COLS_WITH_LAGS
+        (лаги та ковзні середні — O(1) на магазин із feature_store, за замовчуванням self.feature_store;
+        для всіх днів горизонту — на момент start_date, див. predict_batch для рекурсивного прогнозу).
+        """
         # Для того, щоб дістати атрибути магазину (конкуренція, тип тощо),
         # потрібно передати параметр store_csv (raw store.csv)
         if store_csv is None:
             raise ValueError("Для побудови фічей потрібен параметр store_csv (raw store.csv).")
 
-        df_store = pd.read_csv(store_csv)
-        # Якщо магазинів у store_csv менше, ніж у повному датасеті, 
-        # для тих, яких нема, store_info буде порожнім—але припустимо, що ви обираєте реальний store_id із датасету.
-        store_info = df_store[df_store["Store"] == store_id]
-        if store_info.shape[0] == 0:
-            raise KeyError(f"Магазин з ID={store_id} не знайдено в {store_csv}")
-        store_info = store_info.iloc[0]
-
-        # Збираємо записи для кожного дня горизонту
-        records = []
-        for offset in range(horizon_days):
-            dt = start_date + datetime.timedelta(days=offset)
-
-            rec = {
-                # ‣ Базові числові колонки:
-                "Store": store_id,
-                "Year": dt.year,
-                "Month": dt.month,
-                "Day": dt.day,
-                "Customers": 0,         # невідомо заздалегідь → 0
-                "Promo": 0,             # прогнози промо за майбутнє невідомі → 0
-                "SchoolHoliday": 0,     # задамо 0
-                "IsHoliday": 0,         # задамо 0
-                "CompetitionDistance": store_info["CompetitionDistance"],
-                "CompetitionOpenSinceMonth": int(store_info["CompetitionOpenSinceMonth"]) 
-                                            if not np.isnan(store_info["CompetitionOpenSinceMonth"]) else 0,
-                "CompetitionOpenSinceYear":  int(store_info["CompetitionOpenSinceYear"])  
-                                            if not np.isnan(store_info["CompetitionOpenSinceYear"])  else 0,
-            }
-
-            # --- Dummy для StoreType: generуємо колонки для b, c, d; 
-            # базова «a» означає, що всі три будуть 0
-            for st in ["b", "c", "d"]:
-                rec[f"StoreType_{st}"] = 1 if store_info["StoreType"] == st else 0
-
-            # --- Dummy для Assortment: generуємо колонки для b, c; базова «a» → обидва 0
-            for a in ["b", "c"]:
-                rec[f"Assortment_{a}"] = 1 if store_info["Assortment"] == a else 0
-
-            # --- Dummy для DayOfWeek: generуємо DayOfWeek_2 … DayOfWeek_7; 
-            # DayOfWeek_1 – базова (якщо dt.weekday()+1 == 1, то всі ці дамі = 0)
-            dow = dt.weekday() + 1  # DayOfWeek у даних – від 1 до 7
-            for d in range(2, 8):
-                rec[f"DayOfWeek_{d}"] = 1 if dow == d else 0
-
-            records.append(rec)
-
-        df_pred = pd.DataFrame(records)
-
-        # Фіксуємо порядок ознак точно так само, як під час тренування:
-        feature_cols = [
-            # 1) ‣ Базові числові:
-            "Store",
-            "Year", "Month", "Day",
-            "Customers", "Promo", "SchoolHoliday", "IsHoliday",
-            "CompetitionDistance", "CompetitionOpenSinceMonth", "CompetitionOpenSinceYear",
-            # 2) ‣ Dummy-сті для StoreType:
-            "StoreType_b", "StoreType_c", "StoreType_d",
-            # 3) ‣ Dummy-сті для Assortment:
-            "Assortment_b", "Assortment_c",
-            # 4) ‣ Dummy-сті для DayOfWeek:
-            "DayOfWeek_2", "DayOfWeek_3", "DayOfWeek_4",
-            "DayOfWeek_5", "DayOfWeek_6", "DayOfWeek_7"
-        ]
-
-        # Перевіряємо, чи всі колонки присутні:
-        missing = [col for col in feature_cols if col not in df_pred.columns]
-        if missing:
-            raise KeyError(f"У DataFrame для прогнозу не знайдено необхідні стовпці: {missing}")
-
-        X_pred = df_pred[feature_cols].values
-        # DEBUG-друк (переконайтеся, що це (n_samples, 22))
-        print("DEBUG: X_pred shape =", X_pred.shape)
-
-        preds = self.model.predict(X_pred)
-        return preds
+        store_ids = np.asarray(store_ids, dtype=np.int64).ravel()
+        n_stores = store_ids.shape[0]
+        if n_stores == 0 or horizon_days <= 0:
+            return np.zeros((0, max(horizon_days, 0), len(FEATURE_COLS)))
+        feature_store = feature_store or self.feature_store
+        if self.uses_lag_features and feature_store is None:
+            raise RuntimeError("Модель навчена з LAG_FEATURES: потрібен feature_store_path "
+                               "(стан SalesFeatureStore з preprocess --lags) або append_actuals().")
+
+        # Статичні фічі магазину (8 колонок) з кешованого каталогу: store.csv
+        # перечитується лише тоді, коли файл змінився
+        with instrument.timer("forecast.store_catalog"):
+            static = StoreCatalog.for_path(store_csv).lookup(store_ids)
+
+        # ‣ Календарні фічі горизонту: (days, 3) + DayOfWeek-дами (days, 6)
+        dates = pd.date_range(pd.Timestamp(start_date), periods=horizon_days, freq="D")
+        calendar = np.column_stack([dates.year, dates.month, dates.day]).astype(float)
+        dow = dates.weekday.values + 1  # DayOfWeek у даних – від 1 до 7
+        dow_dummies = (dow[:, None] == np.arange(2, 8)[None, :]).astype(float)
+
+        # ‣ Збираємо (stores, days, 22) у порядку FEATURE_COLS
+        n_cols = len(FEATURE_COLS_WITH_LAGS) if self.uses_lag_features else len(FEATURE_COLS)
+        X = np.zeros((n_stores, horizon_days, n_cols))
+        X[:, :, 0] = store_ids[:, None]
+        X[:, :, 1:4] = calendar[None, :, :]
+        # Customers, Promo, SchoolHoliday, IsHoliday (колонки 4–7) невідомі заздалегідь → 0
+        X[:, :, 8:11] = static[:, None, 0:3]
+        X[:, :, 11:16] = static[:, None, 3:8]
+        X[:, :, 16:22] = dow_dummies[None, :, :]
+        if n_cols > len(FEATURE_COLS):
+            with instrument.timer("forecast.lag_features"):
+                X[:, :, 22:] = feature_store.features(store_ids, day_number(dates))
+        return X
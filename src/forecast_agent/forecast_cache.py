@@ -0,0 +1,149 @@
+import os
+import pickle
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+
+class ForecastCache:
+    """
+    Мемоізація прогнозів перед ForecastAgent.
+    Ключ кешу: (відбиток моделі, store_id, дата). Пам'ять обмежена max_entries,
+    витіснення — LRU. За бажанням кеш зберігається на диск (cache_path) між запусками.
+    Має той самий інтерфейс predict / predict_batch, що й ForecastAgent.
+    """
+
+    def __init__(self, agent, max_entries: int = 500_000, cache_path: str = None):
+        self.agent = agent
+        self.max_entries = max_entries
+        self.cache_path = cache_path
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()  # {(fingerprint, store_id, day_ordinal): sales}
+        if cache_path and os.path.exists(cache_path):
+            self.load(cache_path)
+
+    def _fingerprint(self) -> str:
+        """
+        Відбиток поточної моделі агента. Якщо модель не з файлу — прив'язуємося до об'єкта в пам'яті.
+        """
+        if not self.agent.has_model:
+            raise RuntimeError("Модель не завантажена. Викличте load_model() або train().")
+        # Відкладена модель не завантажується заради відбитка: влучання в кеш обходяться без неї
+        fingerprint = self.agent.model_fingerprint or f"mem:{id(self.agent.model)}"
+        if self.agent.feature_store is not None:
+            # Прогноз залежить і від історії продажів: нові фактичні дані — новий відбиток
+            fingerprint += f"@{self.agent.feature_store.last_day}"
+        return fingerprint
+
+    def predict(self,
+                store_id: int,
+                start_date: pd.Timestamp,
+                horizon_days: int,
+                store_csv: str = None) -> np.ndarray:
+        """
+        Прогноз для одного магазину (через predict_batch).
+        """
+        return self.predict_batch(store_ids=[store_id],
+                                  start_date=start_date,
+                                  horizon_days=horizon_days,
+                                  store_csv=store_csv)[0]
+
+    def predict_batch(self,
+                      store_ids,
+                      start_date: pd.Timestamp,
+                      horizon_days: int,
+                      store_csv: str = None) -> np.ndarray:
+        """
+        Повертає (len(store_ids), horizon_days), як ForecastAgent.predict_batch.
+        Агента викликаємо лише для магазинів і вікна днів, яких бракує в кеші.
+        """
+        fp = self._fingerprint()
+        store_ids = np.asarray(store_ids, dtype=np.int64).ravel()
+        days = pd.date_range(pd.Timestamp(start_date), periods=max(horizon_days, 0), freq="D")
+        day_ords = [d.toordinal() for d in days]
+
+        result = np.empty((store_ids.shape[0], len(day_ords)))
+        missing_rows = []
+        first_missing, last_missing = len(day_ords), -1
+        for i, sid in enumerate(store_ids.tolist()):
+            row_complete = True
+            for j, day in enumerate(day_ords):
+                key = (fp, sid, day)
+                value = self._entries.get(key)
+                if value is None:
+                    row_complete = False
+                    first_missing = min(first_missing, j)
+                    last_missing = max(last_missing, j)
+                    self.misses += 1
+                else:
+                    self._entries.move_to_end(key)
+                    result[i, j] = value
+                    self.hits += 1
+            if not row_complete:
+                missing_rows.append(i)
+
+        if missing_rows:
+            # Дораховуємо лише вікно днів, якого бракує (для вікон, що перекриваються)
+            preds = self.agent.predict_batch(store_ids=store_ids[missing_rows],
+                                             start_date=days[first_missing],
+                                             horizon_days=last_missing - first_missing + 1,
+                                             store_csv=store_csv)
+            result[missing_rows, first_missing:last_missing + 1] = preds
+            window = day_ords[first_missing:last_missing + 1]
+            for i, row in zip(missing_rows, preds):
+                sid = int(store_ids[i])
+                for day, value in zip(window, row.tolist()):
+                    self._entries[(fp, sid, day)] = value
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+        return result
+
+    def stats(self) -> dict:
+        """
+        Лічильники влучань/промахів і поточний розмір кешу.
+        """
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+        }
+
+    def clear(self) -> None:
+        """
+        Очищує кеш і лічильники.
+        """
+        self._entries.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def save(self, cache_path: str = None) -> None:
+        """
+        Зберігає кеш на диск (атомарно: через тимчасовий файл).
+        """
+        cache_path = cache_path or self.cache_path
+        if cache_path is None:
+            raise ValueError("Не задано шлях для збереження кешу (cache_path).")
+        os.makedirs(os.path.dirname(os.path.abspath(cache_path)), exist_ok=True)
+        tmp_path = cache_path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            pickle.dump(list(self._entries.items()), f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, cache_path)
+        print(f"[ForecastCache.save] Кеш ({len(self._entries)} записів) збережено у {cache_path}")
+
+    def load(self, cache_path: str = None) -> None:
+        """
+        Завантажує кеш із диска. Записи інших моделей лишаються, але не використовуються
+        і з часом витісняються LRU.
+        """
+        cache_path = cache_path or self.cache_path
+        with open(cache_path, "rb") as f:
+            self._entries = OrderedDict(pickle.load(f))
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        print(f"[ForecastCache.load] Кеш ({len(self._entries)} записів) завантажено з {cache_path}")
@@ -0,0 +1,438 @@
+import os
+import sys
+import json
+import time
+import queue
+import threading
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib import request as urlrequest
+from urllib.error import HTTPError
+
+import numpy as np
+import pandas as pd
+
+from forecast_agent.forecast_agent import ForecastAgent
+from utils.instrumentation import instrument
+
+# Адреса сервера прогнозів для клієнтів (app, simulation): напр. INTELL_FORECAST_SERVER=http://127.0.0.1:8765
+ENV_VAR = "INTELL_FORECAST_SERVER"
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+
+# Скільки останніх запитів тримати для перцентилів очікування
+_STATS_WINDOW = 10_000
+
+
+class _Request:
+    """
+    Один запит прогнозу в черзі мікро-батчера.
+    """
+    __slots__ = ("store_ids", "start_date", "horizon_days", "future", "enqueued")
+
+    def __init__(self, store_ids, start_date, horizon_days):
+        self.store_ids = np.asarray(store_ids, dtype=np.int64).ravel()
+        self.start_date = pd.Timestamp(start_date)
+        self.horizon_days = int(horizon_days)
+        self.future = Future()
+        self.enqueued = time.perf_counter()
+
+
+class MicroBatcher:
+    """
+    Об'єднує конкурентні запити прогнозу в мікро-батчі: один потік забирає з черги до
+    max_batch_size запитів (чекаючи на наступні не довше max_wait_ms від першого),
+    будує фічі кожного запиту й робить ОДИН виклик model.predict на весь батч.
+    Модель викликається лише з цього потоку, тож окремий лок для агента не потрібен.
+    """
+
+    def __init__(self, agent: ForecastAgent, store_csv: str,
+                 max_batch_size: int = 64, max_wait_ms: float = 5.0):
+        if agent.model is None:
+            raise RuntimeError("Модель не завантажена. Викличте load_model() або train().")
+        self.agent = agent
+        self.store_csv = store_csv
+        self.max_batch_size = max_batch_size
+        self.max_wait_s = max_wait_ms / 1000.0
+        self._queue = queue.Queue()
+        self._thread = None
+        self._stats_lock = threading.Lock()
+        self.reset_stats()
+
+    def start(self) -> "MicroBatcher":
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._loop, name="forecast-batcher", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        """
+        Завершує потік після обробки запитів, що вже в черзі.
+        """
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join()
+            self._thread = None
+
+    def submit(self, store_ids, start_date, horizon_days: int) -> Future:
+        """
+        Ставить запит у чергу; Future повертає (len(store_ids), horizon_days), як ForecastAgent.predict_batch.
+        Фічі завжди будуються з self.store_csv, заданого при запуску сервера.
+        """
+        req = _Request(store_ids, start_date, horizon_days)
+        self._queue.put(req)
+        depth = self._queue.qsize()
+        with self._stats_lock:
+            self._max_queue_depth = max(self._max_queue_depth, depth)
+        return req.future
+
+    def predict_batch(self, store_ids, start_date, horizon_days: int, store_csv: str = None) -> np.ndarray:
+        # store_csv — лише для сумісності з інтерфейсом ForecastAgent; батчер використовує self.store_csv
+        return self.submit(store_ids, start_date, horizon_days).result()
+
+    def _collect(self):
+        """
+        Блокується до першого запиту, потім добирає наступні до max_batch_size або до дедлайну.
+        Повертає (batch, stopping).
+        """
+        first = self._queue.get()
+        if first is None:
+            return [], True
+        batch = [first]
+        deadline = time.perf_counter() + self.max_wait_s
+        while len(batch) < self.max_batch_size:
+            timeout = deadline - time.perf_counter()
+            try:
+                req = self._queue.get(timeout=timeout) if timeout > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if req is None:
+                return batch, True
+            batch.append(req)
+        return batch, False
+
+    def _loop(self) -> None:
+        stopping = False
+        while not stopping:
+            batch, stopping = self._collect()
+            if batch:
+                self._run_batch(batch)
+
+    def _run_batch(self, batch: list) -> None:
+        """
+        Фічі кожного запиту → одна матриця → один model.predict → розрізання по запитах.
+        Запити моделі з лагами (рекурсивний прогноз) групуються за (start_date, horizon_days):
+        одна рекурсія з одним model.predict на день для всіх магазинів групи (див. _run_recursive).
+        Помилка побудови фічей стосується лише свого запиту.
+        """
+        started = time.perf_counter()
+        parts, ready = [], []
+        recursive = {}
+        for req in batch:
+            if self.agent.predicts_recursively(req.start_date, req.horizon_days):
+                recursive.setdefault((req.start_date, req.horizon_days), []).append(req)
+                continue
+            try:
+                X = self.agent.build_features(req.store_ids, req.start_date, req.horizon_days, self.store_csv)
+            except Exception as e:
+                req.future.set_exception(e)
+                continue
+            if X.shape[0] == 0:
+                req.future.set_result(np.zeros((req.store_ids.shape[0], max(req.horizon_days, 0))))
+                continue
+            parts.append(X.reshape(-1, X.shape[-1]))
+            ready.append((req, X.shape[0], X.shape[1]))
+
+        rows = sum(p.shape[0] for p in parts)
+        predict_time = 0.0
+        if parts:
+            try:
+                with instrument.timer("forecast.server_inference"):
+                    t0 = time.perf_counter()
+                    preds = self.agent.model.predict(np.concatenate(parts))
+                    predict_time = time.perf_counter() - t0
+            except Exception as e:
+                for req, _, _ in ready:
+                    req.future.set_exception(e)
+            else:
+                offset = 0
+                for req, n_stores, n_days in ready:
+                    size = n_stores * n_days
+                    req.future.set_result(preds[offset:offset + size].reshape(n_stores, n_days))
+                    offset += size
+        instrument.count("forecast.rows", rows)
+        for (start_date, horizon_days), group in recursive.items():
+            group_stats = self._run_recursive(group, start_date, horizon_days)
+            rows += group_stats.get("rows", 0)
+            predict_time += group_stats.get("predict_time_s", 0.0)
+
+        with self._stats_lock:
+            self._requests += len(batch)
+            self._batches += 1
+            self._rows += rows
+            self._predict_time += predict_time
+            self._batch_time += time.perf_counter() - started
+            self._max_batch = max(self._max_batch, len(batch))
+            self._batch_sizes.append(len(batch))
+            self._waits.extend(started - req.enqueued for req in batch)
+
+    def _run_recursive(self, group: list, start_date, horizon_days: int) -> dict:
+        """
+        Рекурсивний прогноз групи запитів з однаковими (start_date, horizon_days): одна рекурсія
+        на об'єднання їхніх магазинів і розрізання результату по запитах (прогноз магазину не
+        залежить від решти магазинів). Якщо спільна рекурсія падає — кожен запит рахується окремо,
+        щоб помилка стосувалася лише свого запиту.
+        Повертає {"rows", "predict_time_s"} для статистики.
+        """
+        stats = {}
+        union = np.unique(np.concatenate([req.store_ids for req in group]))
+        try:
+            preds = self.agent._predict_recursive(union, start_date, horizon_days, self.store_csv, stats=stats)[1]
+        except Exception as e:
+            if len(group) == 1:
+                group[0].future.set_exception(e)
+                return stats
+            for req in group:
+                for key, value in self._run_recursive([req], start_date, horizon_days).items():
+                    stats[key] = stats.get(key, 0) + value
+            return stats
+        for req in group:
+            req.future.set_result(preds[np.searchsorted(union, req.store_ids)])
+        return stats
+
+    def reset_stats(self) -> None:
+        with self._stats_lock:
+            self._requests = 0
+            self._batches = 0
+            self._rows = 0
+            self._predict_time = 0.0
+            self._batch_time = 0.0
+            self._max_batch = 0
+            self._max_queue_depth = 0
+            self._batch_sizes = deque(maxlen=_STATS_WINDOW)
+            self._waits = deque(maxlen=_STATS_WINDOW)
+
+    def stats(self) -> dict:
+        """
+        Поточна глибина черги, розміри батчів, час очікування в черзі (перцентилі за останні запити)
+        і час model.predict.
+        """
+        with self._stats_lock:
+            sizes = np.asarray(self._batch_sizes, dtype=float)
+            waits = np.asarray(self._waits, dtype=float) * 1e3
+            return {
+                "queue_depth": self._queue.qsize(),
+                "max_queue_depth": self._max_queue_depth,
+                "requests": self._requests,
+                "batches": self._batches,
+                "rows": self._rows,
+                "batch_size_mean": float(sizes.mean()) if sizes.size else 0.0,
+                "batch_size_p50": float(np.percentile(sizes, 50)) if sizes.size else 0.0,
+                "batch_size_max": self._max_batch,
+                "rows_per_batch": self._rows / self._batches if self._batches else 0.0,
+                "wait_ms_p50": float(np.percentile(waits, 50)) if waits.size else 0.0,
+                "wait_ms_p95": float(np.percentile(waits, 95)) if waits.size else 0.0,
+                "predict_time_s": self._predict_time,
+                "batch_time_s": self._batch_time,
+                "max_batch_size": self.max_batch_size,
+                "max_wait_ms": self.max_wait_s * 1e3,
+            }
+
+
+class _Handler(BaseHTTPRequestHandler):
+    """
+    HTTP-інтерфейс сервера:
+      POST /predict  {"store_ids": [...], "start_date": "YYYY-MM-DD", "horizon_days": 7}
+                     → {"predictions": [[...], ...]}
+                     (каталог магазинів — лише store_csv сервера; шлях від клієнта відхиляється з 400)
+      GET  /stats    → MicroBatcher.stats()
+      GET  /health   → відбиток моделі
+    """
+    server_version = "IntellForecast/1.0"
+
+    def _reply(self, code: int, payload: dict) -> None:
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        batcher = self.server.batcher
+        if self.path == "/stats":
+            self._reply(200, batcher.stats())
+        elif self.path == "/health":
+            self._reply(200, {"status": "ok", "model_fingerprint": _agent_fingerprint(batcher.agent)})
+        else:
+            self._reply(404, {"error": f"Невідомий шлях {self.path}"})
+
+    def do_POST(self):
+        if self.path != "/predict":
+            self._reply(404, {"error": f"Невідомий шлях {self.path}"})
+            return
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            payload = json.loads(self.rfile.read(length) or b"{}")
+            if "store_csv" in payload:
+                raise ValueError("store_csv задається лише при запуску сервера")
+            future = self.server.batcher.submit(payload["store_ids"], payload["start_date"],
+                                                payload["horizon_days"])
+            preds = future.result()
+        except (KeyError, ValueError, TypeError, RuntimeError, FileNotFoundError) as e:
+            self._reply(400, {"error": f"{type(e).__name__}: {e}"})
+            return
+        self._reply(200, {"predictions": preds.tolist()})
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+
+def _agent_fingerprint(agent: ForecastAgent) -> str:
+    """
+    Відбиток моделі сервера (з останнім днем історії продажів для моделей з лагами).
+    """
+    fingerprint = agent.model_fingerprint or f"mem:{id(agent.model)}"
+    if agent.uses_lag_features and agent.feature_store is not None:
+        fingerprint += f"@{agent.feature_store.last_day}"
+    return fingerprint
+
+
+def make_server(agent: ForecastAgent, store_csv: str, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT,
+                max_batch_size: int = 64, max_wait_ms: float = 5.0, verbose: bool = False) -> ThreadingHTTPServer:
+    """
+    Створює HTTP-сервер (потік на з'єднання) зі спільним MicroBatcher; port=0 — вільний порт.
+    Мікро-батчер уже запущений; сервер — викличте serve_forever().
+    """
+    server = ThreadingHTTPServer((host, port), _Handler)
+    server.daemon_threads = True
+    server.batcher = MicroBatcher(agent, store_csv, max_batch_size=max_batch_size, max_wait_ms=max_wait_ms).start()
+    server.verbose = verbose
+    return server
+
+
+def serve(model_path: str, store_csv: str, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT,
+          feature_store_path: str = None, max_batch_size: int = 64, max_wait_ms: float = 5.0,
+          verbose: bool = False) -> None:
+    """
+    Завантажує модель один раз і обслуговує запити до Ctrl+C (наприкінці друкує статистику).
+    """
+    agent = ForecastAgent(model_path=model_path, feature_store_path=feature_store_path)
+    server = make_server(agent, store_csv, host, port, max_batch_size, max_wait_ms, verbose)
+    print(f"[forecast_server] Слухаю http://{host}:{server.server_address[1]} "
+          f"(batch ≤ {max_batch_size}, очікування ≤ {max_wait_ms} мс)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        server.batcher.stop()
+        print(f"[forecast_server] Статистика: {server.batcher.stats()}")
+
+
+class ForecastClient:
+    """
+    Клієнт сервера прогнозів з інтерфейсом predict / predict_batch, як у ForecastAgent,
+    тож його можна передати в ForecastCache, build_demand_matrix тощо.
+    """
+
+    def __init__(self, url: str, timeout: float = 60.0):
+        self.url = url.rstrip("/")
+        self.timeout = timeout
+        health = self._call("GET", "/health")
+        # Для ForecastCache: модель «є», відбиток — віддаленої моделі
+        self.model = self.url
+        self.has_model = True
+        self.model_fingerprint = f"remote:{health['model_fingerprint']}"
+        self.uses_lag_features = False
+        self.feature_store = None
+
+    def _call(self, method: str, path: str, payload: dict = None) -> dict:
+        data = json.dumps(payload).encode("utf-8") if payload is not None else None
+        req = urlrequest.Request(self.url + path, data=data, method=method,
+                                 headers={"Content-Type": "application/json"})
+        try:
+            with urlrequest.urlopen(req, timeout=self.timeout) as resp:
+                return json.loads(resp.read())
+        except HTTPError as e:
+            raise RuntimeError(f"Сервер прогнозів: {json.loads(e.read()).get('error', e)}") from None
+
+    def predict(self, store_id: int, start_date: pd.Timestamp, horizon_days: int, store_csv: str = None) -> np.ndarray:
+        return self.predict_batch([store_id], start_date, horizon_days, store_csv)[0]
+
+    def predict_batch(self, store_ids, start_date: pd.Timestamp, horizon_days: int, store_csv: str = None) -> np.ndarray:
+        # store_csv ігнорується: сервер будує фічі зі свого каталогу магазинів
+        payload = {
+            "store_ids": np.asarray(store_ids, dtype=np.int64).ravel().tolist(),
+            "start_date": pd.Timestamp(start_date).strftime("%Y-%m-%d"),
+            "horizon_days": int(horizon_days),
+        }
+        preds = np.asarray(self._call("POST", "/predict", payload)["predictions"], dtype=float)
+        return preds.reshape(len(payload["store_ids"]), max(int(horizon_days), 0))
+
+    def stats(self) -> dict:
+        return self._call("GET", "/stats")
+
+
+def forecaster_from_env(model_path: str, feature_store_path: str = None, lazy: bool = False):
+    """
+    ForecastClient, якщо задано ENV_VAR (спільна «тепла» модель на сервері), інакше локальний ForecastAgent
+    (lazy=True — модель завантажиться при першому прогнозі).
+    """
+    url = os.environ.get(ENV_VAR)
+    if url:
+        client = ForecastClient(url)
+        print(f"[forecast_server] Прогнози з сервера {client.url}")
+        return client
+    return ForecastAgent(model_path=model_path, feature_store_path=feature_store_path, lazy=lazy)
+
+
+def load_test(url: str, store_ids, clients: int = 8, requests_per_client: int = 50,
+              horizon_days: int = 7, start_date: str = "2015-08-01") -> dict:
+    """
+    Навантажувальний тест: clients потоків надсилають по одному магазину за запит
+    (як окремі сесії app); повертає пропускну здатність і статистику сервера.
+    """
+    client = ForecastClient(url)
+    store_ids = list(store_ids)
+    started = time.perf_counter()
+
+    def worker(k):
+        for i in range(requests_per_client):
+            client.predict(store_ids[(k * requests_per_client + i) % len(store_ids)], start_date, horizon_days)
+
+    with ThreadPoolExecutor(max_workers=clients) as pool:
+        list(pool.map(worker, range(clients)))
+    elapsed = time.perf_counter() - started
+    total = clients * requests_per_client
+    return {"requests": total, "elapsed_s": elapsed, "requests_per_s": total / elapsed, "server": client.stats()}
+
+
+if __name__ == "__main__":
+    # Запуск: PYTHONPATH=src python -m forecast_agent.forecast_server (шлях до файлу затінює пакет forecast_agent)
+    from forecast_agent.segmented_model import resolve_model_path
+
+    root = os.path.abspath(os.path.join(os.path.dirname(__file__), "../.."))
+    model_file = resolve_model_path(os.path.join(root, "models"))
+    store_file = os.path.join(root, "data/raw/store.csv")
+    feature_store_file = os.path.join(root, "data/processed/sales_feature_store.npz")
+
+    def _arg(name, default, cast=str):
+        return cast(sys.argv[sys.argv.index(name) + 1]) if name in sys.argv else default
+
+    # --load-test URL [--clients N] [--requests N]: навантаження на вже запущений сервер
+    if "--load-test" in sys.argv:
+        from data_preparation.store_catalog import StoreCatalog
+        result = load_test(_arg("--load-test", None), StoreCatalog.for_path(store_file).store_ids,
+                           clients=_arg("--clients", 8, int), requests_per_client=_arg("--requests", 50, int))
+        print(json.dumps(result, indent=2))
+    else:
+        # --host, --port, --max-batch, --max-wait-ms, --verbose
+        serve(model_file, store_file,
+              host=_arg("--host", DEFAULT_HOST), port=_arg("--port", DEFAULT_PORT, int),
+              feature_store_path=feature_store_file if os.path.exists(feature_store_file) else None,
+              max_batch_size=_arg("--max-batch", 64, int), max_wait_ms=_arg("--max-wait-ms", 5.0, float),
+              verbose="--verbose" in sys.argv)
@@ -0,0 +1,317 @@
+import os
+import json
+import time
+from multiprocessing import Pool
+
+import numpy as np
+
+from forecast_agent.forecast_agent import FEATURE_COLS, MODEL_PRESETS, ForecastAgent, forest_spread
+from data_preparation.feature_store import LAG_FEATURES
+from data_preparation.load_data import load_table, save_feature_matrix, has_feature_matrix
+from data_preparation.store_catalog import STORE_TYPES, ASSORTMENTS
+from utils.instrumentation import instrument
+
+# Атрибути, за якими мережу можна поділити на сегменти (рівні — як у дамі FEATURE_COLS, базовий «a»)
+SEGMENT_LEVELS = {"StoreType": ["a"] + STORE_TYPES, "Assortment": ["a"] + ASSORTMENTS}
+
+# Каталог сегментованої моделі поруч із forecast_model.pkl і файл опису сегментів у ньому
+SEGMENTS_DIR = "forecast_segments"
+MANIFEST_FILE = "manifest.json"
+
+# Який артефакт прогнозу використовувати: single | segments | шлях (див. resolve_model_path)
+MODEL_ENV_VAR = "INTELL_FORECAST_MODEL"
+
+# X / y / сегменти рядків, відкриті у воркері (по одному разу на процес)
+_worker = {}
+
+
+def segment_names(by: str) -> list:
+    """
+    Назви сегментів у порядку кодів: ["StoreType=a", "StoreType=b", ...].
+    """
+    if by not in SEGMENT_LEVELS:
+        raise ValueError(f"Невідомий атрибут сегментації {by!r}; доступні: {list(SEGMENT_LEVELS)}")
+    return [f"{by}={level}" for level in SEGMENT_LEVELS[by]]
+
+
+def segment_codes(X, by: str) -> np.ndarray:
+    """
+    Код сегмента кожного рядка матриці ознак (..., n_features) з дамі-колонок FEATURE_COLS:
+    0 — базовий рівень «a» (усі дамі нульові), k — k-та дамі (як у sharding.regions_from_catalog).
+    """
+    cols = [FEATURE_COLS.index(f"{by}_{level}") for level in SEGMENT_LEVELS[by][1:]]
+    dummies = np.asarray(X[..., cols]) > 0
+    return np.where(dummies.any(axis=-1), dummies.argmax(axis=-1) + 1, 0)
+
+
+def manifest_path(model_dir: str) -> str:
+    return os.path.join(model_dir, MANIFEST_FILE)
+
+
+def read_manifest(model_dir: str):
+    """
+    Опис сегментованої моделі; None, якщо каталог ще не містить жодного сегмента.
+    """
+    path = manifest_path(model_dir)
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def resolve_model_path(models_dir: str, choice: str = None, model_file: str = "forecast_model.pkl") -> str:
+    """
+    Артефакт для прогнозу в models_dir (ForecastAgent.load_model приймає обидва види), обраний явно:
+      "single"   — монолітна модель <models_dir>/<model_file> (за замовчуванням);
+      "segments" — каталог сегментованої моделі <models_dir>/forecast_segments;
+      інше       — шлях до артефакту (відносний — від models_dir).
+    choice=None — зі змінної оточення MODEL_ENV_VAR. Обраний артефакт друкується.
+    """
+    if choice is None:
+        choice = os.environ.get(MODEL_ENV_VAR) or "single"
+    if choice == "single":
+        path = os.path.join(models_dir, model_file)
+    elif choice == "segments":
+        path = os.path.join(models_dir, SEGMENTS_DIR)
+        if not os.path.exists(manifest_path(path)):
+            raise FileNotFoundError(f"{MODEL_ENV_VAR}=segments, але {manifest_path(path)} не знайдено — "
+                                    f"натренуйте сегменти (train_forecast --segment-by).")
+    else:
+        path = os.path.join(models_dir, choice)
+    print(f"[resolve_model_path] Модель прогнозу ({choice}): {path}")
+    return path
+
+
+class SegmentedModel:
+    """
+    Набір менших RandomForest — по одному на сегмент (StoreType або Assortment) — з інтерфейсом
+    однієї моделі: predict(X) маршрутизує рядки до моделі свого сегмента (сегмент визначається
+    дамі-колонками X) і робить по одному predict на сегмент.
+    Модель сегмента читається з диска (mmap для нестиснутих) лише при першому зверненні,
+    тож прогноз для частини мережі не завантажує решту сегментів.
+    """
+
+    def __init__(self, model_dir: str, mmap: bool = True):
+        manifest = read_manifest(model_dir)
+        if manifest is None:
+            raise FileNotFoundError(f"У {model_dir} немає {MANIFEST_FILE} сегментованої моделі.")
+        self.model_dir = model_dir
+        self.by = manifest["by"]
+        self.names = segment_names(self.by)
+        self.n_features_in_ = manifest["n_features"]
+        self.segments = manifest["segments"]  # {назва: {"file", "MAE", ...}}
+        self.mmap = mmap
+        self._models = {}
+
+    @property
+    def loaded_segments(self) -> list:
+        return sorted(self._models)
+
+    def segment_model(self, name: str):
+        """
+        Модель сегмента name (завантажується при першому зверненні).
+        """
+        model = self._models.get(name)
+        if model is None:
+            import joblib
+
+            if name not in self.segments:
+                raise KeyError(f"Немає моделі сегмента {name!r} у {self.model_dir}; "
+                               f"натреновані: {sorted(self.segments)}")
+            path = os.path.join(self.model_dir, self.segments[name]["file"])
+            with instrument.timer("forecast.load_segment"):
+                model = joblib.load(path, mmap_mode="r" if self.mmap else None)
+            self._models[name] = model
+            print(f"[SegmentedModel] Модель сегмента {name} завантажена з {path}")
+        return model
+
+    def _route(self, X):
+        """
+        [(модель сегмента, індекси рядків), ...] для рядків X (n_rows, n_features).
+        """
+        codes = segment_codes(X, self.by)
+        routes = []
+        for code in np.unique(codes):
+            rows = np.flatnonzero(codes == code)
+            routes.append((self.segment_model(self.names[code]), rows))
+        instrument.count("forecast.segments_routed", len(routes))
+        return routes
+
+    def predict(self, X) -> np.ndarray:
+        X = np.asarray(X)
+        preds = np.empty(X.shape[0])
+        for model, rows in self._route(X):
+            preds[rows] = model.predict(X[rows])
+        return preds
+
+    def predict_spread(self, X):
+        """
+        (mean, std) розкиду між деревами лісу свого сегмента (див. forest_spread).
+        """
+        X = np.asarray(X)
+        mean, std = np.empty(X.shape[0]), np.empty(X.shape[0])
+        for model, rows in self._route(X):
+            mean[rows], std[rows] = forest_spread(model, X[rows])
+        return mean, std
+
+
+def prepare_matrix(dataset_path: str, cache_dir: str, name: str) -> str:
+    """
+    Префікс матриці ознак для спільного mmap у воркерах (як backtest.prepare_dataset):
+    префікс .npy — як є, таблиця (.csv/.parquet/.feather) один раз конвертується у
+    <cache_dir>/<name>.*.npy і перезбирається лише тоді, коли таблиця новіша за кеш.
+    """
+    if has_feature_matrix(dataset_path):
+        return dataset_path
+    prefix = os.path.join(cache_dir, name)
+    if not (has_feature_matrix(prefix) and os.path.getmtime(prefix + ".X.npy") >= os.path.getmtime(dataset_path)):
+        os.makedirs(cache_dir, exist_ok=True)
+        df = load_table(dataset_path)
+        cols = FEATURE_COLS + LAG_FEATURES if set(LAG_FEATURES).issubset(df.columns) else FEATURE_COLS
+        save_feature_matrix(df, prefix, cols)
+        print(f"[train_segments] Матрицю ознак збережено у {prefix}.X.npy ({len(df)} рядків)")
+    return prefix
+
+
+def _init_worker(train_path: str, val_path: str, by: str) -> None:
+    """
+    Ініціалізатор воркера: матриці .npy відкриваються через mmap (спільні сторінки між процесами,
+    без повторного розбору таблиць) і кодуються сегментами.
+    """
+    for name, path in (("train", train_path), ("val", val_path)):
+        X, y = ForecastAgent.load_xy(path)
+        _worker[name] = (X, y, segment_codes(X, by))
+
+
+def _train_segment(task) -> dict:
+    """
+    Навчає модель одного сегмента, зберігає артефакт (атомарно) і повертає запис для manifest.
+    """
+    import joblib
+    from sklearn.ensemble import RandomForestRegressor
+
+    name, code, model_dir, preset, compress, n_jobs = task
+    X, y, codes = _worker["train"]
+    train_rows = np.flatnonzero(codes == code)
+    X_val, y_val, val_codes = _worker["val"]
+    val_rows = np.flatnonzero(val_codes == code)
+
+    rf = RandomForestRegressor(random_state=42, n_jobs=n_jobs, **MODEL_PRESETS[preset])
+    started = time.perf_counter()
+    rf.fit(X[train_rows], y[train_rows])
+    fit_time = time.perf_counter() - started
+
+    file_name = f"{name}.pkl"
+    path = os.path.join(model_dir, file_name)
+    tmp_path = os.path.join(model_dir, f"{name}.tmp.pkl")
+    joblib.dump(rf, tmp_path, compress=compress)
+    os.replace(tmp_path, path)
+
+    # Суми похибок, щоб загальні MAE/RMSE перераховувались і після перетренування одного сегмента
+    errors = rf.predict(X_val[val_rows]) - np.asarray(y_val[val_rows]) if val_rows.shape[0] else np.zeros(0)
+    n_val = int(errors.shape[0])
+    return {
+        "name": name,
+        "file": file_name,
+        "preset": preset,
+        "train_rows": int(train_rows.shape[0]),
+        "val_rows": n_val,
+        "abs_error_sum": float(np.abs(errors).sum()),
+        "sq_error_sum": float((errors ** 2).sum()),
+        "MAE": float(np.abs(errors).mean()) if n_val else None,
+        "RMSE": float(np.sqrt((errors ** 2).mean())) if n_val else None,
+        "fit_time_s": fit_time,
+        **ForecastAgent._artifact_stats(path, compress),
+    }
+
+
+def train_segments(train_path: str,
+                   val_path: str,
+                   model_dir: str,
+                   by: str = "StoreType",
+                   segments=None,
+                   preset: str = "compact",
+                   compress: int = 0,
+                   processes: int = None,
+                   cache_dir: str = None) -> dict:
+    """
+    Сегментований режим тренування: окремий RandomForest (пресет MODEL_PRESETS[preset]) на рядках
+    кожного сегмента by ("StoreType" / "Assortment"), паралельно в пулі процесів (як backtest:
+    таблиці один раз конвертуються в .npy у cache_dir (за замовчуванням <model_dir>/cache),
+    і воркери відкривають їх через mmap). Кожен сегмент — окремий артефакт
+    <model_dir>/<сегмент>.pkl, опис і метрики — у <model_dir>/manifest.json.
+    segments — перетренувати лише ці сегменти (напр. ["StoreType=c"]); решта артефактів і їхні
+    записи в manifest лишаються як є. None — усі сегменти, що мають тренувальні рядки.
+    Повертає manifest.
+    """
+    if preset not in MODEL_PRESETS:
+        raise ValueError(f"Невідомий preset={preset!r}; доступні: {list(MODEL_PRESETS)}")
+    names = segment_names(by)
+    cache_dir = cache_dir or os.path.join(model_dir, "cache")
+    train_path = prepare_matrix(train_path, cache_dir, "train")
+    val_path = prepare_matrix(val_path, cache_dir, "validation")
+    _init_worker(train_path, val_path, by)
+    n_features = int(_worker["train"][0].shape[1])
+    manifest = read_manifest(model_dir)
+    if manifest is not None and (manifest["by"] != by or manifest["n_features"] != n_features):
+        if segments is not None:
+            raise ValueError(f"{model_dir} містить сегменти by={manifest['by']} з {manifest['n_features']} "
+                             f"ознаками — перетренуйте всі сегменти (segments=None).")
+        manifest = None
+    if manifest is None:
+        manifest = {"by": by, "n_features": n_features, "segments": {}}
+
+    if segments is not None:
+        unknown = set(segments) - set(names)
+        if unknown:
+            raise ValueError(f"Невідомі сегменти {sorted(unknown)}; доступні: {names}")
+    targets = [name for name in names if segments is None or name in segments]
+
+    os.makedirs(model_dir, exist_ok=True)
+    counts = np.bincount(_worker["train"][2], minlength=len(names))
+    tasks = []
+    for name in targets:
+        code = names.index(name)
+        if counts[code] == 0:
+            print(f"[train_segments] Сегмент {name}: немає тренувальних рядків — пропущено")
+            continue
+        tasks.append((name, code, model_dir, preset, compress, None))
+    # Найбільші сегменти — першими (менше простоїв пулу наприкінці)
+    tasks.sort(key=lambda t: -counts[t[1]])
+
+    processes = min(len(tasks), processes or os.cpu_count() or 1)
+    started = time.perf_counter()
+    if processes > 1:
+        _worker.clear()
+        # Паралелізм — на рівні пулу процесів, тож кожен ліс навчається в одному потоці
+        tasks = [task[:-1] + (1,) for task in tasks]
+        with Pool(processes, initializer=_init_worker, initargs=(train_path, val_path, by)) as pool:
+            results = pool.map(_train_segment, tasks, chunksize=1)
+    else:
+        tasks = [task[:-1] + (-1,) for task in tasks]
+        results = [_train_segment(task) for task in tasks]
+        _worker.clear()
+
+    for record in results:
+        manifest["segments"][record.pop("name")] = record
+        print(f"[train_segments] {record['file']}: {record['train_rows']} рядків, "
+              f"MAE={record['MAE'] if record['MAE'] is None else round(record['MAE'], 2)}, "
+              f"{record['size_mb']:.1f} MB, fit={record['fit_time_s']:.1f}s")
+
+    manifest["segments"] = {name: manifest["segments"][name] for name in names if name in manifest["segments"]}
+
+    # Загальні метрики валідації — з сум похибок усіх сегментів
+    n_val = sum(s["val_rows"] for s in manifest["segments"].values())
+    if n_val:
+        manifest["MAE"] = sum(s["abs_error_sum"] for s in manifest["segments"].values()) / n_val
+        manifest["RMSE"] = (sum(s["sq_error_sum"] for s in manifest["segments"].values()) / n_val) ** 0.5
+    manifest["train_time_s"] = time.perf_counter() - started
+    manifest["processes"] = processes
+
+    tmp_path = manifest_path(model_dir) + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, manifest_path(model_dir))
+    print(f"[train_segments] Сегменти ({by}) збережено у {model_dir}, "
+          f"процесів: {processes}, час: {manifest['train_time_s']:.1f}s")
+    return manifest
@@ -1,13 +1,30 @@
 import os
+import sys
 import pandas as pd
 
-from forecast_agent import ForecastAgent
+from forecast_agent.forecast_agent import ForecastAgent
+from data_preparation.load_data import find_table, has_feature_matrix
+
+
+def resolve_dataset(base_dir: str, name: str) -> str:
+    """
+    Обирає найшвидший доступний формат датасету: матриця ознак .npy (mmap) →
+    Parquet → Feather → CSV.
+    """
+    prefix = os.path.join(base_dir, name)
+    if has_feature_matrix(prefix):
+        return prefix
+    path = find_table(prefix)
+    if path is None:
+        raise FileNotFoundError(f"Датасет {prefix} (.npy/.parquet/.feather/.csv) не знайдено.")
+    return path
 
 if __name__ == "__main__":
+    # Запуск: PYTHONPATH=src python -m forecast_agent.train_forecast (шлях до файлу затінює пакет forecast_agent)
     # Шлях до підготовлених CSV
     base_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), "../../data/processed"))
-    train_csv = os.path.join(base_dir, "train_prepared.csv")
-    val_csv = os.path.join(base_dir, "validation.csv")
+    train_csv = resolve_dataset(base_dir, "train_prepared")
+    val_csv = resolve_dataset(base_dir, "validation")
 
     # Шляхи для збереження моделі та метрик
     models_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), "../../models"))
@@ -15,10 +32,44 @@ if __name__ == "__main__":
     model_path = os.path.join(models_dir, "forecast_model.pkl")
     metrics_path = os.path.join(models_dir, "metrics.json")
 
+    # --preset full|compact|tiny (див. MODEL_PRESETS), --compress 0–9
+    preset = sys.argv[sys.argv.index("--preset") + 1] if "--preset" in sys.argv else "full"
+    compress = int(sys.argv[sys.argv.index("--compress") + 1]) if "--compress" in sys.argv else 0
+
+    # Сегментований режим: --segment-by StoreType|Assortment [--segment StoreType=c,StoreType=d] [--processes N]
+    # (--segment — перетренувати лише ці сегменти; за замовчуванням preset compact)
+    if "--segment-by" in sys.argv:
+        from forecast_agent.segmented_model import SEGMENTS_DIR
+        segments = sys.argv[sys.argv.index("--segment") + 1].split(",") if "--segment" in sys.argv else None
+        processes = int(sys.argv[sys.argv.index("--processes") + 1]) if "--processes" in sys.argv else None
+        print("[train_forecast] Починаємо тренування сегментів ForecastAgent...")
+        ForecastAgent().train_segments(train_csv=train_csv,
+                                       val_csv=val_csv,
+                                       model_dir=os.path.join(models_dir, SEGMENTS_DIR),
+                                       metrics_out_path=os.path.join(models_dir, "metrics_segments.json"),
+                                       by=sys.argv[sys.argv.index("--segment-by") + 1],
+                                       segments=segments,
+                                       preset=preset if "--preset" in sys.argv else "compact",
+                                       compress=compress,
+                                       processes=processes)
+        print("[train_forecast] Тренування завершено.")
+        sys.exit(0)
+
     print("[train_forecast] Починаємо тренування ForecastAgent...")
     fa = ForecastAgent()
     fa.train(train_csv=train_csv,
              val_csv=val_csv,
              model_out_path=model_path,
-             metrics_out_path=metrics_path)
+             metrics_out_path=metrics_path,
+             preset=preset,
+             compress=compress)
+
+    # --export-trees N: додатково зберегти полегшену копію (перші N дерев, стиснення joblib)
+    if "--export-trees" in sys.argv:
+        n_trees = int(sys.argv[sys.argv.index("--export-trees") + 1])
+        fa.export_model(model_out_path=os.path.join(models_dir, f"forecast_model_{n_trees}trees.pkl"),
+                        val_csv=val_csv,
+                        metrics_out_path=metrics_path,
+                        n_trees=n_trees,
+                        compress=3)
     print("[train_forecast] Тренування завершено.")
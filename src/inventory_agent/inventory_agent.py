@@ -1,5 +1,45 @@
 import random
-from deap import base, creator, tools, algorithms
+import time
+import numpy as np
+
+from utils.instrumentation import instrument
+
+# Доступні двигуни оптимізації замовлень
+ENGINES = ("ga", "greedy", "lp")
+
+
+def population_costs(orders, demand: np.ndarray, stock: np.ndarray,
+                     alpha: float, beta: float, Q_max: int) -> np.ndarray:
+    """
+    Векторизована вартість для цілої популяції.
+    - orders: (pop, stores) — замовлення кожного індивіда
+    - demand: (stores,); stock: (stores,) або (pop, stores) — вирівняні за тим самим порядком магазинів
+    Повертає (pop,) — cost кожного індивіда (дефіцит·alpha + надлишок·beta + штраф за Q_max).
+    """
+    orders = np.asarray(orders, dtype=np.float64)
+    if orders.ndim == 1:
+        orders = orders[None, :]
+    gap = demand - (stock + orders)
+    # дефіцит = max(gap, 0), надлишок = max(-gap, 0)
+    cost = alpha * np.maximum(gap, 0).sum(axis=1) + beta * np.maximum(-gap, 0).sum(axis=1)
+    # штраф за перевищення Q_max
+    cost += np.maximum(orders.sum(axis=1) - Q_max, 0) * 1000  # великий штраф
+    return cost
+
+
+def _deap():
+    """
+    Лінивий імпорт DEAP (потрібен лише для engine="ga") і створення класів creator,
+    якщо їх ще немає (уникаємо дублювання creator між агентами).
+    """
+    from deap import base, creator, tools, algorithms
+
+    if not hasattr(creator, "FitnessMax"):
+        creator.create("FitnessMax", base.Fitness, weights=(1.0,))
+    if not hasattr(creator, "Individual"):
+        creator.create("Individual", list, fitness=creator.FitnessMax)
+    return base, creator, tools, algorithms
+
 
 class InventoryAgent:
     """
@@ -9,25 +49,63 @@ class InventoryAgent:
         beta: вартість надлишкового зберігання за одиницю
         Q_max: максимально доступна кількість одиниць для відвантаження (на період)
         initial_stock: словник {store_id: поточний_stock}
+        incremental: інкрементальний режим (rolling horizon) — агент пам'ятає розв'язок і популяцію
+                     GA між викликами і стартує наступний тиждень з них (див. _warm_seed)
+        regions: шардований режим — {store_id: регіон} (sharding.regions_from_catalog або мапінг
+                 користувача); Q_max ділиться між регіонами, кожен оптимізується окремо й паралельно,
+                 далі прохід узгодження (див. sharding.run_sharded). Магазини поза мапінгом — регіон "other".
+        shard_options: параметри run_sharded (processes, max_shard_size)
+        layout: режим SKU — utils.sku_layout.SkuLayout активних пар (магазин, SKU). Тоді позиції
+                («items») — пари, а не магазини: stock — плоский масив (n_pairs,) int64 (initial_stock —
+                такий масив або {(store_id, sku_id): units}), demands — масив (n_pairs,) або
+                {(store_id, sku_id): попит}, Q_max — спільна місткість на всі пари. Вартість сепарабельна,
+                тож усі двигуни працюють на парах без змін.
     """
 
-    def __init__(self, alpha: float, beta: float, Q_max: int, initial_stock: dict):
+    def __init__(self, alpha: float, beta: float, Q_max: int, initial_stock, incremental: bool = False,
+                 regions: dict = None, shard_options: dict = None, layout=None):
         self.alpha = alpha
         self.beta = beta
         self.Q_max = Q_max
-        self.stock = initial_stock.copy()  # {store_id: units}
-        self.store_ids = list(self.stock.keys())
+        self.layout = layout
+        if layout is None:
+            self.stock = initial_stock.copy()  # {store_id: units}
+            self.store_ids = list(self.stock.keys())
+        else:
+            if isinstance(initial_stock, dict):
+                initial_stock = layout.gather(initial_stock)
+            self.stock = np.asarray(initial_stock, dtype=np.int64).copy()  # (n_pairs,) у порядку layout
+            if self.stock.shape != (layout.n_pairs,):
+                raise ValueError(f"initial_stock має форму {self.stock.shape}, очікується ({layout.n_pairs},).")
+            self.store_ids = layout.store_ids.tolist()
+        self.incremental = incremental
+        self.last_run_stats = None  # {"engine", "cost", "wall_time_s", "warm_start", ...} останнього виклику
+        self.run_history = []       # last_run_stats усіх викликів — щоб бачити економію від warm start
+        # Стан попереднього виклику: {"demand", "stock", "orders", "population"} (масиви у порядку store_ids)
+        self._warm = None
+        self.shard_options = dict(shard_options or {})
+        self.region_labels = None  # регіон кожного магазину у порядку store_ids
+        if regions is not None:
+            from inventory_agent.sharding import DEFAULT_REGION
+            self.region_labels = np.array([str(regions.get(sid, DEFAULT_REGION)) for sid in self.store_ids])
+            if layout is not None:
+                # Пара належить регіону свого магазину
+                self.region_labels = layout.broadcast_store(self.region_labels)
 
-        # DEAP setup (створимо класи, якщо ще не створені)
-        # Уникаємо дублювання creator: перевіряємо, чи вже є такі класи
-        try:
-            creator.FitnessMax
-        except AttributeError:
-            creator.create("FitnessMax", base.Fitness, weights=(1.0,))
-        try:
-            creator.Individual
-        except AttributeError:
-            creator.create("Individual", list, fitness=creator.FitnessMax)
+    def aligned_arrays(self, demands):
+        """
+        Повертає (demand, stock) як масиви NumPy у порядку self.store_ids
+        (у режимі SKU — у порядку пар layout; demands — масив (n_pairs,) або словник пар).
+        """
+        if self.layout is not None:
+            if isinstance(demands, dict):
+                demand = self.layout.gather(demands)
+            else:
+                demand = np.asarray(demands, dtype=np.float64)
+            return demand, self.stock.astype(np.float64)
+        demand = np.array([demands.get(store_id, 0) for store_id in self.store_ids], dtype=np.float64)
+        stock = np.array([self.stock.get(store_id, 0) for store_id in self.store_ids], dtype=np.float64)
+        return demand, stock
 
     def fitness(self, individual, demands: dict):
         """
@@ -36,31 +114,340 @@ class InventoryAgent:
         - demands: {store_id: demand_for_week}
         Повертає кортеж ( —cost ), оскільки ми хочемо мінімізувати cost → максимізуємо -cost
         """
-        cost = 0
-        for idx, store_id in enumerate(self.store_ids):
-            p_i = demands.get(store_id, 0)
-            s_i = self.stock.get(store_id, 0)
-            q_i = individual[idx]
-            # дефіцит
-            deficit = max(p_i - (s_i + q_i), 0)
-            # надлишок
-            over = max((s_i + q_i) - p_i, 0)
-            cost += self.alpha * deficit + self.beta * over
+        demand, stock = self.aligned_arrays(demands)
+        cost = population_costs(individual, demand, stock, self.alpha, self.beta, self.Q_max)[0]
+        return (-float(cost),)
 
-        # штраф за перевищення Q_max
-        total_order = sum(individual)
-        if total_order > self.Q_max:
-            cost += (total_order - self.Q_max) * 1000  # великий штраф
+    def evaluate_population(self, population, demand: np.ndarray, stock: np.ndarray):
+        """
+        Оцінює всю популяцію одним векторизованим проходом (матриця pop × stores).
+        Повертає список кортежів (-cost,) у порядку population — як toolbox.map(evaluate, ...).
+        """
+        if not population:
+            return []
+        costs = population_costs(np.array(population), demand, stock, self.alpha, self.beta, self.Q_max)
+        return [(-float(c),) for c in costs]
 
-        return (-cost,)
+    @staticmethod
+    def _ea_simple(population, toolbox, cxpb: float, mutpb: float, ngen: int, stats=None,
+                   halloffame=None, patience: int = None, tol: float = 0.0):
+        """
+        Той самий цикл, що й algorithms.eaSimple, але нові (invalid) індивіди
+        оцінюються пакетом через toolbox.evaluate_population, а не по одному.
+        Якщо задано patience (разом із halloffame) — рання зупинка, коли найкращий
+        знайдений розв'язок не покращився більше ніж на tol протягом patience поколінь.
+        """
+        _, _, tools, algorithms = _deap()
+        logbook = tools.Logbook()
+        logbook.header = ["gen", "nevals"] + (stats.fields if stats else [])
+
+        def evaluate_invalid(individuals):
+            invalid = [ind for ind in individuals if not ind.fitness.valid]
+            for ind, fit in zip(invalid, toolbox.evaluate_population(invalid)):
+                ind.fitness.values = fit
+            return len(invalid)
+
+        nevals = evaluate_invalid(population)
+        if halloffame is not None:
+            halloffame.update(population)
+        record = stats.compile(population) if stats else {}
+        logbook.record(gen=0, nevals=nevals, **record)
+
+        best = halloffame[0].fitness.values[0] if halloffame is not None else None
+        stale = 0
+        for gen in range(1, ngen + 1):
+            offspring = toolbox.select(population, len(population))
+            offspring = algorithms.varAnd(offspring, toolbox, cxpb, mutpb)
+            nevals = evaluate_invalid(offspring)
+            if halloffame is not None:
+                halloffame.update(offspring)
+            population[:] = offspring
+            record = stats.compile(population) if stats else {}
+            logbook.record(gen=gen, nevals=nevals, **record)
 
-    def optimize_orders(self, demands: dict) -> dict:
+            if patience is not None and halloffame is not None:
+                current = halloffame[0].fitness.values[0]
+                if current > best + tol:
+                    best, stale = current, 0
+                else:
+                    stale += 1
+                    if stale >= patience:
+                        break
+
+        return population, logbook
+
+    def optimize_orders(self, demands: dict, engine: str = "ga", islands: int = 1,
+                        warm_start: bool = None, **island_options) -> dict:
         """
         demands: {store_id: demand_for_week}
-        Повертає словник {store_id: optimal_q}.
+        engine: "ga" — генетичний алгоритм (DEAP), придатний і для неcепарабельних розширень cost;
+                       при islands > 1 — острівна модель у пулі процесів (див. island_ga.run_island_ga,
+                       island_options передаються туди: pop_size, migration_interval, patience, processes, ...);
+                "greedy" — точний water-filling розв'язок для поточної (сепарабельної) моделі cost;
+                "lp" — точний розв'язок через лінійне програмування (scipy.optimize.linprog).
+        warm_start: стартувати з розв'язку попереднього виклику (за замовчуванням — self.incremental).
+        Повертає словник {store_id: optimal_q}; у режимі SKU — розріджений {(store_id, sku_id): q}
+        лише з ненульовими замовленнями (для великих мереж краще optimize_arrays).
         Після оптимізації не змінює self.stock — доставка моделюється окремо через SupplierAgent.
+        Вартість, час роботи та збіжність останнього виклику — у self.last_run_stats.
+        """
+        demand, stock = self.aligned_arrays(demands)
+        q = self.optimize_arrays(demand, stock, engine=engine, islands=islands,
+                                 warm_start=warm_start, **island_options)
+        if self.layout is not None:
+            return self.layout.to_dict(q)
+        orders = { self.store_ids[i]: int(q[i]) for i in range(len(self.store_ids)) }
+        return orders
+
+    def optimize_arrays(self, demand: np.ndarray, stock: np.ndarray,
+                        engine: str = "ga", islands: int = 1,
+                        warm_start: bool = None, **island_options) -> np.ndarray:
+        """
+        Те саме, що optimize_orders, але на масивах, вирівняних за self.store_ids (або парами layout):
+        demand, stock: (stores,) → повертає замовлення (stores,) int64.
+        stock може бути пакетом станів (R, stores) (Monte Carlo): тоді повертається (R, stores);
+        "greedy" розв'язує всі рядки разом, інші двигуни — по рядку (без warm start).
+        Якщо задано regions — для одного стану шардована оптимізація (без warm start).
+        Використовується векторизованою симуляцією, щоб не будувати словники щотижня.
+        """
+        if engine not in ENGINES:
+            raise ValueError(f"Невідомий engine={engine!r}; доступні: {ENGINES}")
+        demand = np.asarray(demand, dtype=np.float64)
+        stock = np.asarray(stock, dtype=np.float64)
+        warm_start = self.incremental if warm_start is None else warm_start
+
+        started = time.perf_counter()
+        with instrument.timer(f"inventory.{engine}"):
+            if self.region_labels is not None and stock.ndim == 1:
+                from inventory_agent.sharding import run_sharded
+                q, extra = run_sharded(demand, stock, self.alpha, self.beta, self.Q_max, self.region_labels,
+                                       engine=engine, islands=islands, island_options=island_options,
+                                       **self.shard_options)
+                extra["warm_start"] = False
+            elif stock.ndim == 2 and engine != "greedy":
+                q = np.stack([self._solve(demand, row, engine, islands, False, island_options)[0] for row in stock])
+                extra = {"warm_start": False}
+            else:
+                q, extra = self._solve(demand, stock, engine, islands, warm_start and stock.ndim == 1, island_options)
+        wall_time = time.perf_counter() - started
+        instrument.count("inventory.generations", extra.get("generations", 0))
+
+        cost = float(population_costs(q, demand, stock, self.alpha, self.beta, self.Q_max).sum())
+        self.last_run_stats = {"engine": engine, "cost": cost, "wall_time_s": wall_time, **extra}
+        self.run_history.append(dict(self.last_run_stats))
+        return q
+
+    def _solve(self, demand: np.ndarray, stock: np.ndarray, engine: str, islands: int,
+               warm_start: bool, island_options: dict):
+        """
+        Запускає обраний двигун. Повертає (замовлення, додаткова статистика для last_run_stats).
+        Для одного стану (stock — (stores,)) запам'ятовує розв'язок для наступного warm start.
+        """
+        extra = {"warm_start": False}
+        if engine == "ga" and islands > 1:
+            from inventory_agent.island_ga import run_island_ga
+            q, ga_stats = run_island_ga(demand, stock, self.alpha, self.beta, self.Q_max,
+                                        islands=islands, **island_options)
+            extra.update(islands=islands, epochs=ga_stats["epochs"], generations=ga_stats["generations"])
+            population = None
+        elif engine == "ga":
+            q, ga_stats, population = self._optimize_ga(demand, stock, warm_start=warm_start)
+            extra.update(ga_stats)
+        elif engine == "greedy":
+            q, population = self._optimize_greedy(demand, stock), None
+        else:
+            q, population = self._optimize_lp(demand, stock), None
+
+        if stock.ndim == 1:
+            self._warm = {"demand": demand.copy(), "stock": stock.copy(),
+                          "orders": np.asarray(q, dtype=np.int64).copy(), "population": population}
+        return q, extra
+
+    def get_state(self) -> dict:
+        """
+        Змінний стан агента (для checkpoint довгої симуляції): запаси, стан warm start
+        (розв'язок і популяція GA), статистика викликів.
+        """
+        import copy
+        return copy.deepcopy({"stock": self.stock, "warm": self._warm,
+                              "last_run_stats": self.last_run_stats, "run_history": self.run_history})
+
+    def set_state(self, state: dict) -> None:
+        """
+        Відновлює стан, збережений get_state().
+        """
+        import copy
+        state = copy.deepcopy(state)
+        self.stock = state["stock"]
+        self._warm = state["warm"]
+        self.last_run_stats = state["last_run_stats"]
+        self.run_history = state["run_history"]
+
+    def reset_warm_start(self) -> None:
+        """
+        Забуває збережений розв'язок: наступний виклик стартує «з нуля».
         """
-        N = len(self.store_ids)
+        self._warm = None
+
+    def _warm_seed(self, demand: np.ndarray, stock: np.ndarray):
+        """
+        Зсув попереднього тижня під нові дані: delta — зміна чистої потреби (попит − запас)
+        відносно попереднього виклику. Повертає (delta, seed), де seed — минулі замовлення + delta,
+        обрізані до [0, Q_max] і масштабовані, якщо сума перевищує Q_max.
+        None, якщо збереженого стану немає або змінився склад магазинів.
+        """
+        prev = self._warm
+        if prev is None or prev["orders"].shape != demand.shape:
+            return None
+        delta = (demand - stock) - (prev["demand"] - prev["stock"])
+        seed = np.clip(np.rint(prev["orders"] + delta), 0, self.Q_max)
+        total = seed.sum()
+        if total > self.Q_max:
+            seed = np.floor(seed * (self.Q_max / total))
+        return delta, seed.astype(np.int64)
+
+    def compare_engines(self, demands: dict, engines=ENGINES) -> dict:
+        """
+        Запускає optimize_orders кожним engine на тих самих demands і повертає
+        {engine: {"cost", "wall_time_s", "gap", "gap_pct"}}, де gap — різниця cost
+        відносно найкращого з engines (gap_pct = None, якщо найкращий cost нульовий, а gap > 0).
+        Кожен engine стартує з однакового стану агента; після порівняння стан (warm start,
+        last_run_stats, run_history) відновлюється — порівняння не впливає на наступні виклики.
+        """
+        saved = self.get_state()
+        report = {}
+        try:
+            for engine in engines:
+                self.set_state(saved)
+                self.optimize_orders(demands, engine=engine)
+                report[engine] = dict(self.last_run_stats)
+        finally:
+            self.set_state(saved)
+        best = min(r["cost"] for r in report.values())
+        for engine, r in report.items():
+            r["gap"] = r["cost"] - best
+            if best:
+                r["gap_pct"] = 100.0 * r["gap"] / best
+            else:
+                r["gap_pct"] = None if r["gap"] > 0 else 0.0
+            gap_pct = "n/a" if r["gap_pct"] is None else f"{r['gap_pct']:.2f}%"
+            print(f"[InventoryAgent.compare_engines] {engine}: cost={r['cost']:.2f} "
+                  f"(gap {r['gap']:.2f}, {gap_pct}), time={r['wall_time_s']:.3f}s")
+        return report
+
+    def _optimize_greedy(self, demand: np.ndarray, stock: np.ndarray) -> np.ndarray:
+        """
+        Точний розв'язок для сепарабельної кусково-лінійної вартості.
+        Кожна одиниця замовлення до рівня попиту знижує cost на alpha, а понад попит — додає beta,
+        тож оптимально замовляти рівно need_i = max(p_i - s_i, 0).
+        Дробовий попит: повні одиниці потреби (floor) дають по alpha, а остання, часткова одиниця —
+        лише frac·alpha − (1 − frac)·beta, тож вона вигідна, якщо цей виграш > 0.
+        Якщо сума need перевищує Q_max: поки повних одиниць більше за Q_max, кожна одиниця дає ту саму
+        економію alpha, тому будь-який розподіл Q_max у межах повних одиниць оптимальний; обираємо
+        water-filling, який вирівнює залишковий дефіцит між магазинами. Якщо ж повні одиниці вміщуються,
+        залишок Q_max отримують часткові одиниці з найбільшим виграшем (збігається з _optimize_lp).
+        Працює і для пакета станів: stock форми (R, stores) → замовлення (R, stores),
+        кожен рядок розв'язується незалежно (без циклу Python).
+        """
+        batched = np.ndim(stock) == 2
+        stock2d = np.atleast_2d(stock)
+        R, N = stock2d.shape
+        if self.alpha <= 0 or self.Q_max <= 0:
+            q = np.zeros((R, N), dtype=np.int64)
+            return q if batched else q[0]
+
+        raw_need = np.maximum(demand - stock2d, 0)
+        full = np.floor(raw_need)
+        # Дробовий залишок: ще одна одиниця вигідна, якщо frac·alpha > (1 - frac)·beta
+        frac = raw_need - full
+        gain = frac * self.alpha - (1 - frac) * self.beta
+        partial = gain > 0
+        full = full.astype(np.int64)
+        need = full + partial
+
+        fits = need.sum(axis=1) <= self.Q_max
+        if fits.all():
+            return need if batched else need[0]
+
+        # Повні одиниці вміщуються: решту Q_max — частковим одиницям з найбільшим виграшем
+        spare = self.Q_max - full.sum(axis=1)
+        order = np.argsort(-np.where(partial, gain, -np.inf), axis=1, kind="stable")
+        ranks = np.empty_like(order)
+        np.put_along_axis(ranks, order, np.arange(N)[None, :].repeat(R, axis=0), axis=1)
+        with_partial = full + (partial & (ranks < spare[:, None]))
+        if (spare >= 0).all():
+            return with_partial if batched else with_partial[0]
+
+        # Water-filling повних одиниць: шукаємо рівень t, за якого sum(max(full - t, 0)) = Q_max
+        need_sorted = -np.sort(-full, axis=1).astype(np.float64)
+        k = np.arange(1, N + 1)
+        levels = (np.cumsum(need_sorted, axis=1) - self.Q_max) / k
+        next_need = np.concatenate([need_sorted[:, 1:], np.zeros((R, 1))], axis=1)
+        # перше k, для якого рівень не нижчий за потребу наступного магазину
+        t = levels[np.arange(R), np.argmax(levels >= next_need, axis=1)]
+
+        q = np.floor(np.maximum(full - t[:, None], 0)).astype(np.int64)
+        # Розподіляємо цілочисельний залишок тим, у кого найбільший залишковий дефіцит
+        remainder = self.Q_max - q.sum(axis=1)
+        order = np.argsort(-(full - q), axis=1, kind="stable")
+        ranks = np.empty_like(order)
+        np.put_along_axis(ranks, order, np.arange(N)[None, :].repeat(R, axis=0), axis=1)
+        q += ranks < remainder[:, None]
+
+        q = np.where(spare[:, None] >= 0, with_partial, q)
+        return q if batched else q[0]
+
+    def _optimize_lp(self, demand: np.ndarray, stock: np.ndarray) -> np.ndarray:
+        """
+        Точний розв'язок через LP зі змінними (q, deficit, over):
+            min  alpha·Σdeficit + beta·Σover
+            s.t. deficit_i >= p_i - s_i - q_i,  over_i >= s_i + q_i - p_i,  Σq_i <= Q_max,  все >= 0
+        Матриця обмежень тотально унімодулярна, тож для цілих попиту/запасів вершина LP цілочисельна;
+        для дробового попиту q задається цілочисельним (MILP), інакше округлення вершини неоптимальне.
+        """
+        from scipy.optimize import linprog
+        from scipy import sparse
+
+        N = demand.shape[0]
+        eye = sparse.identity(N, format="csr")
+        zero = sparse.csr_matrix((N, N))
+        A_ub = sparse.vstack([
+            sparse.hstack([-eye, -eye, zero]),   # -q - deficit <= s - p
+            sparse.hstack([eye, zero, -eye]),    #  q - over    <= p - s
+            sparse.hstack([sparse.csr_matrix(np.ones((1, N))), sparse.csr_matrix((1, 2 * N))]),
+        ], format="csr")
+        b_ub = np.concatenate([stock - demand, demand - stock, [self.Q_max]])
+        c = np.concatenate([np.zeros(N), np.full(N, self.alpha), np.full(N, self.beta)])
+
+        integral = np.array_equal(demand, np.round(demand)) and np.array_equal(stock, np.round(stock))
+        integrality = None if integral else np.concatenate([np.ones(N), np.zeros(2 * N)])
+        res = linprog(c, A_ub=A_ub, b_ub=b_ub, bounds=(0, None), method="highs", integrality=integrality)
+        if not res.success:
+            raise RuntimeError(f"LP не розв'язано: {res.message}")
+
+        q = np.maximum(np.rint(res.x[:N]), 0).astype(np.int64)
+        # Захист від округлення: не перевищуємо Q_max
+        excess = int(q.sum() - self.Q_max)
+        if excess > 0:
+            for i in np.argsort(-q)[:excess]:
+                q[i] -= 1
+        return q
+
+    def _optimize_ga(self, demand: np.ndarray, stock: np.ndarray, warm_start: bool = False,
+                     pop_size: int = 50, ngen: int = 40, patience: int = 5, fresh_share: float = 0.2):
+        """
+        Генетичний алгоритм (DEAP) з пакетною оцінкою популяції.
+        Холодний старт: випадкова популяція, рівно ngen поколінь.
+        Warm start (якщо є стан попереднього виклику): популяція минулого тижня, зсунута на delta
+        чистої потреби, + seed (минулі замовлення + delta) + частка fresh_share випадкових індивідів
+        для різноманіття; еволюція зупиняється, щойно найкращий розв'язок не покращується
+        patience поколінь (зазвичай кілька поколінь замість ngen).
+        Повертає (замовлення найкращого індивіда у порядку self.store_ids,
+                  {"warm_start", "generations", "evaluations", "seed_cost", "best_history"},
+                  фінальна популяція (pop, stores) int64).
+        """
+        base, creator, tools, _ = _deap()
+        N = demand.shape[0]
 
         # 1) Налаштуємо toolbox
         toolbox = base.Toolbox()
@@ -68,23 +455,47 @@ class InventoryAgent:
         toolbox.register("individual", tools.initRepeat, creator.Individual, toolbox.attr_int, n=N)
         toolbox.register("population", tools.initRepeat, list, toolbox.individual)
 
-        toolbox.register("evaluate", self.fitness, demands=demands)
+        toolbox.register("evaluate", lambda ind: self.evaluate_population([ind], demand, stock)[0])
+        toolbox.register("evaluate_population", self.evaluate_population, demand=demand, stock=stock)
         toolbox.register("mate", tools.cxUniform, indpb=0.5)
         toolbox.register("mutate", tools.mutUniformInt, low=0, up=self.Q_max, indpb=0.2)
         toolbox.register("select", tools.selTournament, tournsize=3)
 
         # 2) Ініціалізуємо популяцію
-        pop = toolbox.population(n=50)
+        warm = self._warm_seed(demand, stock) if warm_start else None
+        seed_cost = None
+        if warm is None:
+            pop = toolbox.population(n=pop_size)
+            hof, early_stop = None, None
+        else:
+            delta, seed = warm
+            seed_cost = float(population_costs(seed, demand, stock, self.alpha, self.beta, self.Q_max)[0])
+            carried = []
+            if self._warm["population"] is not None:
+                shifted = np.clip(np.rint(self._warm["population"] + delta), 0, self.Q_max).astype(np.int64)
+                carried = [creator.Individual(row) for row in shifted.tolist()]
+            n_carried = min(len(carried), pop_size - 1 - int(fresh_share * pop_size))
+            pop = [creator.Individual(seed.tolist())] + carried[:n_carried]
+            pop += toolbox.population(n=pop_size - len(pop))
+            hof, early_stop = tools.HallOfFame(1), patience
 
         # 3) Еволюція
         stats = tools.Statistics(lambda ind: ind.fitness.values)
         stats.register("avg", lambda x: sum(f[0] for f in x) / len(x))
         stats.register("max", max)
 
-        pop, logbook = algorithms.eaSimple(pop, toolbox,
-                                           cxpb=0.5, mutpb=0.2,
-                                           ngen=40, stats=stats, verbose=False)
-        # 4) Найкращий індивід
-        best_ind = tools.selBest(pop, 1)[0]
-        orders = { self.store_ids[i]: best_ind[i] for i in range(N) }
-        return orders
+        # (оцінка — пакетна, матрицею pop × stores)
+        pop, logbook = self._ea_simple(pop, toolbox,
+                                       cxpb=0.5, mutpb=0.2,
+                                       ngen=ngen, stats=stats,
+                                       halloffame=hof, patience=early_stop)
+        # 4) Найкращий індивід (у warm-режимі — найкращий за всі покоління, щоб не втратити seed)
+        best_ind = hof[0] if hof is not None else tools.selBest(pop, 1)[0]
+        ga_stats = {
+            "warm_start": warm is not None,
+            "generations": len(logbook) - 1,
+            "evaluations": int(sum(logbook.select("nevals"))),
+            "seed_cost": seed_cost,
+            "best_history": [-m[0] for m in logbook.select("max")],
+        }
+        return np.asarray(best_ind, dtype=np.int64), ga_stats, np.asarray(pop, dtype=np.int64)
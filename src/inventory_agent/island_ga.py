@@ -0,0 +1,169 @@
+import os
+import numpy as np
+from multiprocessing import Pool, shared_memory
+
+# Масиви demand / stock, приєднані з shared memory (по одному разу на процес-воркер)
+_shared = {}
+
+
+def _attach_shared(demand_name: str, stock_name: str, n_stores: int, params: tuple) -> None:
+    """
+    Ініціалізатор воркера: під'єднується до спільних масивів demand/stock,
+    щоб їх не передавати (pickle) з кожним завданням.
+    """
+    demand_shm = shared_memory.SharedMemory(name=demand_name)
+    stock_shm = shared_memory.SharedMemory(name=stock_name)
+    _shared["shm"] = (demand_shm, stock_shm)  # тримаємо посилання, поки живий процес
+    _shared["demand"] = np.ndarray((n_stores,), dtype=np.float64, buffer=demand_shm.buf)
+    _shared["stock"] = np.ndarray((n_stores,), dtype=np.float64, buffer=stock_shm.buf)
+    _shared["params"] = params
+
+
+def _costs(pop: np.ndarray) -> np.ndarray:
+    """
+    Вартість популяції — та сама формула, що й population_costs в inventory_agent.
+    """
+    from inventory_agent.inventory_agent import population_costs
+    alpha, beta, Q_max = _shared["params"][:3]
+    return population_costs(pop, _shared["demand"], _shared["stock"], alpha, beta, Q_max)
+
+
+def _evolve_island(args):
+    """
+    Еволюціонує одну острівну популяцію протягом ngen поколінь (NumPy-аналог eaSimple
+    з тими самими операторами: selTournament(3), cxUniform(0.5), mutUniformInt(0.2))
+    + елітизм: найкращий індивід покоління завжди переживає відбір.
+    Повертає (pop, costs, best_history).
+    """
+    pop, costs, ngen, seed = args
+    alpha, beta, Q_max, cxpb, mutpb = _shared["params"]
+    rng = np.random.default_rng(seed)
+    P, N = pop.shape
+    history = []
+
+    for _ in range(ngen):
+        elite = pop[np.argmin(costs)].copy()
+        elite_cost = costs.min()
+
+        # Турнірний відбір (tournsize=3): переможець — з найменшою вартістю
+        contenders = rng.integers(0, P, size=(P, 3))
+        winners = contenders[np.arange(P), np.argmin(costs[contenders], axis=1)]
+        offspring = pop[winners].copy()
+
+        # Рівномірне схрещування пар (0,1), (2,3), ... з імовірністю cxpb
+        n_pairs = P // 2
+        do_cx = rng.random(n_pairs) < cxpb
+        swap = (rng.random((n_pairs, N)) < 0.5) & do_cx[:, None]
+        first, second = offspring[0:2 * n_pairs:2], offspring[1:2 * n_pairs:2]
+        first_copy = first.copy()
+        first[swap] = second[swap]
+        second[swap] = first_copy[swap]
+
+        # Мутація: з імовірністю mutpb індивід отримує нові випадкові гени (indpb=0.2)
+        do_mut = rng.random(P) < mutpb
+        mut_mask = (rng.random((P, N)) < 0.2) & do_mut[:, None]
+        offspring[mut_mask] = rng.integers(0, Q_max + 1, size=int(mut_mask.sum()))
+
+        costs = _costs(offspring)
+        worst = np.argmax(costs)
+        if costs[worst] > elite_cost:
+            offspring[worst] = elite
+            costs[worst] = elite_cost
+        pop = offspring
+        history.append(float(costs.min()))
+
+    return pop, costs, history
+
+
+def run_island_ga(demand: np.ndarray, stock: np.ndarray,
+                  alpha: float, beta: float, Q_max: int,
+                  islands: int = 4, pop_size: int = 50, max_epochs: int = 20,
+                  migration_interval: int = 10, n_migrants: int = 2,
+                  patience: int = 3, tol: float = 1e-6,
+                  cxpb: float = 0.5, mutpb: float = 0.2,
+                  processes: int = None, seed: int = None):
+    """
+    Острівна модель GA: islands популяцій еволюціонують паралельно у пулі процесів.
+    Кожні migration_interval поколінь (одна «епоха») n_migrants найкращих індивідів кожного
+    острова замінюють найгірших на наступному острові (кільце).
+    demand/stock лежать у shared memory — воркерам передаються лише популяції раз на епоху.
+    Рання зупинка: якщо найкраща вартість не покращилась більше ніж на tol протягом patience епох.
+    Повертає (best_orders, stats) де stats = {"best_cost", "epochs", "generations", "history"}.
+    """
+    N = demand.shape[0]
+    processes = min(islands, processes or os.cpu_count() or 1)
+    seeds = np.random.SeedSequence(seed).spawn(islands + 1)
+    init_rng = np.random.default_rng(seeds[-1])
+    params = (float(alpha), float(beta), int(Q_max), float(cxpb), float(mutpb))
+
+    demand_shm = shared_memory.SharedMemory(create=True, size=max(N, 1) * 8)
+    stock_shm = shared_memory.SharedMemory(create=True, size=max(N, 1) * 8)
+    pool = None
+    try:
+        np.ndarray((N,), dtype=np.float64, buffer=demand_shm.buf)[:] = demand
+        np.ndarray((N,), dtype=np.float64, buffer=stock_shm.buf)[:] = stock
+        init_args = (demand_shm.name, stock_shm.name, N, params)
+        if processes > 1:
+            pool = Pool(processes, initializer=_attach_shared, initargs=init_args)
+            run = pool.map
+        else:
+            # один процес — рахуємо у поточному (без накладних витрат пулу)
+            _attach_shared(*init_args)
+            run = lambda fn, tasks: list(map(fn, tasks))
+
+        pops = [init_rng.integers(0, Q_max + 1, size=(pop_size, N)) for _ in range(islands)]
+        costs = run(_costs, pops)
+
+        # Найкращий серед початкових популяцій: результат визначений і без жодної епохи (max_epochs=0)
+        island = int(np.argmin([c.min() for c in costs]))
+        best_cost = float(costs[island].min())
+        best_ind = pops[island][np.argmin(costs[island])].copy()
+        history = []
+        stale = 0
+        epochs = 0
+        for epoch in range(max_epochs):
+            epochs += 1
+            tasks = [(pops[i], costs[i], migration_interval, seeds[i].spawn(1)[0]) for i in range(islands)]
+            results = run(_evolve_island, tasks)
+            pops = [r[0] for r in results]
+            costs = [r[1] for r in results]
+            history.append(min(min(r[2]) for r in results))
+
+            # Найкращий глобально
+            island = int(np.argmin([c.min() for c in costs]))
+            epoch_best = float(costs[island].min())
+            if epoch_best < best_cost - tol:
+                best_cost = epoch_best
+                best_ind = pops[island][np.argmin(costs[island])].copy()
+                stale = 0
+            else:
+                stale += 1
+                if stale >= patience:
+                    break
+
+            # Міграція по кільцю: кращі i → замість гірших (i + 1)
+            if islands > 1:
+                migrants = [(p[np.argsort(c)[:n_migrants]].copy(), np.sort(c)[:n_migrants])
+                            for p, c in zip(pops, costs)]
+                for i in range(islands):
+                    target = (i + 1) % islands
+                    worst = np.argsort(costs[target])[-n_migrants:]
+                    pops[target][worst] = migrants[i][0]
+                    costs[target][worst] = migrants[i][1]
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+        _shared.clear()
+        demand_shm.close()
+        demand_shm.unlink()
+        stock_shm.close()
+        stock_shm.unlink()
+
+    stats = {
+        "best_cost": float(best_cost),
+        "epochs": epochs,
+        "generations": epochs * migration_interval,
+        "history": history,
+    }
+    return best_ind.astype(np.int64), stats
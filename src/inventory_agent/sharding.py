@@ -0,0 +1,192 @@
+import os
+import time
+import numpy as np
+from multiprocessing import Pool
+
+# Атрибути store.csv, за якими за замовчуванням магазини групуються в регіони
+DEFAULT_REGION_KEYS = ("StoreType", "Assortment")
+
+# Регіон для магазинів, яких немає у мапінгу користувача
+DEFAULT_REGION = "other"
+
+
+def regions_from_catalog(store_ids, store_csv: str, by=DEFAULT_REGION_KEYS) -> dict:
+    """
+    {store_id: регіон} за атрибутами store.csv (StoreType / Assortment), напр. "StoreType=a|Assortment=c".
+    Рівні відновлюються з дамі StoreCatalog (базовий рівень «a» — коли всі дамі нульові).
+    """
+    from data_preparation.store_catalog import StoreCatalog, STATIC_FEATURES, STORE_TYPES, ASSORTMENTS
+
+    levels = {"StoreType": STORE_TYPES, "Assortment": ASSORTMENTS}
+    unknown = set(by) - set(levels)
+    if unknown:
+        raise ValueError(f"Невідомі ключі регіонів {sorted(unknown)}; доступні: {list(levels)}")
+    store_ids = np.asarray(store_ids, dtype=np.int64).ravel()
+    static = StoreCatalog.for_path(store_csv).lookup(store_ids)
+
+    parts = []
+    for key in by:
+        cols = [STATIC_FEATURES.index(f"{key}_{level}") for level in levels[key]]
+        dummies = static[:, cols] > 0
+        # Базовий рівень «a» — жодна дамі не ввімкнена
+        codes = np.where(dummies.any(axis=1), dummies.argmax(axis=1) + 1, 0)
+        names = np.array([f"{key}={level}" for level in ["a"] + levels[key]])
+        parts.append(names[codes])
+    labels = ["|".join(row) for row in zip(*parts)]
+    return dict(zip(store_ids.tolist(), labels))
+
+
+def load_region_mapping(path: str) -> dict:
+    """
+    Мапінг користувача {store_id: регіон} з таблиці (.csv/.parquet/.feather) з колонками Store, Region.
+    """
+    from data_preparation.load_data import load_table
+
+    df = load_table(path, columns=["Store", "Region"])
+    return dict(zip(df["Store"].astype(int).tolist(), df["Region"].astype(str).tolist()))
+
+
+def shard_indices(labels, max_shard_size: int = None) -> list:
+    """
+    Групує позиції магазинів за регіоном: [(назва, індекси), ...] у стабільному порядку назв.
+    max_shard_size — великі регіони діляться на частини не більші за цей розмір
+    (розмір шарда обмежений, тож час на шард не росте разом із мережею).
+    """
+    labels = np.asarray(labels)
+    shards = []
+    for name in sorted(set(labels.tolist())):
+        idx = np.flatnonzero(labels == name)
+        if max_shard_size and idx.shape[0] > max_shard_size:
+            n_parts = -(-idx.shape[0] // max_shard_size)
+            shards.extend((f"{name}#{k}", part) for k, part in enumerate(np.array_split(idx, n_parts)))
+        else:
+            shards.append((name, idx))
+    return shards
+
+
+def integer_need(demand: np.ndarray, stock: np.ndarray, alpha: float, beta: float) -> np.ndarray:
+    """
+    Вигідна кількість замовлення кожного магазину без обмеження Q_max (як у _optimize_greedy):
+    ціла частина нестачі + ще одна одиниця, якщо frac·alpha > (1 - frac)·beta.
+    """
+    raw_need = np.maximum(demand - stock, 0)
+    need = np.floor(raw_need)
+    frac = raw_need - need
+    return (need + (frac * alpha > (1 - frac) * beta)).astype(np.int64)
+
+
+def split_capacity(need: np.ndarray, shards: list, Q_max: int) -> np.ndarray:
+    """
+    Бюджет Q_max для кожного шарда.
+    Якщо загальна потреба вміщується в Q_max — кожен шард отримує свою потребу (решта — резерв для reconcile);
+    інакше Q_max ділиться пропорційно потребі шардів (найбільші залишки, сума рівно Q_max).
+    """
+    shard_need = np.array([need[idx].sum() for _, idx in shards], dtype=np.int64)
+    total = int(shard_need.sum())
+    if total <= Q_max:
+        return shard_need
+    exact = shard_need * (Q_max / total)
+    budgets = np.floor(exact).astype(np.int64)
+    remainder = int(Q_max - budgets.sum())
+    budgets[np.argsort(-(exact - budgets), kind="stable")[:remainder]] += 1
+    return budgets
+
+
+def _solve_shard(args):
+    """
+    Оптимізує один шард окремим InventoryAgent зі своїм бюджетом. Повертає (замовлення, статистика).
+    """
+    from inventory_agent.inventory_agent import InventoryAgent
+
+    demand, stock, alpha, beta, budget, engine, options = args
+    agent = InventoryAgent(alpha=alpha, beta=beta, Q_max=int(budget),
+                           initial_stock=dict.fromkeys(range(demand.shape[0]), 0))
+    q = agent.optimize_arrays(demand, stock, engine=engine, warm_start=False, **options)
+    return q, agent.last_run_stats
+
+
+def reconcile(q: np.ndarray, demand: np.ndarray, stock: np.ndarray,
+              alpha: float, beta: float, Q_max: int):
+    """
+    Дешевий прохід узгодження після шардів (O(stores log stores)):
+      1) зрізає замовлення понад вигідну потребу (кожна така одиниця лише додає beta і займає місткість)
+         і, якщо сума все одно більша за Q_max, пропорційно зменшує її до Q_max;
+      2) невикористану місткість (резерв, залишки округлення, недобір GA) розподіляє water-filling
+         між магазинами з найбільшим залишковим дефіцитом — по всій мережі, незалежно від шардів.
+    Повертає (замовлення, кількість переміщених одиниць).
+    """
+    from inventory_agent.inventory_agent import InventoryAgent
+
+    need = integer_need(demand, stock, alpha, beta)
+    trimmed = np.minimum(q, need)
+    moved = int((q - trimmed).sum())
+    leftover = int(Q_max - trimmed.sum())
+    if leftover < 0:
+        # Шард перевищив бюджет (GA допускає це зі штрафом): усі одиниці в межах need рівноцінні
+        # (кожна економить alpha), тож пропорційно зменшуємо до рівно Q_max
+        exact = trimmed * (Q_max / trimmed.sum())
+        scaled = np.floor(exact).astype(np.int64)
+        scaled[np.argsort(-(exact - scaled), kind="stable")[:int(Q_max - scaled.sum())]] += 1
+        moved += int((trimmed - scaled).sum())
+        trimmed = scaled
+    elif leftover > 0:
+        # Залишкова потреба після шардів: та сама формула need на стані stock + замовлення
+        top_up = InventoryAgent(alpha=alpha, beta=beta, Q_max=leftover,
+                                initial_stock={})._optimize_greedy(demand, stock + trimmed)
+        trimmed = trimmed + top_up
+        moved += int(top_up.sum())
+    return trimmed, moved
+
+
+def run_sharded(demand: np.ndarray, stock: np.ndarray, alpha: float, beta: float, Q_max: int,
+                labels, engine: str = "greedy", processes: int = None, max_shard_size: int = None,
+                islands: int = 1, island_options: dict = None):
+    """
+    Шардована оптимізація: магазини групуються за labels (регіонами), Q_max ділиться між шардами
+    (split_capacity), кожен шард розв'язується незалежно обраним engine — паралельно в пулі процесів,
+    далі reconcile перерозподіляє невикористану місткість по всій мережі.
+    processes: None — пул для "ga"/"lp" (до os.cpu_count()), послідовно для "greedy" (тут пул дорожчий
+    за саму задачу); 1 — завжди послідовно.
+    islands, island_options: параметри острівного GA для кожного шарда (як в optimize_orders).
+    Шарди в пулі виконуються у демонічних процесах, які не можуть відкрити власний пул,
+    тож острови всередині шарда тоді рахуються послідовно (island_options["processes"] = 1).
+    Повертає (замовлення (stores,) int64, статистика шардування).
+    """
+    demand = np.asarray(demand, dtype=np.float64)
+    stock = np.asarray(stock, dtype=np.float64)
+    shards = shard_indices(labels, max_shard_size)
+    need = integer_need(demand, stock, alpha, beta)
+    budgets = split_capacity(need, shards, Q_max)
+
+    if processes is None:
+        processes = 1 if engine == "greedy" else min(os.cpu_count() or 1, len(shards))
+    in_pool = processes > 1 and len(shards) > 1
+    options = dict(island_options or {}, islands=islands)
+    if in_pool:
+        options["processes"] = 1
+    tasks = [(demand[idx], stock[idx], alpha, beta, budget, engine, options)
+             for (_, idx), budget in zip(shards, budgets)]
+    started = time.perf_counter()
+    if in_pool:
+        with Pool(processes=processes) as pool:
+            results = pool.map(_solve_shard, tasks, chunksize=1)
+    else:
+        results = [_solve_shard(task) for task in tasks]
+    shards_time = time.perf_counter() - started
+
+    q = np.zeros(demand.shape[0], dtype=np.int64)
+    for (_, idx), (shard_q, _) in zip(shards, results):
+        q[idx] = shard_q
+
+    started = time.perf_counter()
+    q, moved = reconcile(q, demand, stock, alpha, beta, Q_max)
+    stats = {
+        "shards": len(shards),
+        "shard_sizes": [int(idx.shape[0]) for _, idx in shards],
+        "shard_processes": processes,
+        "shards_time_s": shards_time,
+        "shard_solve_time_s": float(sum(r[1]["wall_time_s"] for r in results)),
+        "reconcile_time_s": time.perf_counter() - started,
+        "reconciled_units": moved,
+    }
+    return q, stats
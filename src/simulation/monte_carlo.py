@@ -0,0 +1,148 @@
+import os
+import numpy as np
+import pandas as pd
+from datetime import date
+
+from simulation.vector_engine import VectorSimulation
+
+
+class ResidualNoise:
+    """
+    Шум попиту з відносних залишків моделі на валідації:
+    actual = forecast · (1 + r), де r вибирається з емпіричного розподілу (y - ŷ) / ŷ (бутстреп).
+    """
+
+    def __init__(self, relative_residuals: np.ndarray):
+        self.relative_residuals = np.asarray(relative_residuals, dtype=np.float64)
+
+    @classmethod
+    def from_validation(cls, forecast_agent, val_path: str, min_pred: float = 1.0) -> "ResidualNoise":
+        """
+        Оцінює відносні залишки ForecastAgent на валідаційному датасеті (будь-який формат load_xy).
+        """
+        X_val, y_val = forecast_agent.load_xy(val_path)
+        preds = forecast_agent.model.predict(X_val)
+        return cls((np.asarray(y_val) - preds) / np.maximum(preds, min_pred))
+
+    def sample(self, forecast: np.ndarray, n: int, rng: np.random.Generator) -> np.ndarray:
+        """
+        n реалізацій попиту навколо forecast (days, stores) → (n, days, stores), невід'ємні.
+        """
+        idx = rng.integers(0, self.relative_residuals.shape[0], size=(n,) + forecast.shape)
+        return np.maximum(forecast * (1.0 + self.relative_residuals[idx]), 0.0)
+
+
+class TreeSpreadNoise:
+    """
+    Шум попиту з розкиду прогнозів між деревами RandomForest:
+    actual ~ Normal(forecast, std_між_деревами), обрізаний знизу нулем.
+    """
+
+    def __init__(self, std: np.ndarray):
+        self.std = np.asarray(std, dtype=np.float64)
+
+    @classmethod
+    def from_forest(cls, forecast_agent, store_ids, start_date, n_days: int, store_csv: str) -> "TreeSpreadNoise":
+        """
+        std (days, stores) для того самого періоду, що й матриця попиту симуляції.
+        """
+        _, std = forecast_agent.predict_batch_spread(store_ids=store_ids,
+                                                     start_date=pd.Timestamp(start_date),
+                                                     horizon_days=n_days,
+                                                     store_csv=store_csv)
+        return cls(std.T)
+
+    def sample(self, forecast: np.ndarray, n: int, rng: np.random.Generator) -> np.ndarray:
+        """
+        n реалізацій попиту навколо forecast (days, stores) → (n, days, stores), невід'ємні.
+        """
+        return np.maximum(forecast + self.std * rng.standard_normal((n,) + forecast.shape), 0.0)
+
+
+def run_monte_carlo(store_ids,
+                    initial_stock: np.ndarray,
+                    demand: np.ndarray,
+                    start_date,
+                    noise,
+                    replications: int = 1000,
+                    chunk_size: int = 100,
+                    seed: int = 42,
+                    confidence: float = 0.95,
+                    **sim_params) -> pd.DataFrame:
+    """
+    Monte Carlo над VectorSimulation: реплікації — це пакетна вісь масивів симуляції, а не цикл Python.
+    - demand: прогноз (days, stores), на основі якого приймаються рішення про замовлення;
+    - noise: ResidualNoise або TreeSpreadNoise — генерує «фактичний» попит навколо прогнозу;
+    - реплікації обробляються чанками по chunk_size, тож пам'ять ~ chunk_size × days × stores;
+    - sim_params: alpha, beta, Q_max, delivery_delay_days, daily_limit, engine.
+    Повертає по тижнях: середнє, довірчий інтервал середнього (нормальне наближення)
+    та перцентильний інтервал для total_cost і fill_rate.
+    """
+    from statistics import NormalDist
+
+    rng = np.random.default_rng(seed)
+    n_weeks = demand.shape[0] // 7
+    costs, fills = [], []
+    week_starts = None
+
+    for done in range(0, replications, chunk_size):
+        n = min(chunk_size, replications - done)
+        actual = noise.sample(demand[:n_weeks * 7], n, rng)
+        sim = VectorSimulation(store_ids=store_ids,
+                               initial_stock=initial_stock,
+                               demand=demand,
+                               start_date=start_date,
+                               actual_sales=actual,
+                               **sim_params)
+        records = [sim.run_week() for _ in range(n_weeks)]
+        week_starts = [r["week_start"] for r in records]
+        costs.append(np.stack([r["total_cost"] for r in records], axis=1))   # (n, weeks)
+        fills.append(np.stack([r["fill_rate"] for r in records], axis=1))
+        del actual, sim
+
+    costs = np.concatenate(costs)
+    fills = np.concatenate(fills)
+    z = NormalDist().inv_cdf(0.5 + confidence / 2)
+    tail = 100 * (1 - confidence) / 2
+
+    df = pd.DataFrame({"week_start": week_starts})
+    for name, values in (("total_cost", costs), ("fill_rate", fills)):
+        mean = values.mean(axis=0)
+        se = values.std(axis=0, ddof=1) / np.sqrt(values.shape[0]) if values.shape[0] > 1 else np.zeros_like(mean)
+        df[f"{name}_mean"] = mean
+        df[f"{name}_ci_low"] = mean - z * se
+        df[f"{name}_ci_high"] = mean + z * se
+        df[f"{name}_p_low"] = np.percentile(values, tail, axis=0)
+        df[f"{name}_p_high"] = np.percentile(values, 100 - tail, axis=0)
+    df["replications"] = costs.shape[0]
+    return df
+
+
+if __name__ == "__main__":
+    # Запуск: PYTHONPATH=src python -m simulation.monte_carlo (шлях до файлу затінює пакет simulation)
+    import sys
+    from forecast_agent.forecast_agent import ForecastAgent
+    from forecast_agent.segmented_model import resolve_model_path
+    from simulation.vector_engine import build_demand_matrix
+    from data_preparation.load_data import load_table, save_table, find_table
+
+    base = os.path.abspath(os.path.join(os.path.dirname(__file__), "../.."))
+    store_csv = os.path.join(base, "data/raw/store.csv")
+    df_initial = load_table(find_table(os.path.join(base, "data/processed/initial_stock")))
+    store_ids = df_initial["Store"].tolist()
+    start, end = date(2025, 1, 1), date(2025, 3, 31)
+    n_days = ((end - start).days // 7 + 1) * 7
+
+    fa = ForecastAgent(model_path=resolve_model_path(os.path.join(base, "models")))
+    demand = build_demand_matrix(fa, store_ids, start, n_days, store_csv)
+    # --noise trees|residuals (за замовчуванням — розкид дерев)
+    if "residuals" in sys.argv:
+        noise = ResidualNoise.from_validation(fa, find_table(os.path.join(base, "data/processed/validation")))
+    else:
+        noise = TreeSpreadNoise.from_forest(fa, store_ids, start, n_days, store_csv)
+
+    df_mc = run_monte_carlo(store_ids, df_initial["InitialStock"].values, demand, start, noise,
+                            alpha=5, beta=1, Q_max=30000, delivery_delay_days=2, daily_limit=45000)
+    out_path = os.path.join(base, "data/processed/simulation_mc_results.csv")
+    save_table(df_mc, out_path)
+    print(f"[monte_carlo] Результати збережено у {out_path}")
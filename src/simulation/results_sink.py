@@ -0,0 +1,208 @@
+import os
+import glob
+import pickle
+from contextlib import contextmanager
+
+import pandas as pd
+
+from data_preparation.load_data import load_table, save_table, TABLE_FORMATS
+
+# Каталог частин поруч із базовим шляхом: <base>.parts/part-00000.<fmt>
+PARTS_SUFFIX = ".parts"
+# Файл checkpoint довгої симуляції (у data/processed)
+CHECKPOINT_FILE = "simulation_checkpoint.pkl"
+CHECKPOINT_VERSION = 2
+# Каталог прогонів (у data/processed): кожен прогін має власні частини, checkpoint і попит
+RUNS_DIR = "runs"
+LOCK_FILE = "run.lock"
+
+
+def parts_dir(base_path: str) -> str:
+    return base_path + PARTS_SUFFIX
+
+
+def run_dir(processed_dir: str, run_name: str) -> str:
+    return os.path.join(processed_dir, RUNS_DIR, run_name)
+
+
+def latest_run_dir(processed_dir: str, base_name: str = "simulation_results"):
+    """
+    Каталог прогону з найсвіжішою частиною base_name (зокрема незавершеного); None, якщо прогонів немає.
+    """
+    latest, latest_mtime = None, None
+    for path in glob.glob(os.path.join(processed_dir, RUNS_DIR, "*")):
+        parts = list_parts(os.path.join(path, base_name))
+        if parts:
+            mtime = os.path.getmtime(parts[-1])
+            if latest_mtime is None or mtime > latest_mtime:
+                latest, latest_mtime = path, mtime
+    return latest
+
+
+@contextmanager
+def run_lock(directory: str):
+    """
+    Ексклюзивний доступ до каталогу прогону: файл LOCK_FILE з PID створюється атомарно (O_EXCL),
+    тож другий прогін з тим самим каталогом отримує RuntimeError, а не перезаписує чужі частини.
+    Lock процесу, що вже завершився (збій), вважається застарілим і перехоплюється.
+    """
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, LOCK_FILE)
+    for _ in range(2):
+        try:
+            fd = os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except FileExistsError:
+            try:
+                with open(path) as f:
+                    pid = int(f.read() or 0)
+            except (OSError, ValueError):
+                pid = 0
+            if pid and _pid_alive(pid):
+                raise RuntimeError(f"Каталог {directory} уже використовує прогін (PID {pid}).") from None
+            print(f"[run_lock] Застарілий lock {path} (PID {pid}) — перехоплюю")
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            continue
+        with os.fdopen(fd, "w") as f:
+            f.write(str(os.getpid()))
+        break
+    else:
+        raise RuntimeError(f"Не вдалося захопити {path}.")
+    try:
+        yield directory
+    finally:
+        os.remove(path)
+
+
+def _pid_alive(pid: int) -> bool:
+    if os.name == "nt":
+        # os.kill у Windows завершує процес, тож lock вважається живим (видаляється вручну)
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def list_parts(base_path: str) -> list:
+    """
+    Готові частини у порядку запису (тимчасові *.tmp.* — недописані — ігноруються).
+    """
+    paths = glob.glob(os.path.join(parts_dir(base_path), "part-*"))
+    return sorted(p for p in paths if ".tmp." not in os.path.basename(p))
+
+
+def has_parts(base_path: str) -> bool:
+    return bool(list_parts(base_path))
+
+
+def iter_results(base_path: str, columns=None, parse_dates=None):
+    """
+    Читає результати частина за частиною (лише колонки columns) — без завантаження всього файлу.
+    """
+    for path in list_parts(base_path):
+        yield load_table(path, columns=columns,
+                         parse_dates=parse_dates if path.endswith(".csv") else None)
+
+
+def read_results(base_path: str, columns=None, parse_dates=None, last_parts: int = None) -> pd.DataFrame:
+    """
+    Результати з частин: лише потрібні колонки і, за бажанням, лише останні last_parts частин.
+    Порожній DataFrame, якщо частин ще немає (напр., симуляція щойно стартувала).
+    """
+    paths = list_parts(base_path)
+    if last_parts is not None:
+        paths = paths[-last_parts:]
+    frames = [load_table(p, columns=columns, parse_dates=parse_dates if p.endswith(".csv") else None)
+              for p in paths]
+    if not frames:
+        return pd.DataFrame(columns=columns)
+    return pd.concat(frames, ignore_index=True)
+
+
+class ResultsSink:
+    """
+    Потоковий запис таблиці результатів: рядки буферизуються й дописуються частинами
+    (part-файлами у форматі fmt) у <base_path>.parts/, щойно в буфері batch_rows рядків або при flush().
+    Кожна частина записується атомарно (тимчасовий файл + os.replace), тож збій не лишає пошкоджених частин.
+    resume_parts — продовження після checkpoint: частини з номером ≥ resume_parts (записані після
+    checkpoint) видаляються; None — новий запис (усі старі частини видаляються).
+    """
+
+    def __init__(self, base_path: str, fmt: str = "csv", batch_rows: int = 100_000, resume_parts: int = None):
+        if "." + fmt not in TABLE_FORMATS:
+            raise ValueError(f"Невідомий формат {fmt!r}; доступні: {[e[1:] for e in TABLE_FORMATS]}")
+        self.base_path = base_path
+        self.fmt = fmt
+        self.batch_rows = batch_rows
+        self._buffer = []
+        self._buffered_rows = 0
+        os.makedirs(parts_dir(base_path), exist_ok=True)
+
+        keep = 0 if resume_parts is None else resume_parts
+        existing = glob.glob(os.path.join(parts_dir(base_path), "part-*"))
+        for path in existing:
+            name = os.path.basename(path)
+            if ".tmp." in name or int(name.split("-")[1].split(".")[0]) >= keep:
+                os.remove(path)
+        self.n_parts = keep
+
+    def append(self, rows) -> None:
+        """
+        rows — DataFrame або список словників.
+        """
+        df = rows if isinstance(rows, pd.DataFrame) else pd.DataFrame(rows)
+        if df.empty:
+            return
+        self._buffer.append(df)
+        self._buffered_rows += len(df)
+        if self._buffered_rows >= self.batch_rows:
+            self.flush()
+
+    def flush(self) -> None:
+        """
+        Дописує буфер однією частиною.
+        """
+        if not self._buffer:
+            return
+        df = pd.concat(self._buffer, ignore_index=True)
+        path = os.path.join(parts_dir(self.base_path), f"part-{self.n_parts:05d}.{self.fmt}")
+        tmp_path = os.path.join(parts_dir(self.base_path), f"part-{self.n_parts:05d}.tmp.{self.fmt}")
+        # Без downcast: частини мають мати однакові типи колонок
+        save_table(df, tmp_path, downcast=False)
+        os.replace(tmp_path, path)
+        self.n_parts += 1
+        self._buffer = []
+        self._buffered_rows = 0
+
+    def close(self) -> None:
+        self.flush()
+
+
+def save_checkpoint(path: str, state: dict) -> None:
+    """
+    Зберігає стан симуляції (pickle) атомарно: через тимчасовий файл.
+    """
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        pickle.dump({"version": CHECKPOINT_VERSION, **state}, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_path, path)
+
+
+def load_checkpoint(path: str):
+    """
+    Стан, збережений save_checkpoint; None, якщо checkpoint немає.
+    """
+    if not os.path.exists(path):
+        return None
+    with open(path, "rb") as f:
+        state = pickle.load(f)
+    if state.get("version") != CHECKPOINT_VERSION:
+        raise ValueError(f"Checkpoint {path} має несумісну версію {state.get('version')}.")
+    return state
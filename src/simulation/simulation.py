@@ -1,106 +1,358 @@
 import pandas as pd
-from datetime import date, timedelta
+import numpy as np
+from datetime import date
 import os
+import copy
+import random
+import hashlib
+from contextlib import nullcontext
 
-from forecast_agent.forecast_agent import ForecastAgent
-from inventory_agent.inventory_agent import InventoryAgent
-from supplier_agent.supplier_agent import SupplierAgent
-from utils.calculate_metrics import calculate_total_cost, calculate_fill_rate
+from forecast_agent.forecast_server import forecaster_from_env
+from forecast_agent.segmented_model import resolve_model_path
+from simulation.vector_engine import VectorSimulation, build_demand_matrix
+from data_preparation.load_data import load_table, save_table, find_table
+from data_preparation.feature_store import FEATURE_STORE_FILE
+from inventory_agent.sharding import regions_from_catalog, load_region_mapping
+from simulation.results_sink import (ResultsSink, read_results, parts_dir, run_dir, run_lock,
+                                     save_checkpoint, load_checkpoint, CHECKPOINT_FILE)
+from utils.instrumentation import instrument
+from utils.sku_layout import SkuLayout
 
-def main():
+# Рядків поденної деталізації в одній частині (тиждень 1115 магазинів ≈ 7.8 тис. рядків)
+DETAIL_BATCH_ROWS = 200_000
+# Тижнів між checkpoint; тижневі результати дописуються частиною з тією ж періодичністю
+CHECKPOINT_EVERY = 4
+# Матриця попиту прогону (зберігається один раз, checkpoint лише посилається на неї)
+DEMAND_FILE = "simulation_demand.npy"
+
+def load_sku_table(path: str, store_ids, store_stock):
+    """
+    Асортимент для режиму SKU: таблиця (.csv/.parquet/.feather) активних пар з колонками
+    Store, SKU, Share (частка SKU у продажах магазину) і, необов'язково, InitialStock.
+    Без InitialStock початкові запаси магазину (store_stock, у порядку store_ids) діляться за Share.
+    Повертає (SkuLayout, share (n_pairs,) float32, початкові запаси (n_pairs,) int64, позиція магазину
+    кожної пари у store_ids (n_pairs,)).
     """
+    df = load_table(path)
+    missing = {"Store", "SKU", "Share"} - set(df.columns)
+    if missing:
+        raise ValueError(f"У {path} немає колонок {sorted(missing)}")
+    layout = SkuLayout.from_frame(df)
+    idx = layout.index(df["Store"].to_numpy(), df["SKU"].to_numpy())
+    if np.unique(idx).shape[0] != idx.shape[0]:
+        raise ValueError(f"У {path} повторюються пари (Store, SKU)")
+    share = np.zeros(layout.n_pairs, dtype=np.float32)
+    share[idx] = df["Share"].to_numpy(dtype=np.float32)
+
+    position = {sid: i for i, sid in enumerate(np.asarray(store_ids).tolist())}
+    unknown = [sid for sid in layout.store_ids.tolist() if sid not in position]
+    if unknown:
+        raise ValueError(f"Магазинів {unknown[:10]} з {path} немає в initial_stock")
+    pair_pos = np.array([position[sid] for sid in layout.store_ids.tolist()], dtype=np.int64)[layout.pair_store]
+
+    if "InitialStock" in df.columns:
+        stock = np.zeros(layout.n_pairs, dtype=np.int64)
+        stock[idx] = df["InitialStock"].to_numpy(dtype=np.int64)
+    else:
+        stock = np.floor(np.asarray(store_stock, dtype=np.float64)[pair_pos] * share).astype(np.int64)
+    return layout, share, stock, pair_pos
+
+
+def lag_forecaster(forecaster):
+    """
+    Власна копія ForecastAgent з LAG_FEATURES для зворотного зв'язку симуляції: модель спільна, сховище
+    ознак — копія (симульовані продажі не потрапляють у сховище forecaster). None, якщо модель без
+    історії продажів — тоді попит рахується один раз на весь період.
+    """
+    agent = getattr(forecaster, "agent", forecaster)  # ForecastCache → його ForecastAgent
+    if not getattr(agent, "uses_lag_features", False) or agent.feature_store is None:
+        return None
+    own = copy.copy(agent)
+    own.feature_store = agent.feature_store.copy()
+    return own
+
+
+def main(engine: str = "greedy", results_format: str = "csv", incremental: bool = False, progress=None,
+         instrument_modes=None, shard_by=None, resume: bool = False, detail: bool = False,
+         checkpoint_every: int = CHECKPOINT_EVERY, skus: str = None, run_name: str = None,
+         forecaster=None, forecaster_lock=None):
+    """
+    engine — двигун InventoryAgent.optimize_orders ("ga", "greedy", "lp");
+    за замовчуванням точний "greedy" (water-filling).
+    results_format — "csv", "parquet" або "feather" для simulation_results.
+    incremental — warm start оптимізатора з розв'язку попереднього тижня (має сенс для "ga").
+    progress — необов'язковий колбек progress(done_weeks, n_weeks, message) (напр., для фонового
+    завдання в app.py). Повертає DataFrame тижневих результатів.
+    instrument_modes — режими utils.instrumentation ("timers", "cprofile", "tracemalloc");
+    за замовчуванням — зі змінної оточення INTELL_INSTRUMENT. Якщо інструментацію ввімкнено,
+    поруч із результатами зберігається simulation_profile.<results_format> — розбивка часу
+    та лічильників по тижнях (cProfile — у simulation_profile.prof).
+    shard_by — шардована оптимізація за регіонами: атрибути store.csv (напр. ("StoreType", "Assortment"))
+    або шлях до таблиці мапінгу Store → Region.
+    Результати пишуться потоково: кожні checkpoint_every тижнів дописується частина у simulation_results.parts/
+    (app і plot_results бачать їх ще під час прогону), detail=True — ще й поденні рядки по магазинах
+    у simulation_detail.parts/. Кожні checkpoint_every тижнів повний стан (запаси, черга постачальника,
+    стан оптимізатора, RNG) зберігається у simulation_checkpoint.pkl; resume=True продовжує з нього.
+    Матриця попиту не входить у checkpoint: вона один раз зберігається у simulation_demand.npy поруч
+    (для моделі з LAG_FEATURES checkpoint містить сховище ознак, а попит тижня прогнозується заново).
+    run_name — каталог прогону data/processed/runs/<run_name>/ з частинами, checkpoint, попитом і профілем;
+    за замовчуванням — відбиток параметрів (run_id), тож прогони з різними параметрами не заважають
+    один одному, а другий одночасний прогін з тим самим каталогом отримує RuntimeError (run_lock).
+    forecaster — готовий прогнозувальник з інтерфейсом predict_batch (напр. ForecastCache з app, чия
+    модель уже завантажена); None — власний ForecastAgent / клієнт сервера (forecaster_from_env).
+    forecaster_lock — лок, під яким викликається forecaster (ForecastCache не потокобезпечний).
+    skus — режим SKU: шлях до таблиці асортименту (див. load_sku_table). Попит пари = прогноз магазину · Share,
+    увесь стан — плоскі масиви активних пар (SkuLayout), метрики — по всіх парах; detail додає колонку SKU.
+
     1) Завантажити попередньо збережену модель ForecastAgent
-    2) Ініціалізувати InventoryAgent (зі згенерованими початковими запасами)
-    3) Ініціалізувати SupplierAgent
-    4) Запустити цикл симуляції з 2025-01-01 по 2025-03-31 із кроком у 7 днів
+    2) Завантажити початкові запаси
+    3) Порахувати прогноз попиту на весь період одним пакетним викликом: матриця (days × stores);
+       для моделі з LAG_FEATURES — щотижня з історії, куди дописуються симульовані продажі (lag_forecaster)
+    4) Запустити векторизовану симуляцію (VectorSimulation) з 2025-01-01 по 2025-03-31 із кроком у 7 днів
     5) Кожного тижня робити:
-       - прогноз demand на 7 днів
+       - прогноз demand на 7 днів (зріз матриці)
        - оптимізація замовлень
-       - place_order для кожного магазину
-       - кожного дня: process_orders і віднімання “продажів” відповідно до прогнозу
+       - розміщення партії замовлень
+       - кожного дня: доставка з урахуванням затримки/ліміту і віднімання “продажів” відповідно до прогнозу
        - збір метрик (total_cost, fill_rate)
-    6) Зберегти results у CSV (data/processed/simulation_results.csv)
+    6) Зберегти results (data/processed/simulation_results.<results_format> — атомарно, останній завершений прогін)
+    """
+    if instrument_modes is not None:
+        instrument.configure(instrument_modes)
+    processed_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), "../../data/processed"))
+    run_path = run_dir(processed_dir, run_name or run_id(engine=engine, results_format=results_format,
+                                                         incremental=incremental, shard_by=shard_by,
+                                                         detail=detail, skus=skus))
+    with run_lock(run_path), instrument.session(profile_path=os.path.join(run_path, "simulation_profile.prof")):
+        return _run(engine, results_format, incremental, progress, processed_dir, run_path, shard_by,
+                    resume, detail, checkpoint_every, skus, forecaster, forecaster_lock)
+
+
+def run_id(**params) -> str:
     """
+    Назва каталогу прогону за параметрами main, що впливають на результат.
+    """
+    return hashlib.sha1(repr(sorted(params.items())).encode("utf-8")).hexdigest()[:12]
+
+
+def _run(engine: str, results_format: str, incremental: bool, progress, processed_dir: str, run_path: str,
+         shard_by=None, resume: bool = False, detail: bool = False, checkpoint_every: int = CHECKPOINT_EVERY,
+         skus: str = None, forecaster=None, forecaster_lock=None):
+    """
+    Тіло main (кроки 1–6).
+    """
+    instrument.reset()
 
     # Шляхи
-    model_path = os.path.abspath(os.path.join(os.path.dirname(__file__), "../../models/forecast_model.pkl"))
     store_csv = os.path.abspath(os.path.join(os.path.dirname(__file__), "../../data/raw/store.csv"))
-    initial_stock_csv = os.path.abspath(os.path.join(os.path.dirname(__file__), "../../data/processed/initial_stock.csv"))
-
-    # 1) ForecastAgent
-    fa = ForecastAgent(model_path=model_path)
+    # initial_stock: перший наявний із .parquet / .feather / .csv
+    initial_stock_csv = find_table(os.path.abspath(os.path.join(os.path.dirname(__file__), "../../data/processed/initial_stock")))
+    # Проміжні файли — у власному каталозі прогону
+    results_base = os.path.join(run_path, "simulation_results")
+    detail_base = os.path.join(run_path, "simulation_detail")
+    checkpoint_path = os.path.join(run_path, CHECKPOINT_FILE)
+    demand_path = os.path.join(run_path, DEMAND_FILE)
 
     # 2) Початкові запаси
-    df_initial = pd.read_csv(initial_stock_csv)
-    initial_stock = dict(zip(df_initial["Store"], df_initial["InitialStock"]))
-
-    # 3) InventoryAgent & SupplierAgent
-    # Параметри оптимізації (можна коригувати)
-    alpha = 5  # вартість дефіциту
-    beta = 1   # вартість надлишку
-    Q_max = 30000  # max одиниць на тиждень
-    ia = InventoryAgent(alpha=alpha, beta=beta, Q_max=Q_max, initial_stock=initial_stock)
-    sa = SupplierAgent(delivery_delay_days=2, daily_limit=45000)
-
-    # 4) Параметри симуляції
+    with instrument.timer("io.read_table"):
+        df_initial = load_table(initial_stock_csv)
+    list_of_store_ids = df_initial["Store"].tolist()
+    initial_stock = df_initial["InitialStock"].values
+    layout = None
+    if skus is not None:
+        layout, share, initial_stock, pair_pos = load_sku_table(skus, list_of_store_ids, initial_stock)
+        print(f"[Simulation] Режим SKU: {layout.n_pairs} активних пар у {layout.n_stores} магазинах")
+
+    # Параметри симуляції
     current_date = date(2025, 1, 1)
     end_date = date(2025, 3, 31)
-    step = timedelta(days=7)
-
-    records = []
-    list_of_store_ids = list(initial_stock.keys())
-
-    while current_date <= end_date:
-        # 4.1) Збираємо прогноз на 7 днів попиту
-        demands = {}
-        for store_id in list_of_store_ids:
-            preds = fa.predict(store_id=store_id,
-                               start_date=pd.Timestamp(current_date),
-                               horizon_days=7,
-                               store_csv=store_csv)
-            demands[store_id] = int(preds.sum())
-
-        # 4.2) Оптимізуємо замовлення
-        orders = ia.optimize_orders(demands)
-
-        # 4.3) Place orders (зменшимо тимчасово stock на замовлену кількість, щоб не допустити повторного використання того ж запасу)
-        for store_id, qty in orders.items():
-            # Не зменшуємо реальний stock тут, бо постачання відбувається через sa.process_orders
-            sa.place_order(store_id=store_id, qty=qty, order_date=current_date)
-
-        # 4.4) Протягом кожного дня тижня:
-        for day_offset in range(7):
-            day = current_date + timedelta(days=day_offset)
-            # 4.4.1) Постачальник обробляє чергу
-            sa.process_orders(current_date=day, inventory_agent=ia)
-
-            # 4.4.2) Зменшуємо запаси магазину відповідно до “фактичного” продажу
-            for store_id in list_of_store_ids:
-                # Прогноз на один день вперед від поточної дати
-                daily_pred = fa.predict(store_id=store_id,
-                                        start_date=pd.Timestamp(day),
-                                        horizon_days=1,
-                                        store_csv=store_csv)[0]
-                ia.stock[store_id] = max(ia.stock[store_id] - int(daily_pred), 0)
-
-        # 4.5) Збираємо метрики на кінець тижня
-        total_cost = calculate_total_cost(inventory_agent=ia, demands=demands, alpha=alpha, beta=beta)
-        fill_rate = calculate_fill_rate(inventory_agent=ia, demands=demands)
-        records.append({
-            "week_start": current_date,
-            "total_cost": total_cost,
-            "fill_rate": fill_rate
-        })
-
-        print(f"[Simulation] Week {current_date} → cost={total_cost:.2f}, fill_rate={fill_rate:.3f}")
-        current_date += step
-
-    # 4.6) Зберігаємо результати
-    df_records = pd.DataFrame(records)
-    out_path = os.path.abspath(os.path.join(os.path.dirname(__file__), "../../data/processed/simulation_results.csv"))
-    df_records.to_csv(out_path, index=False)
+    n_weeks = (end_date - current_date).days // 7 + 1
+
+    # Параметри, що мають збігатися, щоб продовжити з checkpoint
+    config = {
+        "engine": engine, "incremental": incremental, "shard_by": shard_by, "detail": detail,
+        "results_format": results_format, "start_date": current_date, "n_weeks": n_weeks,
+        "stores": hashlib.sha1(np.asarray(list_of_store_ids, dtype=np.int64).tobytes()).hexdigest(),
+        "skus": None if layout is None else
+        hashlib.sha1(layout.indptr.tobytes() + layout.sku_ids.tobytes() + share.tobytes()).hexdigest(),
+    }
+    checkpoint = load_checkpoint(checkpoint_path) if resume else None
+    if resume and checkpoint is None:
+        print(f"[Simulation] Checkpoint {checkpoint_path} не знайдено — симуляція з початку")
+    if checkpoint is not None and checkpoint["config"] != config:
+        raise ValueError(f"Checkpoint {checkpoint_path} створено з іншими параметрами: {checkpoint['config']}")
+
+    lag_agent = None
+    if checkpoint is not None and checkpoint["feature_store"] is None:
+        # Попит — з файлу, збереженого при першому checkpoint (mmap): модель не завантажується,
+        # продовження детерміноване
+        demand = np.load(os.path.join(run_path, checkpoint["demand_file"]), mmap_mode="r")
+    else:
+        # 1) ForecastAgent (+ сховище ознак історії продажів, якщо preprocess запускався з --lags)
+        # або клієнт сервера прогнозів, якщо задано INTELL_FORECAST_SERVER; переданий forecaster — як є
+        fa = forecaster
+        if fa is None:
+            # forecast_model.pkl або каталог сегментованої моделі — за INTELL_FORECAST_MODEL (див. resolve_model_path)
+            model_path = resolve_model_path(os.path.abspath(os.path.join(os.path.dirname(__file__), "../../models")))
+            feature_store_path = os.path.join(processed_dir, FEATURE_STORE_FILE)
+            fa = forecaster_from_env(model_path,
+                                     feature_store_path=feature_store_path if os.path.exists(feature_store_path) else None)
+        with forecaster_lock or nullcontext():
+            lag_agent = lag_forecaster(fa)
+            if lag_agent is None:
+                if checkpoint is not None:
+                    raise ValueError(f"Checkpoint {checkpoint_path} створено з моделлю з LAG_FEATURES, "
+                                     f"а поточна модель їх не має.")
+                # 3) Попит на весь період: (n_weeks * 7, stores)
+                demand = build_demand_matrix(fa, list_of_store_ids, current_date, n_weeks * 7, store_csv)
+        if lag_agent is not None:
+            # Модель з історією продажів: попит тижня прогнозується на його початку (див. цикл нижче)
+            if checkpoint is not None:
+                lag_agent.feature_store = checkpoint["feature_store"]
+            demand = np.zeros((n_weeks * 7, len(list_of_store_ids) if layout is None else layout.n_pairs),
+                              dtype=np.float64 if layout is None else np.float32)
+        elif layout is not None:
+            # Попит пар: (days, n_pairs) float32 — прогноз магазину, розподілений за часткою SKU
+            demand = demand[:, pair_pos].astype(np.float32) * share
+
+    # Регіони для шардованої оптимізації
+    regions = None
+    if isinstance(shard_by, str) and os.path.exists(shard_by):
+        regions = load_region_mapping(shard_by)
+    elif shard_by:
+        regions = regions_from_catalog(list_of_store_ids, store_csv, by=shard_by)
+
+    # 4) Симуляція. Параметри оптимізації (можна коригувати)
+    sim = VectorSimulation(store_ids=list_of_store_ids,
+                           initial_stock=initial_stock,
+                           demand=demand,
+                           start_date=current_date,
+                           alpha=5,           # вартість дефіциту
+                           beta=1,            # вартість надлишку
+                           Q_max=30000,       # max одиниць на тиждень
+                           delivery_delay_days=2,
+                           daily_limit=45000,
+                           engine=engine,
+                           incremental=incremental,
+                           regions=regions,
+                           record_detail=detail or lag_agent is not None,
+                           layout=layout)
+
+    # Потоковий запис: тижневі рядки і (за бажанням) поденна деталізація по магазинах
+    sinks = {"results": ResultsSink(results_base, results_format, batch_rows=checkpoint_every,
+                                    resume_parts=checkpoint["sinks"]["results"] if checkpoint else None)}
+    if detail:
+        sinks["detail"] = ResultsSink(detail_base, results_format, batch_rows=DETAIL_BATCH_ROWS,
+                                      resume_parts=checkpoint["sinks"]["detail"] if checkpoint else None)
+
+    first_week = 0
+    demand_saved = checkpoint is not None
+    if checkpoint is not None:
+        sim.set_state(checkpoint["simulation"])
+        random.setstate(checkpoint["rng"]["random"])
+        np.random.set_state(checkpoint["rng"]["numpy"])
+        first_week = checkpoint["week"]
+        setup, breakdown = checkpoint["setup"], checkpoint["breakdown"]
+        print(f"[Simulation] Продовження з checkpoint: тиждень {first_week + 1} з {n_weeks}")
+    else:
+        setup = instrument.window()  # завантаження моделі, запасів і матриця попиту — окремим рядком
+        breakdown = []
+
+    # Ключі рядків деталізації: магазини або пари (магазин, SKU)
+    store_ids = np.asarray(list_of_store_ids, dtype=np.int64) if layout is None else layout.pair_store_ids
+    for week in range(first_week, n_weeks):
+        if lag_agent is not None:
+            with instrument.timer("simulation.forecast"):
+                week_preds = build_demand_matrix(lag_agent, list_of_store_ids, sim.current_date, 7, store_csv)
+            demand[sim.day:sim.day + 7] = week_preds if layout is None else week_preds[:, pair_pos] * share
+        record = sim.run_week()
+        if lag_agent is not None:
+            # Зворотний зв'язок: симульовані продажі тижня — історія для лагів наступних тижнів
+            sold = sim.last_week_detail["sold"]
+            sold_ids = list_of_store_ids if layout is None else layout.store_ids
+            if layout is not None:
+                sold = layout.sum_by_store(sold)
+            for k in range(7):
+                lag_agent.append_actuals(pd.Timestamp(record["week_start"]) + pd.Timedelta(days=k), sold_ids, sold[k])
+        sinks["results"].append([record])
+        if detail:
+            d = sim.last_week_detail
+            days = pd.date_range(record["week_start"], periods=7, freq="D")
+            rows = {"date": np.repeat(days.values, len(store_ids)), "Store": np.tile(store_ids, 7)}
+            if layout is not None:
+                rows["SKU"] = np.tile(layout.sku_ids, 7)
+            sinks["detail"].append(pd.DataFrame({
+                **rows,
+                "delivered": d["delivered"].ravel(),
+                "sold": d["sold"].ravel(),
+                "stock": d["stock"].ravel(),
+            }))
+        run = sim.inventory.last_run_stats
+        print(f"[Simulation] Week {record['week_start']} → cost={record['total_cost']:.2f}, "
+              f"fill_rate={record['fill_rate']:.3f}, optimize={run['wall_time_s']:.3f}s"
+              + (f" ({run['generations']} gen, warm={run['warm_start']})" if "generations" in run else "")
+              + (f" [{run['shards']} шардів, узгоджено {run['reconciled_units']} од.]" if "shards" in run else ""))
+        if instrument.enabled:
+            breakdown.append({"week_start": record["week_start"], **instrument.window()})
+
+        # Checkpoint: спершу дописуємо буфери, щоб частини на диску відповідали збереженому стану
+        if (week + 1) % checkpoint_every == 0 and week + 1 < n_weeks:
+            for sink in sinks.values():
+                sink.flush()
+            if not demand_saved and lag_agent is None:
+                tmp_path = demand_path + ".tmp.npy"
+                np.save(tmp_path, demand)
+                os.replace(tmp_path, demand_path)
+                demand_saved = True
+            save_checkpoint(checkpoint_path, {
+                "config": config,
+                "week": week + 1,
+                "simulation": sim.get_state(),
+                "demand_file": None if lag_agent is not None else DEMAND_FILE,
+                "feature_store": None if lag_agent is None else lag_agent.feature_store,
+                "rng": {"random": random.getstate(), "numpy": np.random.get_state()},
+                "sinks": {name: sink.n_parts for name, sink in sinks.items()},
+                "setup": setup,
+                "breakdown": breakdown,
+            })
+        if progress is not None:
+            progress(week + 1, n_weeks, f"Тиждень {record['week_start']}")
+
+    for sink in sinks.values():
+        sink.close()
+
+    # 6) Зберігаємо результати: зведена тижнева таблиця (частини лишаються для часткового читання)
+    df_records = read_results(results_base)
+    out_path = os.path.join(processed_dir, f"simulation_results.{results_format}")
+    tmp_path = os.path.join(run_path, f"simulation_results.tmp.{results_format}")
+    save_table(df_records, tmp_path)
+    os.replace(tmp_path, out_path)
     print(f"[Simulation] Результати симуляції збережено у {out_path}")
+    if detail:
+        print(f"[Simulation] Поденна деталізація по магазинах: {parts_dir(detail_base)}")
+    # Симуляцію завершено — checkpoint більше не потрібен
+    for path in (checkpoint_path, demand_path):
+        if os.path.exists(path):
+            os.remove(path)
+
+    if instrument.enabled:
+        df_profile = pd.DataFrame([{"week_start": "setup", **setup}] + breakdown).fillna(0)
+        df_profile["week_start"] = df_profile["week_start"].astype(str)
+        profile_path = os.path.join(run_path, f"simulation_profile.{results_format}")
+        save_table(df_profile, profile_path, downcast=False)
+        print(f"[Simulation] Розбивка по тижнях збережена у {profile_path}")
+        instrument.report()
+    return df_records
 
 
 if __name__ == "__main__":
-    main()
+    # Запуск: PYTHONPATH=src python -m simulation.simulation (шлях до файлу затінює пакет simulation)
+    import sys
+    # --shard StoreType,Assortment (атрибути store.csv) або --shard regions.csv (колонки Store, Region)
+    shard_arg = sys.argv[sys.argv.index("--shard") + 1] if "--shard" in sys.argv else None
+    if shard_arg and not os.path.exists(shard_arg):
+        shard_arg = tuple(shard_arg.split(","))
+    # --resume — продовжити з останнього checkpoint; --detail — поденні рядки по магазинах
+    # --skus assortment.csv — режим SKU (колонки Store, SKU, Share[, InitialStock])
+    skus_arg = sys.argv[sys.argv.index("--skus") + 1] if "--skus" in sys.argv else None
+    main(shard_by=shard_arg, resume="--resume" in sys.argv, detail="--detail" in sys.argv, skus=skus_arg)
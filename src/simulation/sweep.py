@@ -0,0 +1,196 @@
+import os
+import json
+import hashlib
+import itertools
+from datetime import date
+from multiprocessing import Pool
+
+import numpy as np
+import pandas as pd
+
+from simulation.vector_engine import VectorSimulation, build_demand_matrix
+from data_preparation.load_data import load_table, save_table, find_table
+
+# Параметри сценарію за замовчуванням — ті самі, що в simulation.main
+DEFAULT_SCENARIO = {
+    "alpha": 5,
+    "beta": 1,
+    "Q_max": 30000,
+    "delivery_delay_days": 2,
+    "daily_limit": 45000,
+    "engine": "greedy",
+    "start_date": "2025-01-01",
+    "end_date": "2025-03-31",
+}
+
+# Спільний для процесу-воркера стан (заповнюється один раз в ініціалізаторі пулу)
+_worker = {}
+
+
+def scenario_id(params: dict) -> str:
+    """
+    Стабільний ідентифікатор сценарію: хеш відсортованих параметрів.
+    """
+    payload = json.dumps(params, sort_keys=True, default=str)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()[:12]
+
+
+def expand_grid(grid: dict) -> list:
+    """
+    Декартовий добуток сітки параметрів, напр. {"alpha": [3, 5], "Q_max": [20000, 30000]}.
+    Невказані параметри беруться з DEFAULT_SCENARIO.
+    """
+    keys = list(grid)
+    scenarios = []
+    for values in itertools.product(*(grid[k] for k in keys)):
+        params = dict(DEFAULT_SCENARIO)
+        params.update(zip(keys, values))
+        scenarios.append(params)
+    return scenarios
+
+
+def _horizon(params: dict) -> tuple:
+    """
+    (start_date, кількість днів) сценарію: цілі тижні від start_date, як у simulation.main.
+    """
+    start = date.fromisoformat(str(params["start_date"]))
+    end = date.fromisoformat(str(params["end_date"]))
+    return start, ((end - start).days // 7 + 1) * 7
+
+
+def _init_worker(demand_path: str, demand_start: str, store_ids: list, initial_stock: np.ndarray) -> None:
+    """
+    Ініціалізатор воркера: матриця попиту відкривається лише на читання через mmap
+    (спільна сторінкова пам'ять, без копії на кожен процес).
+    """
+    _worker["demand"] = np.load(demand_path, mmap_mode="r")
+    _worker["demand_start"] = date.fromisoformat(demand_start)
+    _worker["store_ids"] = store_ids
+    _worker["initial_stock"] = initial_stock
+
+
+def _run_scenario(task) -> tuple:
+    """
+    Один сценарій → тижневі метрики, збережені окремою частиною results (атомарно).
+    Повертає (scenario_id, кількість тижнів, сумарна вартість).
+    """
+    sid, params, part_path = task
+    start, n_days = _horizon(params)
+    n_weeks = n_days // 7
+    offset = (start - _worker["demand_start"]).days
+
+    sim = VectorSimulation(store_ids=_worker["store_ids"],
+                           initial_stock=_worker["initial_stock"],
+                           demand=_worker["demand"][offset:offset + n_days],
+                           start_date=start,
+                           alpha=params["alpha"],
+                           beta=params["beta"],
+                           Q_max=params["Q_max"],
+                           delivery_delay_days=params["delivery_delay_days"],
+                           daily_limit=params["daily_limit"],
+                           engine=params["engine"])
+    df = pd.DataFrame([sim.run_week() for _ in range(n_weeks)])
+    df["week_start"] = pd.to_datetime(df["week_start"])
+    df.insert(0, "scenario_id", sid)
+    for key in sorted(params):
+        df[key] = params[key]
+
+    root, ext = os.path.splitext(part_path)
+    tmp_path = root + ".tmp" + ext
+    save_table(df, tmp_path, downcast=False)
+    os.replace(tmp_path, part_path)
+    return sid, n_weeks, float(df["total_cost"].sum())
+
+
+def run_sweep(scenarios: list,
+              results_dir: str,
+              model_path: str,
+              store_csv: str,
+              initial_stock_path: str,
+              processes: int = None,
+              fmt: str = "csv") -> pd.DataFrame:
+    """
+    Паралельний прогін сценаріїв (еквівалент simulation.main для кожного) у пулі процесів.
+    - Модель завантажується один раз у батьківському процесі; попит на об'єднаний період
+      рахується одним predict_batch і зберігається в <results_dir>/demand.npy, який
+      воркери відкривають лише на читання (mmap).
+    - Кожен сценарій пише свою частину в <results_dir>/parts/<scenario_id>.<fmt> одразу після
+      завершення; при повторному запуску готові частини пропускаються (відновлення після збою).
+    - Наприкінці частини збираються в одну таблицю <results_dir>/sweep_results.<fmt>
+      (ключ — scenario_id).
+    fmt: "csv" (за замовчуванням, без додаткових залежностей) або "parquet"/"feather" (потребують pyarrow).
+    """
+    from forecast_agent.forecast_agent import ForecastAgent
+
+    parts_dir = os.path.join(results_dir, "parts")
+    os.makedirs(parts_dir, exist_ok=True)
+
+    tasks = []
+    scenario_ids = []
+    for params in scenarios:
+        params = {**DEFAULT_SCENARIO, **params}
+        params["start_date"], params["end_date"] = str(params["start_date"]), str(params["end_date"])
+        sid = scenario_id(params)
+        scenario_ids.append(sid)
+        part_path = os.path.join(parts_dir, f"{sid}.{fmt}")
+        if not os.path.exists(part_path):
+            tasks.append((sid, params, part_path))
+    print(f"[sweep] Сценаріїв: {len(scenarios)}, до виконання: {len(tasks)} "
+          f"(решта вже є у {parts_dir})")
+
+    if tasks:
+        df_stock = load_table(initial_stock_path)
+        store_ids = df_stock["Store"].tolist()
+        initial_stock = df_stock["InitialStock"].values
+
+        # Попит на об'єднаний період усіх сценаріїв (цілі тижні від кожного start_date)
+        horizons = [_horizon(p) for _, p, _ in tasks]
+        demand_start = min(start for start, _ in horizons)
+        n_days = max((start - demand_start).days + days for start, days in horizons)
+
+        fa = ForecastAgent(model_path=model_path)
+        demand = build_demand_matrix(fa, store_ids, demand_start, n_days, store_csv)
+        demand_path = os.path.join(results_dir, "demand.npy")
+        np.save(demand_path, demand)
+        del fa, demand
+
+        init_args = (demand_path, demand_start.isoformat(), store_ids, initial_stock)
+        processes = min(len(tasks), processes or os.cpu_count() or 1)
+        if processes > 1:
+            with Pool(processes, initializer=_init_worker, initargs=init_args) as pool:
+                for done, (sid, n_weeks, cost) in enumerate(pool.imap_unordered(_run_scenario, tasks), 1):
+                    print(f"[sweep] {done}/{len(tasks)} {sid}: {n_weeks} тижнів, cost={cost:.2f}")
+        else:
+            _init_worker(*init_args)
+            for done, task in enumerate(tasks, 1):
+                sid, n_weeks, cost = _run_scenario(task)
+                print(f"[sweep] {done}/{len(tasks)} {sid}: {n_weeks} тижнів, cost={cost:.2f}")
+            _worker.clear()
+
+    # Збираємо частини поточних сценаріїв в одну таблицю
+    frames = [load_table(os.path.join(parts_dir, f"{sid}.{fmt}")) for sid in dict.fromkeys(scenario_ids)]
+    df_results = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+    out_path = os.path.join(results_dir, f"sweep_results.{fmt}")
+    save_table(df_results, out_path, downcast=False)
+    print(f"[sweep] Результати ({len(df_results)} рядків) збережено у {out_path}")
+    return df_results
+
+
+if __name__ == "__main__":
+    # Запуск: PYTHONPATH=src python -m simulation.sweep [--format parquet]
+    # (шлях до файлу затінює пакет simulation; parquet потребує pyarrow)
+    import sys
+    from forecast_agent.segmented_model import resolve_model_path
+
+    base = os.path.abspath(os.path.join(os.path.dirname(__file__), "../.."))
+    grid = {
+        "alpha": [3, 5, 10],
+        "Q_max": [20000, 30000, 45000],
+        "delivery_delay_days": [1, 2, 3],
+    }
+    run_sweep(expand_grid(grid),
+              results_dir=os.path.join(base, "data/processed/sweep"),
+              model_path=resolve_model_path(os.path.join(base, "models")),
+              store_csv=os.path.join(base, "data/raw/store.csv"),
+              initial_stock_path=find_table(os.path.join(base, "data/processed/initial_stock")),
+              fmt=sys.argv[sys.argv.index("--format") + 1] if "--format" in sys.argv else "csv")
@@ -0,0 +1,255 @@
+import copy
+import numpy as np
+import pandas as pd
+from datetime import timedelta
+
+from inventory_agent.inventory_agent import InventoryAgent
+from supplier_agent.supplier_agent import SupplierAgent
+from utils.calculate_metrics import total_cost_array, fill_rate_array
+from utils.instrumentation import instrument
+
+
+def build_demand_matrix(forecast_agent, store_ids, start_date, n_days: int, store_csv: str) -> np.ndarray:
+    """
+    Прогноз на весь період симуляції одним пакетним викликом.
+    Повертає (n_days, stores) у порядку store_ids.
+    """
+    preds = forecast_agent.predict_batch(store_ids=store_ids,
+                                         start_date=pd.Timestamp(start_date),
+                                         horizon_days=n_days,
+                                         store_csv=store_csv)
+    return np.ascontiguousarray(preds.T)
+
+
+class VectorSimulation:
+    """
+    Поденна симуляція над масивами замість словників:
+      • stock — (stores,) поточні запаси;
+      • in_flight — FIFO партій замовлень [(день_відвантаження, залишок (stores,)), ...];
+      • demand — (days, stores) прогнозний попит на весь період (рахується один раз).
+    Логіка та сама, що й у SupplierAgent/InventoryAgent: доставка з затримкою та денним лімітом
+    (FIFO за порядком розміщення), продажі = int(прогноз), метрики на кінець тижня.
+
+    actual_sales (необов'язково) — «фактичний» попит замість прогнозу: (days, stores) або
+    (R, days, stores) для R незалежних реплікацій (Monte Carlo). Тоді весь стан має провідну
+    вісь R (stock — (R, stores)), а метрики тижня повертаються масивами (R,).
+
+    incremental — InventoryAgent у режимі rolling horizon: кожен тиждень стартує з розв'язку
+    попереднього (статистика по тижнях — у self.inventory.run_history).
+
+    regions — {store_id: регіон}: шардована оптимізація InventoryAgent (див. inventory_agent.sharding).
+
+    record_detail — зберігати поденну деталізацію тижня по магазинах у self.last_week_detail:
+    {"delivered", "sold", "stock"} масиви (7, stores) — для потокового запису (results_sink).
+
+    layout — режим SKU (utils.sku_layout.SkuLayout): вісь позицій — активні пари (магазин, SKU),
+    а не магазини; initial_stock, demand, actual_sales і весь стан — (..., n_pairs) у порядку layout
+    (пам'ять ∝ кількості активних пар). demand float32 зберігається без копії у float64.
+    Черга замовлень у режимі SKU (без реплікацій) — SupplierAgent з OrderBatch: у черзі лише ненульові
+    позиції пакета, а не щільний масив (n_pairs,) на кожен тиждень.
+
+    carry_fraction — продажі пари = ціла частина (прогноз + дробовий залишок попередніх днів), залишок
+    переноситься далі, а тижневий попит для оптимізації й метрик — floor(залишок + сума за тиждень), тобто
+    рівно стільки, скільки буде продано. Без переносу int() відкидав би дробову частину щодня: для пар
+    з попитом < 1 од./день продажі й замовлення були б нульовими. За замовчуванням — у режимі SKU
+    (для магазинів з сотнями одиниць на день зсув мізерний, тож лишається int(прогноз)).
+    """
+
+    def __init__(self,
+                 store_ids,
+                 initial_stock: np.ndarray,
+                 demand: np.ndarray,
+                 start_date,
+                 alpha: float = 5,
+                 beta: float = 1,
+                 Q_max: int = 30000,
+                 delivery_delay_days: int = 2,
+                 daily_limit: int = 45000,
+                 engine: str = "greedy",
+                 actual_sales: np.ndarray = None,
+                 incremental: bool = False,
+                 regions: dict = None,
+                 record_detail: bool = False,
+                 layout=None,
+                 carry_fraction: bool = None):
+        self.store_ids = list(store_ids)
+        self.layout = layout
+        self.stock = np.asarray(initial_stock, dtype=np.int64).copy()
+        demand = np.asarray(demand)
+        self.demand = demand if demand.dtype in (np.float32, np.float64) else demand.astype(np.float64)
+        self.actual_sales = actual_sales
+        if actual_sales is not None and actual_sales.ndim == 3:
+            self.stock = np.repeat(self.stock[None, :], actual_sales.shape[0], axis=0)
+        self.start_date = start_date
+        self.alpha = alpha
+        self.beta = beta
+        self.Q_max = Q_max
+        self.delivery_delay_days = delivery_delay_days
+        self.daily_limit = daily_limit
+        self.engine = engine
+        self.day = 0          # індекс поточного дня від start_date
+        self.in_flight = []   # [[release_day, remaining (..., stores) int64], ...]
+        # Режим SKU: черга — SupplierAgent (пакети OrderBatch), in_flight не використовується
+        self.supplier = SupplierAgent(delivery_delay_days, daily_limit) \
+            if layout is not None and self.stock.ndim == 1 else None
+        if carry_fraction is None:
+            carry_fraction = layout is not None
+        # Дробовий залишок продажів кожної позиції, ще не «проданий» цілою одиницею
+        self.carry = np.zeros(self.stock.shape) if carry_fraction else None
+        self.record_detail = record_detail
+        self.last_week_detail = None
+        self._detail = []
+        # У режимі SKU агент отримує запаси масивом пар, а не словником
+        initial = dict(zip(self.store_ids, self.stock.tolist())) if layout is None else initial_stock
+        self.inventory = InventoryAgent(alpha=alpha, beta=beta, Q_max=Q_max,
+                                        initial_stock=initial,
+                                        incremental=incremental,
+                                        regions=regions,
+                                        layout=layout)
+
+    def place_orders(self, qty: np.ndarray) -> None:
+        """
+        Ставить у чергу партію замовлень (..., stores), яка стане доступною через delivery_delay_days.
+        """
+        qty = np.broadcast_to(np.asarray(qty, dtype=np.int64), self.stock.shape)
+        if self.supplier is not None:
+            self.supplier.place_orders(qty, self.current_date)
+        elif qty.sum() > 0:
+            self.in_flight.append([self.day + self.delivery_delay_days, qty.copy()])
+
+    @property
+    def current_date(self):
+        return self.start_date + timedelta(days=self.day)
+
+    @instrument.timed("simulation.deliver")
+    def deliver(self) -> int:
+        """
+        Відвантаження за день: партії, для яких настав день, у порядку FIFO;
+        денний ліміт розподіляється кумулятивною сумою без циклу по магазинах.
+        Повертає кількість доставлених одиниць.
+        """
+        if self.supplier is not None:
+            # SupplierAgent додає відвантажене прямо в self.stock (stock[items] += sent)
+            delivered = self.supplier.process_orders(self.current_date, self)
+            instrument.count("simulation.delivered_units", delivered)
+            return delivered
+        released = [batch for batch in self.in_flight if batch[0] <= self.day]
+        if not released:
+            return 0
+        flat = np.concatenate([batch[1] for batch in released], axis=-1)
+        before = np.cumsum(flat, axis=-1) - flat  # скільки вже відвантажено перед кожним замовленням
+        sent = np.clip(self.daily_limit - before, 0, flat)
+        n = self.stock.shape[-1]
+        for k, batch in enumerate(released):
+            part = sent[..., k * n:(k + 1) * n]
+            self.stock += part
+            batch[1] -= part
+        self.in_flight = [batch for batch in self.in_flight if batch[1].any()]
+        delivered = int(sent.sum())
+        instrument.count("simulation.delivered_units", delivered)
+        return delivered
+
+    def _sales(self, start: int, stop: int) -> np.ndarray:
+        """
+        «Фактичний» попит днів [start, stop): (..., days, stores).
+        """
+        if self.actual_sales is None:
+            return self.demand[start:stop]
+        return self.actual_sales[..., start:stop, :]
+
+    @instrument.timed("simulation.sell")
+    def sell(self) -> None:
+        """
+        Зменшує запаси на «фактичні» продажі дня (int(прогноз) або int(actual_sales);
+        з carry_fraction — ціла частина разом із дробовим залишком попередніх днів).
+        """
+        sales = self._sales(self.day, self.day + 1)[..., 0, :]
+        if self.carry is not None:
+            sales = self.carry + sales
+            units = np.floor(sales)
+            self.carry = sales - units
+        else:
+            units = np.trunc(sales)
+        self.stock = np.maximum(self.stock - units.astype(np.int64), 0)
+
+    def step_day(self) -> None:
+        """
+        Один день: постачальник обробляє чергу, магазини продають.
+        """
+        if not self.record_detail:
+            self.deliver()
+            self.sell()
+            self.day += 1
+            return
+        before = self.stock.copy()
+        self.deliver()
+        after_delivery = self.stock.copy()
+        self.sell()
+        self._detail.append((after_delivery - before, after_delivery - self.stock, self.stock.copy()))
+        self.day += 1
+
+    def get_state(self) -> dict:
+        """
+        Повний змінний стан симуляції для checkpoint: день, запаси, черга постачальника, стан InventoryAgent.
+        """
+        return {
+            "day": self.day,
+            "stock": self.stock.copy(),
+            "in_flight": [[release, remaining.copy()] for release, remaining in self.in_flight],
+            "supplier": copy.deepcopy(self.supplier),
+            "carry": None if self.carry is None else self.carry.copy(),
+            "inventory": self.inventory.get_state(),
+        }
+
+    def set_state(self, state: dict) -> None:
+        """
+        Відновлює стан, збережений get_state().
+        """
+        self.day = state["day"]
+        self.stock = state["stock"].copy()
+        self.in_flight = [[release, remaining.copy()] for release, remaining in state["in_flight"]]
+        self.supplier = copy.deepcopy(state["supplier"])
+        self.carry = None if state["carry"] is None else state["carry"].copy()
+        self.inventory.set_state(state["inventory"])
+
+    def week_demand(self) -> np.ndarray:
+        """
+        Прогнозний попит на 7 днів від поточного дня: int(сума прогнозів) для кожного магазину (пари);
+        з carry_fraction — floor(дробовий залишок + сума прогнозів).
+        """
+        return self._whole_units(self.demand[self.day:self.day + 7].sum(axis=0, dtype=np.float64))
+
+    def _whole_units(self, week_sum: np.ndarray) -> np.ndarray:
+        if self.carry is None:
+            return np.trunc(week_sum)
+        return np.floor(self.carry + week_sum)
+
+    def run_week(self) -> dict:
+        """
+        Тиждень симуляції: прогноз попиту → оптимізація замовлень → 7 днів доставки/продажів → метрики.
+        Метрики рахуються відносно фактичного попиту тижня (без actual_sales — це прогноз);
+        для реплікацій total_cost і fill_rate — масиви (R,).
+        """
+        week_start = self.current_date
+        demand = self.week_demand()
+        realized = demand if self.actual_sales is None else \
+            self._whole_units(self._sales(self.day, self.day + 7).sum(axis=-2))
+        orders = self.inventory.optimize_arrays(demand, self.stock, engine=self.engine)
+        self.place_orders(orders)
+        instrument.count("simulation.ordered_units", int(orders.sum()))
+        self._detail = []
+        for _ in range(7):
+            self.step_day()
+        if self.record_detail:
+            delivered, sold, stock = (np.stack(a) for a in zip(*self._detail))
+            self.last_week_detail = {"delivered": delivered, "sold": sold, "stock": stock}
+        with instrument.timer("simulation.metrics"):
+            total_cost = total_cost_array(self.stock, realized, self.alpha, self.beta)
+            fill_rate = fill_rate_array(self.stock, realized)
+        if self.stock.ndim == 1:
+            total_cost, fill_rate = float(total_cost), float(fill_rate)
+        return {
+            "week_start": week_start,
+            "total_cost": total_cost,
+            "fill_rate": fill_rate,
+        }
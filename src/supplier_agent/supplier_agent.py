@@ -1,54 +1,145 @@
+import heapq
 from datetime import timedelta
 
+import numpy as np
+
+from utils.instrumentation import instrument
+
+
+class Order:
+    """
+    Компактний запис замовлення (__slots__ замість словника на кожне замовлення).
+    """
+    __slots__ = ("store_id", "order_qty", "order_date", "remaining_qty", "sku_id")
+
+    def __init__(self, store_id: int, order_qty: int, order_date, sku_id: int = None):
+        self.store_id = store_id
+        self.order_qty = order_qty
+        self.order_date = order_date
+        self.remaining_qty = order_qty
+        self.sku_id = sku_id
+
+    def __repr__(self):
+        sku = "" if self.sku_id is None else f", sku_id={self.sku_id}"
+        return (f"Order(store_id={self.store_id}{sku}, order_qty={self.order_qty}, "
+                f"order_date={self.order_date}, remaining_qty={self.remaining_qty})")
+
+
+class OrderBatch:
+    """
+    Пакет замовлень режиму SKU одним записом черги: лише ненульові позиції —
+    items (плоскі індекси пар SkuLayout) і remaining_qty (залишок до відвантаження), обидва (k,) int64.
+    Усередині пакета відвантаження FIFO за порядком items (як у VectorSimulation.deliver).
+    """
+    __slots__ = ("items", "order_qty", "order_date", "remaining_qty")
+
+    def __init__(self, items: np.ndarray, qty: np.ndarray, order_date):
+        self.items = items
+        self.order_qty = int(qty.sum())
+        self.order_date = order_date
+        self.remaining_qty = qty
+
+    @property
+    def remaining_total(self) -> int:
+        return int(self.remaining_qty.sum())
+
+    def __repr__(self):
+        return (f"OrderBatch(items={self.items.shape[0]}, order_qty={self.order_qty}, "
+                f"order_date={self.order_date}, remaining_qty={self.remaining_total})")
+
+
 class SupplierAgent:
     """
     Імітує постачання з фіксованою затримкою та лімітом на добу.
     Аргументи:
         delivery_delay_days: кількість днів затримки (наприклад, 2)
         daily_limit: максимально можна відвантажити в один день (сума по всіх замовленнях)
+    Режим SKU (InventoryAgent з layout, stock — масив пар): замовлення пари — place_order(..., sku_id=...),
+    замовлення всієї мережі — place_orders(масив (n_pairs,)) одним OrderBatch, без об'єкта на кожну пару.
     """
 
     def __init__(self, delivery_delay_days: int = 2, daily_limit: int = 45000):
         self.delivery_delay = timedelta(days=delivery_delay_days)
         self.daily_limit = daily_limit
-        # order_queue: список словників:
-        # [{"store_id": int, "order_qty": int, "order_date": datetime.date, "remaining_qty": int, "delivered": bool}, ...]
+        # order_queue: купа за датою відвантаження, лише недоставлені замовлення:
+        # [(release_date, seq, Order), ...]; seq зберігає FIFO серед замовлень з однаковою датою
         self.order_queue = []
+        self._seq = 0
+        self.delivered_orders = 0  # лічильник повністю доставлених (і вже видалених) замовлень
+
+    def __len__(self):
+        return len(self.order_queue)
+
+    def place_order(self, store_id: int, qty: int, order_date, sku_id: int = None):
+        """
+        Додати замовлення в чергу (sku_id — замовлення однієї пари в режимі SKU).
+        Замовлення з нульовою кількістю не ставляться в чергу — доставляти нічого.
+        """
+        if qty <= 0:
+            return
+        self._push(order_date, Order(store_id, qty, order_date, sku_id))
+
+    def place_orders(self, qty, order_date):
+        """
+        Додати замовлення всіх пар (магазин, SKU) одним пакетом: qty — масив (n_pairs,) у порядку SkuLayout.
+        У черзі зберігаються лише ненульові позиції.
+        """
+        qty = np.asarray(qty, dtype=np.int64)
+        items = np.flatnonzero(qty > 0)
+        if items.shape[0] == 0:
+            return
+        self._push(order_date, OrderBatch(items, qty[items], order_date))
+
+    def _push(self, order_date, order) -> None:
+        heapq.heappush(self.order_queue, (order_date + self.delivery_delay, self._seq, order))
+        self._seq += 1
 
-    def place_order(self, store_id: int, qty: int, order_date):
+    def pending_orders(self) -> list:
         """
-        Додати замовлення в чергу.
+        Недоставлені замовлення у порядку відвантаження.
         """
-        self.order_queue.append({
-            "store_id": store_id,
-            "order_qty": qty,
-            "order_date": order_date,
-            "remaining_qty": qty,
-            "delivered": False
-        })
+        return [entry[2] for entry in sorted(self.order_queue)]
 
+    @instrument.timed("supplier.process_orders")
     def process_orders(self, current_date, inventory_agent):
         """
         Щодня викликається з поточною датою:
-        - Перевіряє, чи настав час доставки (order_date + delay <= current_date)
-        - Якщо можна доставляти і ліміт не вичерпано, додає товари до inventory_agent.stock
+        - Бере з купи замовлення, для яких настав час доставки (order_date + delay <= current_date)
+        - Якщо ліміт не вичерпано, додає товари до inventory_agent.stock
         - Якщо ліміт вичерпано, лишок чекає наступного дня
+        - Повністю доставлені замовлення одразу видаляються з черги
+        Вартість — O(замовлень, відвантажених сьогодні · log n), а не O(усіх замовлень);
+        пакет SKU відвантажується векторно (кумулятивна сума в межах ліміту).
+        Повертає кількість відвантажених за день одиниць.
         """
         deliverable = self.daily_limit
-        for order in self.order_queue:
-            if order["delivered"]:
-                continue
-
-            if order["order_date"] + self.delivery_delay <= current_date:
-                # можемо доставляти
-                to_send = min(order["remaining_qty"], deliverable)
-                if to_send > 0:
-                    # Доставляємо
-                    inventory_agent.stock[order["store_id"]] += to_send
-                    order["remaining_qty"] -= to_send
-                    deliverable -= to_send
-                    if order["remaining_qty"] == 0:
-                        order["delivered"] = True
-                # Якщо daily_limit вичерпано, лишок чекатиме наступного дня
-        # За бажанням можна чистити повністю доставлені замовлення:
-        # self.order_queue = [o for o in self.order_queue if not o["delivered"]]
+        queue = self.order_queue
+        while queue and deliverable > 0 and queue[0][0] <= current_date:
+            order = queue[0][2]
+            if isinstance(order, OrderBatch):
+                before = np.cumsum(order.remaining_qty) - order.remaining_qty
+                sent = np.clip(deliverable - before, 0, order.remaining_qty)
+                inventory_agent.stock[order.items] += sent
+                order.remaining_qty = order.remaining_qty - sent
+                deliverable -= int(sent.sum())
+                done = not order.remaining_qty.any()
+                if not done:
+                    # Доставлені позиції більше не тримаємо в пакеті
+                    keep = order.remaining_qty > 0
+                    order.items, order.remaining_qty = order.items[keep], order.remaining_qty[keep]
+            else:
+                to_send = min(order.remaining_qty, deliverable)
+                # Доставляємо
+                if order.sku_id is None:
+                    inventory_agent.stock[order.store_id] += to_send
+                else:
+                    inventory_agent.stock[inventory_agent.layout.index(order.store_id, order.sku_id)[0]] += to_send
+                order.remaining_qty -= to_send
+                deliverable -= to_send
+                done = order.remaining_qty == 0
+            if done:
+                heapq.heappop(queue)
+                self.delivered_orders += 1
+        instrument.count("supplier.delivered_units", self.daily_limit - deliverable)
+        # Якщо daily_limit вичерпано, лишок чекатиме наступного дня
+        return self.daily_limit - deliverable
@@ -0,0 +1,123 @@
+import time
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+
+class Job:
+    """
+    Фонове завдання: future + прогрес, який оновлює сама функція через колбек progress(done, total, message).
+    """
+
+    def __init__(self, key):
+        self.key = key
+        self.future = None
+        self.done_steps = 0
+        self.total_steps = None
+        self.message = ""
+        self.started = time.time()
+        self.finished = None
+
+    def update(self, done: int, total: int = None, message: str = "") -> None:
+        """
+        Колбек прогресу (викликається з потоку-воркера).
+        """
+        self.done_steps = done
+        if total is not None:
+            self.total_steps = total
+        self.message = message
+
+    @property
+    def status(self) -> str:
+        """
+        "running", "done" або "error".
+        """
+        if not self.future.done():
+            return "running"
+        return "error" if self.future.exception() is not None else "done"
+
+    @property
+    def fraction(self) -> float:
+        """
+        Частка виконаного від 0 до 1 (0, поки функція не повідомила total).
+        """
+        if self.status != "running":
+            return 1.0
+        if not self.total_steps:
+            return 0.0
+        return min(self.done_steps / self.total_steps, 1.0)
+
+    @property
+    def elapsed_s(self) -> float:
+        """
+        Час виконання (для завершених — повний, для активних — на поточний момент).
+        """
+        return (self.finished or time.time()) - self.started
+
+    def result(self):
+        """
+        Результат функції (для "error" — піднімає її виняток).
+        """
+        return self.future.result()
+
+
+class JobManager:
+    """
+    Пул фонових потоків для довгих операцій (прогноз + оптимізація, симуляція),
+    щоб не блокувати перерахунок сторінки Streamlit.
+    Завдання ідентифікуються ключем із вхідних параметрів: повторний submit з тим самим ключем
+    повертає вже запущене або завершене завдання (готовий результат — миттєво).
+    Зберігається не більше max_results завершених завдань (найстаріші витісняються).
+    """
+
+    def __init__(self, max_workers: int = 2, max_results: int = 32):
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="job")
+        self.max_results = max_results
+        self._jobs = OrderedDict()  # {key: Job}
+        self._lock = threading.Lock()
+
+    def submit(self, key, fn, *args, **kwargs) -> Job:
+        """
+        Запускає fn(*args, progress=job.update, **kwargs) у фоні, якщо завдання з таким ключем
+        ще немає (або попереднє завершилось помилкою). Повертає Job.
+        """
+        with self._lock:
+            job = self._jobs.get(key)
+            if job is not None and job.status != "error":
+                self._jobs.move_to_end(key)
+                return job
+            job = Job(key)
+            job.future = self.executor.submit(self._run, job, fn, args, kwargs)
+            self._jobs[key] = job
+            self._evict()
+            return job
+
+    @staticmethod
+    def _run(job: Job, fn, args, kwargs):
+        """
+        Виконується в потоці пулу; фіксує час завершення навіть у разі помилки.
+        """
+        try:
+            return fn(*args, progress=job.update, **kwargs)
+        finally:
+            job.finished = time.time()
+
+    def get(self, key):
+        """
+        Завдання за ключем або None.
+        """
+        with self._lock:
+            return self._jobs.get(key)
+
+    def _evict(self) -> None:
+        finished = [key for key, job in self._jobs.items() if job.future.done()]
+        for key in finished[:max(len(finished) - self.max_results, 0)]:
+            del self._jobs[key]
+
+    def stats(self) -> dict:
+        """
+        Кількість завдань за статусом.
+        """
+        with self._lock:
+            statuses = [job.status for job in self._jobs.values()]
+        return {status: statuses.count(status) for status in ("running", "done", "error")}
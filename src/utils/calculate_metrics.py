@@ -3,7 +3,12 @@ def calculate_total_cost(inventory_agent, demands: dict, alpha: float, beta: flo
     Обчислює загальні витрати (дефіцит + надлишок) для поточного stock і заданих demands.
     demands: {store_id: demand_for_week}
     alpha, beta — такі ж, як у InventoryAgent
+    Режим SKU (inventory_agent.layout): demands — {(store_id, sku_id): demand} або масив (n_pairs,),
+    рахується векторно по парах (пари без попиту — попит 0).
     """
+    if getattr(inventory_agent, "layout", None) is not None:
+        demand, stock = inventory_agent.aligned_arrays(demands)
+        return float(total_cost_array(stock, demand, alpha, beta))
     total_cost = 0.0
     for store_id, p_i in demands.items():
         s_i = inventory_agent.stock.get(store_id, 0)
@@ -20,7 +25,11 @@ def calculate_fill_rate(inventory_agent, demands: dict) -> float:
     Обчислює fill rate: (сума задоволеного попиту / сума прогнозного попиту)
     Припускаємо, що якщо stock >= demand, то весь попит задовольняється; 
     якщо stock < demand, то задовольняється лише stock.
+    Режим SKU — як у calculate_total_cost.
     """
+    if getattr(inventory_agent, "layout", None) is not None:
+        demand, stock = inventory_agent.aligned_arrays(demands)
+        return float(fill_rate_array(stock, demand))
     total_demand = 0.0
     total_fulfilled = 0.0
     for store_id, p_i in demands.items():
@@ -31,3 +40,44 @@ def calculate_fill_rate(inventory_agent, demands: dict) -> float:
     if total_demand == 0:
         return 1.0
     return total_fulfilled / total_demand
+
+def total_cost_array(stock, demand, alpha: float, beta: float):
+    """
+    Векторизований аналог calculate_total_cost: stock і demand — масиви (..., stores),
+    вирівняні за магазинами (або за парами SkuLayout). Сума береться по останній осі (для (stores,) — скаляр).
+    """
+    import numpy as np
+    gap = np.asarray(demand, dtype=np.float64) - np.asarray(stock, dtype=np.float64)
+    return (alpha * np.maximum(gap, 0) + beta * np.maximum(-gap, 0)).sum(axis=-1)
+
+def fill_rate_array(stock, demand):
+    """
+    Векторизований аналог calculate_fill_rate: sum(min(stock, demand)) / sum(demand)
+    по останній осі; якщо попит нульовий — 1.0.
+    """
+    import numpy as np
+    stock = np.asarray(stock, dtype=np.float64)
+    demand = np.asarray(demand, dtype=np.float64)
+    total_demand = demand.sum(axis=-1)
+    fulfilled = np.minimum(stock, demand).sum(axis=-1)
+    return np.where(total_demand == 0, 1.0, fulfilled / np.where(total_demand == 0, 1.0, total_demand))
+
+def cost_by_store(stock, demand, layout, alpha: float, beta: float):
+    """
+    Вартість кожного магазину в режимі SKU: stock і demand — (..., n_pairs) у порядку layout,
+    результат — (..., stores) (сума по SKU магазину).
+    """
+    import numpy as np
+    gap = np.asarray(demand, dtype=np.float64) - np.asarray(stock, dtype=np.float64)
+    return layout.sum_by_store(alpha * np.maximum(gap, 0) + beta * np.maximum(-gap, 0))
+
+def fill_rate_by_store(stock, demand, layout):
+    """
+    Fill rate кожного магазину в режимі SKU: (..., n_pairs) → (..., stores); без попиту — 1.0.
+    """
+    import numpy as np
+    stock = np.asarray(stock, dtype=np.float64)
+    demand = np.asarray(demand, dtype=np.float64)
+    total_demand = layout.sum_by_store(demand)
+    fulfilled = layout.sum_by_store(np.minimum(stock, demand))
+    return np.where(total_demand == 0, 1.0, fulfilled / np.where(total_demand == 0, 1.0, total_demand))
@@ -0,0 +1,184 @@
+import os
+import time
+import functools
+from collections import defaultdict
+from contextlib import contextmanager, nullcontext
+
+# Змінна оточення, що вмикає інструментацію: "1" / "timers", або список режимів через кому,
+# напр. INTELL_INSTRUMENT=timers,cprofile,tracemalloc
+ENV_VAR = "INTELL_INSTRUMENT"
+MODES = ("timers", "cprofile", "tracemalloc")
+
+# Спільний «порожній» контекст: коли інструментацію вимкнено, timer() не створює об'єктів
+_NULL = nullcontext()
+
+
+class _Timer:
+    """
+    Контекст заміру одного блоку: додає тривалість і виклик до лічильників Instrumentation.
+    """
+    __slots__ = ("owner", "name", "started")
+
+    def __init__(self, owner, name: str):
+        self.owner = owner
+        self.name = name
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.owner.times[self.name] += time.perf_counter() - self.started
+        self.owner.calls[self.name] += 1
+        return False
+
+
+class Instrumentation:
+    """
+    Легка інструментація агентів і симуляції:
+      • timer(name) / timed(name) — сумарний час і кількість викликів блоку;
+      • count(name, n) — довільні лічильники (рядки прогнозу, покоління GA, доставлені одиниці, ...);
+      • window() — приріст усіх метрик від попереднього виклику (для розбивки по тижнях);
+      • session() — необов'язкові cProfile і tracemalloc навколо всього прогону.
+    Коли вимкнено (за замовчуванням), timer() повертає спільний nullcontext, а count() — одну перевірку прапорця.
+    """
+
+    def __init__(self):
+        self.modes = frozenset()
+        self.enabled = False
+        self.times = defaultdict(float)   # {name: секунди}
+        self.calls = defaultdict(int)     # {name: кількість викликів}
+        self.counters = defaultdict(float)
+        self._last = {}
+
+    def configure(self, modes=None) -> None:
+        """
+        Вмикає режими з аргументу (рядок або список) або, якщо modes=None, — зі змінної ENV_VAR.
+        Будь-який режим вмикає і таймери.
+        """
+        if modes is None:
+            modes = os.environ.get(ENV_VAR, "")
+        if isinstance(modes, str):
+            modes = [m.strip().lower() for m in modes.split(",") if m.strip()]
+        modes = {"timers" if m in ("1", "true", "on", "yes") else m for m in modes if m not in ("0", "false", "off", "no")}
+        unknown = modes - set(MODES)
+        if unknown:
+            raise ValueError(f"Невідомі режими інструментації {sorted(unknown)}; доступні: {MODES}")
+        if modes:
+            modes.add("timers")
+        self.modes = frozenset(modes)
+        self.enabled = bool(modes)
+
+    def timer(self, name: str):
+        """
+        with instrument.timer("forecast.inference"): ...
+        """
+        if not self.enabled:
+            return _NULL
+        return _Timer(self, name)
+
+    def timed(self, name: str):
+        """
+        Декоратор: замірює кожен виклик функції під іменем name.
+        """
+        def decorator(fn):
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return fn(*args, **kwargs)
+                with _Timer(self, name):
+                    return fn(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def count(self, name: str, n: float = 1) -> None:
+        """
+        Збільшує лічильник name на n.
+        """
+        if self.enabled:
+            self.counters[name] += n
+
+    def snapshot(self) -> dict:
+        """
+        Плоский словник накопичених метрик: time_s.<name>, calls.<name> і лічильники.
+        """
+        flat = {f"time_s.{k}": v for k, v in self.times.items()}
+        flat.update({f"calls.{k}": v for k, v in self.calls.items()})
+        flat.update(self.counters)
+        if "tracemalloc" in self.modes:
+            import tracemalloc
+            if tracemalloc.is_tracing():
+                flat["tracemalloc_peak_mb"] = tracemalloc.get_traced_memory()[1] / 2 ** 20
+        return flat
+
+    def window(self) -> dict:
+        """
+        Приріст метрик від попереднього window() (пік tracemalloc — за вікно, не приріст).
+        """
+        current = self.snapshot()
+        delta = {k: v - self._last.get(k, 0) for k, v in current.items()}
+        if "tracemalloc_peak_mb" in current:
+            import tracemalloc
+            delta["tracemalloc_peak_mb"] = current["tracemalloc_peak_mb"]
+            tracemalloc.reset_peak()
+        self._last = self.snapshot()
+        return delta
+
+    def reset(self) -> None:
+        """
+        Обнуляє всі таймери та лічильники.
+        """
+        self.times.clear()
+        self.calls.clear()
+        self.counters.clear()
+        self._last = {}
+
+    @contextmanager
+    def session(self, profile_path: str = None, top: int = 20):
+        """
+        Обгортка всього прогону. У режимі "cprofile" пише статистику у profile_path (.prof,
+        відкривається pstats/snakeviz) і друкує top функцій за cumulative time;
+        у режимі "tracemalloc" відстежує виділення пам'яті й друкує top місць алокації.
+        """
+        profiler = None
+        if "cprofile" in self.modes:
+            import cProfile
+            profiler = cProfile.Profile()
+        tracing = "tracemalloc" in self.modes
+        if tracing:
+            import tracemalloc
+            tracemalloc.start()
+        if profiler is not None:
+            profiler.enable()
+        try:
+            yield self
+        finally:
+            if profiler is not None:
+                import pstats
+                profiler.disable()
+                if profile_path:
+                    os.makedirs(os.path.dirname(os.path.abspath(profile_path)), exist_ok=True)
+                    profiler.dump_stats(profile_path)
+                    print(f"[Instrumentation] cProfile збережено у {profile_path}")
+                pstats.Stats(profiler).sort_stats("cumulative").print_stats(top)
+            if tracing:
+                snapshot = tracemalloc.take_snapshot()
+                tracemalloc.stop()
+                print("[Instrumentation] tracemalloc: найбільші місця алокації")
+                for stat in snapshot.statistics("lineno")[:top]:
+                    print(f"  {stat}")
+
+    def report(self) -> None:
+        """
+        Друкує накопичені таймери (за спаданням часу) і лічильники.
+        """
+        for name, total in sorted(self.times.items(), key=lambda kv: -kv[1]):
+            calls = self.calls[name]
+            print(f"[Instrumentation] {name:32s} {total:9.3f} s  {calls:7d} викл.  {1e3 * total / calls:9.3f} ms/викл.")
+        for name, value in sorted(self.counters.items()):
+            print(f"[Instrumentation] {name:32s} {value:g}")
+
+
+# Глобальний екземпляр; стан береться зі змінної оточення під час імпорту
+instrument = Instrumentation()
+instrument.configure()
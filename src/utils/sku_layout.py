@@ -0,0 +1,120 @@
+import numpy as np
+
+
+class SkuLayout:
+    """
+    Розріджена (CSR) схема активних пар (магазин, SKU).
+    Пари впорядковані за магазином, усередині — за SKU; пара має плоский індекс 0..n_pairs-1,
+    тож увесь стан (запаси, попит, замовлення) — плоскі масиви (..., n_pairs), і пам'ять
+    росте з кількістю активних пар, а не з добутком stores × SKU.
+      • store_ids (stores,) — ID магазинів (рядки CSR);
+      • indptr (stores + 1,) — пари магазину i: [indptr[i], indptr[i + 1]);
+      • sku_ids (n_pairs,) — SKU кожної пари (колонки CSR).
+    """
+
+    def __init__(self, store_ids, indptr, sku_ids):
+        self.store_ids = np.asarray(store_ids, dtype=np.int64)
+        self.indptr = np.asarray(indptr, dtype=np.int64)
+        self.sku_ids = np.asarray(sku_ids, dtype=np.int64)
+        if self.indptr.shape[0] != self.store_ids.shape[0] + 1 or self.indptr[-1] != self.sku_ids.shape[0]:
+            raise ValueError("indptr не узгоджений зі store_ids / sku_ids.")
+        # Позиція магазину для кожної пари (для агрегування по магазинах)
+        self.pair_store = np.repeat(np.arange(self.store_ids.shape[0]), np.diff(self.indptr))
+        # Ключ пари для пошуку індексу: позиція магазину · (max SKU + 1) + SKU — зростає разом з індексом
+        self._sku_base = int(self.sku_ids.max()) + 1 if self.sku_ids.size else 1
+        self._keys = self.pair_store * self._sku_base + self.sku_ids
+        self._store_pos = {int(sid): i for i, sid in enumerate(self.store_ids.tolist())}
+
+    @classmethod
+    def from_pairs(cls, store_ids, sku_ids) -> "SkuLayout":
+        """
+        Схема з масивів пар (store_id, sku_id) довільного порядку; дублікати відкидаються.
+        """
+        pairs = np.unique(np.column_stack([np.asarray(store_ids, dtype=np.int64).ravel(),
+                                           np.asarray(sku_ids, dtype=np.int64).ravel()]), axis=0)
+        stores, starts = np.unique(pairs[:, 0], return_index=True)
+        return cls(stores, np.append(starts, pairs.shape[0]), pairs[:, 1])
+
+    @classmethod
+    def from_frame(cls, df, store_col: str = "Store", sku_col: str = "SKU") -> "SkuLayout":
+        return cls.from_pairs(df[store_col].to_numpy(), df[sku_col].to_numpy())
+
+    @property
+    def n_pairs(self) -> int:
+        return int(self.sku_ids.shape[0])
+
+    @property
+    def n_stores(self) -> int:
+        return int(self.store_ids.shape[0])
+
+    @property
+    def pair_store_ids(self) -> np.ndarray:
+        """
+        Store ID кожної пари (n_pairs,).
+        """
+        return self.store_ids[self.pair_store]
+
+    def index(self, store_ids, sku_ids) -> np.ndarray:
+        """
+        Плоскі індекси пар (store_id, sku_id); KeyError для неактивних пар.
+        """
+        store_ids = np.atleast_1d(np.asarray(store_ids, dtype=np.int64))
+        sku_ids = np.atleast_1d(np.asarray(sku_ids, dtype=np.int64))
+        pos = np.array([self._store_pos.get(int(s), -1) for s in store_ids.tolist()], dtype=np.int64)
+        keys = pos * self._sku_base + sku_ids
+        idx = np.searchsorted(self._keys, keys)
+        found = (pos >= 0) & (sku_ids >= 0) & (sku_ids < self._sku_base) & (idx < self.n_pairs)
+        found[found] &= self._keys[idx[found]] == keys[found]
+        if not found.all():
+            missing = list(zip(store_ids[~found].tolist(), sku_ids[~found].tolist()))[:10]
+            raise KeyError(f"Неактивні пари (магазин, SKU): {missing}")
+        return idx
+
+    def gather(self, values: dict, default: float = 0.0) -> np.ndarray:
+        """
+        {(store_id, sku_id): value} → плоский масив (n_pairs,) (відсутні пари — default).
+        """
+        out = np.full(self.n_pairs, default, dtype=np.float64)
+        if values:
+            keys = np.array(list(values.keys()), dtype=np.int64)
+            out[self.index(keys[:, 0], keys[:, 1])] = np.fromiter(values.values(), dtype=np.float64, count=len(values))
+        return out
+
+    def to_dict(self, values, nonzero: bool = True) -> dict:
+        """
+        Плоский масив (n_pairs,) → {(store_id, sku_id): value} (за замовчуванням лише ненульові).
+        """
+        values = np.asarray(values)
+        idx = np.flatnonzero(values) if nonzero else np.arange(self.n_pairs)
+        stores = self.pair_store_ids[idx].tolist()
+        skus = self.sku_ids[idx].tolist()
+        return dict(zip(zip(stores, skus), values[idx].tolist()))
+
+    def sum_by_store(self, values) -> np.ndarray:
+        """
+        Сума по SKU кожного магазину: (..., n_pairs) → (..., stores), без циклу (різниці кумулятивних сум).
+        """
+        values = np.asarray(values, dtype=np.float64)
+        cumsum = np.concatenate([np.zeros(values.shape[:-1] + (1,)), np.cumsum(values, axis=-1)], axis=-1)
+        return cumsum[..., self.indptr[1:]] - cumsum[..., self.indptr[:-1]]
+
+    def broadcast_store(self, values) -> np.ndarray:
+        """
+        Значення на рівні магазину (..., stores) → на кожну пару (..., n_pairs).
+        """
+        return np.asarray(values)[..., self.pair_store]
+
+    def to_csr(self, values):
+        """
+        scipy.sparse.csr_matrix (stores × (max SKU + 1)) із плоского масиву (n_pairs,) — для сумісності.
+        """
+        from scipy import sparse
+        return sparse.csr_matrix((np.asarray(values), self.sku_ids, self.indptr),
+                                 shape=(self.n_stores, self._sku_base))
+
+    def nbytes(self) -> int:
+        """
+        Пам'ять самої схеми (байти).
+        """
+        return int(self.store_ids.nbytes + self.indptr.nbytes + self.sku_ids.nbytes
+                   + self.pair_store.nbytes + self._keys.nbytes)